@@ -0,0 +1,216 @@
+"""
+Prompting-strategy evaluation for the Week3 experiments
+
+Runs every (question x strategy) prompt from a dataset concurrently through
+one shared Gemini model, caches completions on disk by prompt hash (so a
+rerun costs nothing) and scores accuracy, latency and tokens per strategy:
+
+    python prompt_eval.py prompt_eval_dataset.json --workers 6
+
+Dataset format: {"strategies": {name: template}, "questions": [{"id",
+"question", "examples": [{"q", "a"}], "answers": [accepted answers]}]}.
+Templates can use {question} and {examples}.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.llm_metrics import track_call, usage_from, percentile
+from common.resilience import get_client
+from common import mock_llm
+
+DEFAULT_DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompt_eval_dataset.json")
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".prompt_cache")
+
+
+# ---- Dataset ----
+def load_dataset(file_path=DEFAULT_DATASET):
+    with open(file_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_prompt(template, item):
+    examples = "".join(f"Q: {ex['q']}\nA: {ex['a']}\n\n" for ex in item.get("examples", []))
+    return template.format(question=item["question"], examples=examples)
+
+
+# ---- Scoring ----
+def final_answer(text):
+    """The part of a reply that holds the answer: after 'Final answer', else the last line"""
+    match = re.findall(r"final answer\s*[:\-]?\s*(.+)", text, re.IGNORECASE)
+    if match:
+        return match[-1]
+    lines = [line for line in text.strip().splitlines() if line.strip()]
+    return lines[-1] if lines else ""
+
+
+def is_correct(text, answers):
+    answer = final_answer(text).lower().replace("*", "")
+    return any(re.search(rf"(?<![\w/]){re.escape(a.lower())}(?![\w/])", answer) for a in answers)
+
+
+# ---- Disk Cache ----
+class CompletionCache:
+    """One JSON file per completion, named by the hash of model + prompt"""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(model_name, prompt):
+        return hashlib.sha256(f"{model_name}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, model_name, prompt):
+        path = os.path.join(self.directory, self.key(model_name, prompt) + ".json")
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def put(self, model_name, prompt, record):
+        path = os.path.join(self.directory, self.key(model_name, prompt) + ".json")
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+# ---- Engine ----
+class PromptEvaluator:
+    """Shares one model client across every prompt of a run"""
+
+    def __init__(self, api_key=None, model_name="gemini-2.0-flash", cache=None, workers=6):
+        api_key = api_key or os.getenv("API_KEY") or os.getenv("GOOGLE_API_KEY")
+        if mock_llm.is_enabled():
+            genai = mock_llm.mock_genai
+        else:
+            import google.generativeai as genai
+            genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+        self.client = get_client(api_key)
+        self.cache = cache
+        self.workers = workers
+
+    def complete(self, prompt):
+        """Completion record for one prompt, from the cache when possible"""
+        if self.cache is not None:
+            record = self.cache.get(self.model_name, prompt)
+            if record is not None:
+                return dict(record, cached=True)
+
+        start = time.perf_counter()
+        with track_call("week3-eval", self.model_name) as call:
+            # Retries belong to common.resilience, not the SDK's hidden retry
+            response = self.client.call(self.model.generate_content, prompt,
+                                        request_options={"retry": None}, tracker=call)
+        prompt_tokens, completion_tokens = usage_from(response)
+        record = {
+            "text": response.text,
+            "latency_s": round(time.perf_counter() - start, 3),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+        }
+        if self.cache is not None:
+            self.cache.put(self.model_name, prompt, record)
+        return dict(record, cached=False)
+
+    def run(self, dataset):
+        """Answer every (question x strategy) pair concurrently; returns one row per pair"""
+        jobs = [
+            (item, strategy, build_prompt(template, item))
+            for item in dataset["questions"]
+            for strategy, template in dataset["strategies"].items()
+        ]
+
+        def evaluate(job):
+            item, strategy, prompt = job
+            try:
+                record = self.complete(prompt)
+                error = None
+            except Exception as e:
+                record = {"text": "", "latency_s": None, "prompt_tokens": None,
+                          "completion_tokens": None, "cached": False}
+                error = f"{type(e).__name__}: {e}"
+            return {
+                "question": item["id"],
+                "strategy": strategy,
+                "correct": error is None and is_correct(record["text"], item["answers"]),
+                "error": error,
+                **record,
+            }
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(evaluate, jobs))
+
+
+def summarize(results):
+    """Accuracy, latency and token use per strategy.
+
+    Cached completions keep the latency measured when they were generated.
+    """
+    rows = []
+    for strategy in dict.fromkeys(r["strategy"] for r in results):
+        runs = [r for r in results if r["strategy"] == strategy]
+        latencies = [r["latency_s"] for r in runs if r["latency_s"] is not None]
+        rows.append({
+            "strategy": strategy,
+            "accuracy": sum(r["correct"] for r in runs) / len(runs),
+            "p50_latency_s": percentile(latencies, 50),
+            "mean_latency_s": sum(latencies) / len(latencies) if latencies else None,
+            "prompt_tokens": sum(r["prompt_tokens"] or 0 for r in runs),
+            "completion_tokens": sum(r["completion_tokens"] or 0 for r in runs),
+            "cached": sum(r["cached"] for r in runs),
+            "errors": sum(r["error"] is not None for r in runs),
+        })
+    return rows
+
+
+def format_table(rows):
+    def fmt(value):
+        return "-" if value is None else f"{value:.2f}"
+
+    lines = [f"{'strategy':<12}{'accuracy':>10}{'p50 s':>8}{'mean s':>8}{'prompt tok':>12}"
+             f"{'output tok':>12}{'cached':>8}{'errors':>8}"]
+    for r in rows:
+        lines.append(f"{r['strategy']:<12}{r['accuracy']:>10.0%}{fmt(r['p50_latency_s']):>8}"
+                     f"{fmt(r['mean_latency_s']):>8}{r['prompt_tokens']:>12}{r['completion_tokens']:>12}"
+                     f"{r['cached']:>8}{r['errors']:>8}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("dataset", nargs="?", default=DEFAULT_DATASET)
+    parser.add_argument("--model", default="gemini-2.0-flash")
+    parser.add_argument("--workers", type=int, default=6, help="prompts in flight at once")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--no-cache", action="store_true", help="always call the model")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every answer")
+    args = parser.parse_args()
+
+    cache = None if args.no_cache else CompletionCache(args.cache_dir)
+    evaluator = PromptEvaluator(model_name=args.model, cache=cache, workers=args.workers)
+
+    start = time.perf_counter()
+    results = evaluator.run(load_dataset(args.dataset))
+    if args.verbose:
+        for r in results:
+            mark = "✅" if r["correct"] else "❌"
+            print(f"\n{mark} {r['question']} / {r['strategy']}:\n{r['error'] or r['text'].strip()}")
+
+    print(f"\n📊 {len(results)} prompts in {time.perf_counter() - start:.2f}s\n")
+    print(format_table(summarize(results)))
+
+
+if __name__ == "__main__":
+    main()
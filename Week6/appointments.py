@@ -0,0 +1,350 @@
+import os
+import sys
+import re
+import difflib
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from dataclasses import dataclass
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.sqlite_util import ThreadLocalConnection
+
+from mailer import send_email
+from doctor_directory import WEEKDAYS, DAY_ALIASES, format_clock, parse_clock, get_doctor_directory
+
+APPOINTMENT_MINUTES = int(os.getenv("APPOINTMENT_MINUTES", "30"))
+LEDGER_PATH = os.getenv("APPOINTMENTS_DB", "appointments.db")
+
+MONTHS = {name: i for i, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1)}
+_MONTH = r"(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?"
+
+# ---- Intent Parser (compiled once) ----
+# A request to book: a booking verb ("Book with Dr. Khan ..."), "can I get ...",
+# or "I need/want/make ... an appointment"
+_BOOKING_INTENT = re.compile(
+    r"\b(?:book|schedule|reserve|arrange|set\s+up)\b"
+    r"|\b(?:can|could|may)\s+i\s+(?:get|have)\b"
+    r"|\b(?:need|want|like|make|fix|get)\b.{0,40}?\b(?:appointments?|appt|slot|consultation|visit)\b",
+    re.IGNORECASE,
+)
+# Questions about booking rather than requests to book ("Do I need an appointment ...?")
+_BOOKING_QUESTION = re.compile(
+    r"^\W*(?:how|what|why|where|which|who|is|are|do|does|did|should|must)\b"
+    r"|\b(?:do|does|should|must)\s+(?:i|we|you)\s+need\b|\bhow\s+(?:do|can|should)\s+(?:i|we)\b",
+    re.IGNORECASE,
+)
+_ISO_DATE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+_NUMERIC_DATE = re.compile(r"\b(\d{1,2})[/.](\d{1,2})(?:[/.](\d{2,4}))?\b")  # day/month[/year]
+_DAY_MONTH = re.compile(r"\b(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?" + _MONTH + r"(?:,?\s+(\d{4}))?", re.IGNORECASE)
+_MONTH_DAY = re.compile(r"\b" + _MONTH + r"\s+(\d{1,2})(?:st|nd|rd|th)?\b(?:,?\s+(\d{4}))?", re.IGNORECASE)
+_RELATIVE_DAY = re.compile(r"\b(today|tomorrow|day after tomorrow)\b", re.IGNORECASE)
+_WEEKDAY = re.compile(r"\b(next\s+|this\s+)?(" + "|".join(sorted(DAY_ALIASES, key=len, reverse=True)) + r")\b",
+                      re.IGNORECASE)
+_CLOCK_12 = re.compile(r"\b\d{1,2}(?::\d{2})?\s*(?:am|pm)\b", re.IGNORECASE)
+_CLOCK_24 = re.compile(r"\b(?:at\s+)?([01]?\d|2[0-3]):([0-5]\d)\b", re.IGNORECASE)
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_WITH_DOCTOR = re.compile(r"\b(?:with|see)\s+(?:dr\b|doctor\s+[a-z])", re.IGNORECASE)
+_DOCTOR_PART = re.compile(
+    r"\b(?:with|see)\s+(.+?)(?=\s+(?:on|at|for|from|tomorrow|today|next|this)\b|,|$)", re.IGNORECASE)
+_PATIENT = re.compile(
+    r"\bfor\s+(?:patient\s+|mr\.?\s+|mrs\.?\s+|ms\.?\s+)?([a-z][a-z'-]*(?:\s+[a-z][a-z'-]*){0,3})", re.IGNORECASE)
+_NAME_WORDS = re.compile(r"[a-z]+")
+_NOT_NAMES = {"dr", "doctor", "the", "with", "and", "on", "at", "for", "email", "appointment"}
+_NOT_PATIENT = {"today", "tomorrow", "next", "this", "a", "an", "the", "my", "me", "email", "on", "at"} | set(DAY_ALIASES)
+
+
+def is_booking_request(text, directory=None):
+    """A request to book plus something concrete to book.
+
+    That is "with Dr. <name>", an email address, or a doctor/specialty
+    together with a date or time. Questions about booking ("How can I book
+    an appointment?", "Do I need an appointment to see ...?") are left to
+    the QA chain.
+    """
+    if not _BOOKING_INTENT.search(text) or _BOOKING_QUESTION.search(text):
+        return False
+    if _EMAIL.search(text) or _WITH_DOCTOR.search(text):
+        return True
+    directory = directory or get_doctor_directory()
+    if not (directory.find_by_name(text) or directory.match_specialty(text)):
+        return False
+    return parse_date(text) is not None or parse_time(text) is not None
+
+
+def _future_date(month, day, year, today):
+    """The given day/month in `year`, or the next one on/after today if no year was given.
+
+    None if there is no such date (e.g. '10.30' is a time, not day 10 of month 30).
+    """
+    try:
+        if year:
+            year = int(year)
+            return date(year + 2000 if year < 100 else year, month, day)
+        candidate = date(today.year, month, day)
+        return candidate if candidate >= today else date(today.year + 1, month, day)
+    except ValueError:
+        return None
+
+
+def parse_date(text, today=None):
+    """'2025-10-06', '6/10/2025', '6th Oct', 'October 6', 'tomorrow', 'next Monday' -> date"""
+    today = today or date.today()
+    match = _ISO_DATE.search(text)
+    if match:
+        return _future_date(int(match.group(2)), int(match.group(3)), match.group(1), today)
+    match = _DAY_MONTH.search(text)
+    if match:
+        return _future_date(MONTHS[match.group(2).lower()[:3]], int(match.group(1)), match.group(3), today)
+    match = _MONTH_DAY.search(text)
+    if match:
+        return _future_date(MONTHS[match.group(1).lower()[:3]], int(match.group(2)), match.group(3), today)
+    for match in _NUMERIC_DATE.finditer(text):
+        found = _future_date(int(match.group(2)), int(match.group(1)), match.group(3), today)
+        if found:
+            return found
+    match = _RELATIVE_DAY.search(text)
+    if match:
+        offset = {"today": 0, "tomorrow": 1, "day after tomorrow": 2}[match.group(1).lower()]
+        return today + timedelta(days=offset)
+    match = _WEEKDAY.search(text)
+    if match:
+        days_ahead = (WEEKDAYS.index(DAY_ALIASES[match.group(2).lower()]) - today.weekday()) % 7
+        if match.group(1) and match.group(1).lower().startswith("next") and days_ahead == 0:
+            days_ahead = 7
+        return today + timedelta(days=days_ahead)
+    return None
+
+
+def parse_time(text):
+    """'10 AM', '2:30pm', '14:00' -> minutes after midnight, or None"""
+    match = _CLOCK_12.search(text)
+    if match:
+        return parse_clock(match.group(0))
+    match = _CLOCK_24.search(text)
+    if match:
+        return int(match.group(1)) * 60 + int(match.group(2))
+    return None
+
+
+def match_doctors(text, directory):
+    """Doctors named in the text, tolerating 'Dr'/'Dr.' and small spelling mistakes"""
+    segment = _DOCTOR_PART.search(text)
+    segment = segment.group(1) if segment else text
+    votes = {}
+    for word in _NAME_WORDS.findall(segment.lower()):
+        if len(word) < 3 or word in _NOT_NAMES:
+            continue
+        close = difflib.get_close_matches(word, directory.by_name_token, n=1, cutoff=0.8)
+        for doctor in directory.by_name_token.get(close[0], []) if close else []:
+            votes[doctor.name] = votes.get(doctor.name, 0) + 1
+    if votes:
+        best = max(votes.values())
+        return [d for d in directory.doctors if votes.get(d.name) == best]
+    specialty = directory.match_specialty(segment)
+    return list(directory.by_specialty.get(specialty, [])) if specialty else []
+
+
+def parse_booking(text, directory=None, today=None):
+    """Pull doctor candidates, date, start time, patient name and email out of a request"""
+    directory = directory or get_doctor_directory()
+    email = _EMAIL.search(text)
+    without_email = _EMAIL.sub(" ", text)
+
+    patient, doctor_text = None, without_email
+    for match in _PATIENT.finditer(without_email):
+        words = match.group(1).split()
+        # stop at the first word that clearly isn't part of a name
+        name = []
+        for word in words:
+            if word.lower() in _NOT_PATIENT or word.lower() in _NOT_NAMES:
+                break
+            name.append(word)
+        if name:
+            patient = " ".join(w.capitalize() for w in name)
+            # the patient's name mustn't count as a mention of a doctor
+            doctor_text = without_email[:match.start()] + without_email[match.end():]
+            break
+
+    return {
+        "doctors": match_doctors(doctor_text, directory),
+        "date": parse_date(without_email, today),
+        "start": parse_time(without_email),
+        "patient": patient,
+        "email": email.group(0) if email else None,
+    }
+
+
+# ---- Ledger ----
+class BookingError(Exception):
+    """A booking that can't be made, with a message fit to show the user"""
+
+
+@dataclass
+class Booking:
+    id: int
+    doctor: str
+    day: date
+    start: int
+    end: int
+    patient: str
+    email: str
+
+    def describe(self):
+        return (f"{self.patient} with {self.doctor} on {self.day.strftime('%a %d %b %Y')}, "
+                f"{format_clock(self.start)} - {format_clock(self.end)}")
+
+
+class AppointmentLedger:
+    """Bookings in SQLite, indexed by (doctor, day, start).
+
+    Booked intervals for one doctor on one day never overlap, so the only
+    booking that can clash with [start, end) is the one with the latest
+    start before `end`; finding it is a single index seek. Each reservation
+    runs in a BEGIN IMMEDIATE transaction, which serialises writers across
+    threads and processes, and WAL mode keeps readers unblocked meanwhile.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS appointments (
+            id INTEGER PRIMARY KEY,
+            doctor TEXT NOT NULL,
+            day TEXT NOT NULL,
+            start INTEGER NOT NULL,
+            end INTEGER NOT NULL,
+            patient TEXT NOT NULL,
+            email TEXT,
+            status TEXT NOT NULL DEFAULT 'booked',
+            created_at TEXT NOT NULL
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS appointments_slot
+            ON appointments (doctor, day, start) WHERE status = 'booked';
+    """
+
+    def __init__(self, path=LEDGER_PATH, directory=None):
+        self.path = path
+        self.directory = directory or get_doctor_directory()
+        self._db = ThreadLocalConnection(path)
+        self._connect().executescript(self.SCHEMA)
+
+    def _connect(self):
+        """This thread's connection to the database"""
+        return self._db.get()
+
+    def validate(self, doctor, day, start, end):
+        """Check the slot against the doctor's schedule in doctors.csv"""
+        weekday = WEEKDAYS[day.weekday()]
+        if weekday not in doctor.days:
+            raise BookingError(f"{doctor.name} doesn't see patients on {day:%A}s "
+                               f"(available {', '.join(doctor.days)}).")
+        if start < doctor.start or end > doctor.end:
+            raise BookingError(f"{doctor.name} is available {format_clock(doctor.start)} - "
+                               f"{format_clock(doctor.end)}; {format_clock(start)} is outside those hours.")
+
+    def _conflict(self, conn, doctor_name, day, start, end):
+        row = conn.execute(
+            "SELECT id, start, end FROM appointments INDEXED BY appointments_slot "
+            "WHERE doctor = ? AND day = ? AND status = 'booked' AND start < ? "
+            "ORDER BY start DESC LIMIT 1",
+            (doctor_name, day.isoformat(), end),
+        ).fetchone()
+        return row if row and row[2] > start else None
+
+    def book(self, doctor, day, start, patient, email=None, minutes=APPOINTMENT_MINUTES):
+        """Reserve [start, start + minutes) or raise BookingError"""
+        end = start + minutes
+        self.validate(doctor, day, start, end)
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            clash = self._conflict(conn, doctor.name, day, start, end)
+            if clash:
+                raise BookingError(f"{doctor.name} already has an appointment "
+                                   f"{format_clock(clash[1])} - {format_clock(clash[2])} on {day:%a %d %b}.")
+            cursor = conn.execute(
+                "INSERT INTO appointments (doctor, day, start, end, patient, email, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (doctor.name, day.isoformat(), start, end, patient, email, datetime.now().isoformat()),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return Booking(cursor.lastrowid, doctor.name, day, start, end, patient, email)
+
+    def first_free_slot(self, doctor, day, minutes=APPOINTMENT_MINUTES):
+        """Earliest start on `day` within the doctor's hours that fits `minutes`, or None"""
+        rows = self._connect().execute(
+            "SELECT start, end FROM appointments INDEXED BY appointments_slot "
+            "WHERE doctor = ? AND day = ? AND status = 'booked' ORDER BY start",
+            (doctor.name, day.isoformat()),
+        ).fetchall()
+        candidate = doctor.start
+        for booked_start, booked_end in rows:
+            if candidate + minutes <= booked_start:
+                break
+            candidate = max(candidate, booked_end)
+        return candidate if candidate + minutes <= doctor.end else None
+
+    def cancel(self, booking_id):
+        cursor = self._connect().execute(
+            "UPDATE appointments SET status = 'cancelled' WHERE id = ? AND status = 'booked'", (booking_id,))
+        return cursor.rowcount == 1
+
+    def bookings(self, doctor_name=None, day=None):
+        query = "SELECT id, doctor, day, start, end, patient, email FROM appointments WHERE status = 'booked'"
+        params = []
+        if doctor_name:
+            query += " AND doctor = ?"
+            params.append(doctor_name)
+        if day:
+            query += " AND day = ?"
+            params.append(day.isoformat())
+        rows = self._connect().execute(query + " ORDER BY doctor, day, start", params).fetchall()
+        return [Booking(r[0], r[1], date.fromisoformat(r[2]), r[3], r[4], r[5], r[6]) for r in rows]
+
+
+@lru_cache(maxsize=None)
+def get_ledger(path=LEDGER_PATH):
+    """One ledger (and schema check) per process"""
+    return AppointmentLedger(path)
+
+
+# ---- Appointment Scheduler ----
+def schedule_appointment(query, ledger=None, today=None):
+    """Parse a booking request, reserve the slot and queue a confirmation email"""
+    ledger = ledger or get_ledger()
+    today = today or date.today()
+    try:
+        request = parse_booking(query, ledger.directory, today)
+    except ValueError as e:
+        return f"❌ Could not parse appointment request: {str(e)}"
+
+    doctors = request["doctors"]
+    if not doctors:
+        return "❌ Which doctor would you like to see? e.g. 'Book an appointment with Dr. Ayesha Khan on 6 Oct at 10 AM for Ali, email ali@example.com'"
+    if len(doctors) > 1:
+        return "❌ Please pick one doctor: " + ", ".join(d.name for d in doctors)
+    doctor = doctors[0]
+    if request["date"] is None:
+        return f"❌ Which day? {doctor.name} is available {', '.join(doctor.days)}."
+    if request["date"] < today:
+        return "❌ That date has already passed."
+    if not request["patient"]:
+        return "❌ Who is the appointment for? Add 'for <patient name>'."
+
+    start = request["start"]
+    try:
+        if start is None:
+            start = ledger.first_free_slot(doctor, request["date"])
+            if start is None:
+                return f"❌ {doctor.name} is fully booked on {request['date']:%a %d %b}. Please try another day."
+        booking = ledger.book(doctor, request["date"], start, request["patient"], request["email"])
+    except BookingError as e:
+        return f"❌ {e}"
+
+    confirmation = f"✅ Appointment booked (#{booking.id}): {booking.describe()}."
+    if not booking.email:
+        return confirmation + " No email given, so no confirmation was sent."
+    email_status = send_email(booking.email, "Appointment Confirmation", confirmation)
+    return confirmation + " " + email_status
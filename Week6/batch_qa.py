@@ -0,0 +1,196 @@
+"""
+Batch question answering for the healthcare assistant
+
+Reads many questions from a CSV, JSONL or plain text file and streams one
+JSON line per question as soon as its answer is ready:
+
+    python batch_qa.py questions.csv -o answers.jsonl --concurrency 4 --rpm 60
+
+Each question takes the app's LLM-free paths first (the doctor directory,
+then the FAQ fast path) so it gets the same answer as in the app. Two
+things differ on purpose: a batch never books appointments, and the
+semantic answer cache is not used, since it lives in the app's process
+and the batch's own near-duplicate merge does that job across the file.
+
+--rpm gives the batch its own Gemini client with that rate limit
+(GEMINI_RPM otherwise).
+"""
+
+import sys
+import csv
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import os
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.llm_metrics import track_call
+from common.resilience import client_from_env, get_client
+from doctor_directory import get_doctor_directory
+from langchain_helper import (
+    create_vector_db, load_vector_db, get_embedding_model, get_retriever, get_llm, get_prompt,
+    answer_from_faq, faq_fast_path,
+)
+
+
+# ---- Input ----
+def read_questions(file_path):
+    """Questions from .csv (question/query/prompt column), .jsonl or one per line"""
+    questions = []
+    with open(file_path, newline="", encoding="utf-8") as f:
+        if file_path.endswith(".csv"):
+            reader = csv.DictReader(f)
+            column = next((c for c in ("question", "query", "prompt") if c in reader.fieldnames), reader.fieldnames[0])
+            questions = [row[column] for row in reader]
+        elif file_path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    questions.append(record.get("question") or record.get("query"))
+        else:
+            questions = [line for line in f]
+    return [q.strip() for q in questions if q and q.strip()]
+
+
+# ---- Deduplication ----
+def _normalize(text):
+    return " ".join(text.lower().split()).rstrip("?!. ")
+
+
+def deduplicate(questions, vectors, near_duplicate=0.95):
+    """Map each question to a canonical one.
+
+    Exact duplicates (ignoring case/spacing/punctuation at the end) are merged
+    first, then questions whose embeddings are within `near_duplicate` cosine
+    similarity of an earlier canonical question.
+    Returns (canonical indexes, {question index: canonical index}).
+    """
+    canonical = []
+    assignment = {}
+    seen_text = {}
+    for i, question in enumerate(questions):
+        key = _normalize(question)
+        if key in seen_text:
+            assignment[i] = seen_text[key]
+            continue
+        if canonical:
+            scores = vectors[canonical] @ vectors[i]
+            best = int(np.argmax(scores))
+            if scores[best] >= near_duplicate:
+                assignment[i] = canonical[best]
+                seen_text[key] = canonical[best]
+                continue
+        canonical.append(i)
+        assignment[i] = i
+        seen_text[key] = i
+    return canonical, assignment
+
+
+# ---- Batch Pipeline ----
+def answer_batch(questions, concurrency=4, per_minute=None, near_duplicate=0.95, k=10):
+    """Yield one result dict per input question, in completion order.
+
+    `per_minute` runs the batch on its own Gemini client with that rate
+    limit (0 = unlimited); None shares the process-wide GEMINI_RPM client.
+    """
+    if not questions:
+        return
+    create_vector_db()
+    vectordb = load_vector_db()
+    if vectordb.index.ntotal == 0:
+        raise ValueError("The knowledge base index is empty, nothing to retrieve from")
+    retriever = get_retriever(vectordb)
+    directory = get_doctor_directory()
+
+    # One vectorized embedding call and one matrix search for the whole batch
+    vectors = np.asarray(get_embedding_model().embed_documents(questions), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1, norms)
+
+    canonical, assignment = deduplicate(questions, vectors, near_duplicate)
+    followers = {}
+    for i, c in assignment.items():
+        followers.setdefault(c, []).append(i)
+
+    k = min(k, vectordb.index.ntotal)
+    distances, indexes = vectordb.index.search(vectors[canonical], k)
+
+    if per_minute is None:
+        client = get_client(os.environ["GOOGLE_API_KEY"])
+    else:
+        # A client of its own, so the batch's limit doesn't change the app's
+        client = client_from_env(rate_per_minute=per_minute)
+
+    def run(row):
+        i = canonical[row]
+        start = time.perf_counter()
+        answer = directory.answer(questions[i])
+        if answer is not None:
+            return i, answer, None, ["doctors.csv"], time.perf_counter() - start
+        answer, _ = answer_from_faq(questions[i], vector=vectors[i])
+        if answer is not None:
+            return i, answer, None, [faq_fast_path.file_path], time.perf_counter() - start
+
+        hits = [
+            (vectordb.docstore.search(vectordb.index_to_docstore_id[j]), float(d))
+            for j, d in zip(indexes[row], distances[row]) if j != -1
+        ]
+        if hasattr(retriever, "select"):
+            docs = retriever.select(questions[i], vector_hits=hits)
+        else:
+            docs = [doc for doc, _ in hits[:3]]
+
+        context = "\n\n".join(doc.page_content for doc in docs)
+        try:
+            with track_call("week6-batch", "gemini-2.5-flash") as call:
+                message = client.call(
+                    get_llm().invoke, get_prompt().format(context=context, question=questions[i]), tracker=call
+                )
+                call.set_usage(message)
+            answer, error = message.content, None
+        except Exception as e:
+            answer, error = None, f"{type(e).__name__}: {e}"
+        return i, answer, error, [doc.metadata.get("source") for doc in docs], time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(run, row) for row in range(len(canonical))]
+        for future in as_completed(futures):
+            i, answer, error, sources, latency = future.result()
+            for j in followers[i]:
+                yield {
+                    "index": j,
+                    "question": questions[j],
+                    "answer": answer,
+                    "error": error,
+                    "sources": sources,
+                    "duplicate_of": i if j != i else None,
+                    "latency_s": round(latency, 3),
+                }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="questions file (.csv, .jsonl or .txt)")
+    parser.add_argument("-o", "--output", help="write JSONL here instead of stdout")
+    parser.add_argument("--concurrency", type=int, default=4, help="parallel LLM calls")
+    parser.add_argument("--rpm", type=int, help="max LLM calls per minute (0 = unlimited, default GEMINI_RPM)")
+    parser.add_argument("--near-duplicate", type=float, default=0.95,
+                        help="cosine similarity above which questions share one answer")
+    args = parser.parse_args()
+
+    questions = read_questions(args.input)
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for result in answer_batch(questions, args.concurrency, args.rpm, args.near_duplicate):
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+import re
+import csv
+from functools import lru_cache
+from dataclasses import dataclass
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+DAY_ALIASES = {
+    "mon": "Mon", "monday": "Mon",
+    "tue": "Tue", "tues": "Tue", "tuesday": "Tue",
+    "wed": "Wed", "wednesday": "Wed",
+    "thu": "Thu", "thur": "Thu", "thurs": "Thu", "thursday": "Thu",
+    "fri": "Fri", "friday": "Fri",
+    "sat": "Sat", "saturday": "Sat",
+    "sun": "Sun", "sunday": "Sun",
+}
+# (start minute, end minute) of each part of the day
+DAY_PARTS = {
+    "morning": (6 * 60, 12 * 60),
+    "afternoon": (12 * 60, 17 * 60),
+    "evening": (17 * 60, 21 * 60),
+}
+# Lay terms that map onto a specialization keyword
+SPECIALTY_SYNONYMS = {
+    "heart": "cardio", "cardiac": "cardio",
+    "bone": "orthop", "joint": "orthop", "fracture": "orthop", "orthopaedic": "orthop",
+    "child": "pediatric", "children": "pediatric", "kids": "pediatric", "baby": "pediatric", "paediatric": "pediatric",
+    "skin": "dermatolog", "acne": "dermatolog",
+    "women": "gynecolog", "pregnancy": "gynecolog", "gynaecolog": "gynecolog",
+}
+
+_TIME = re.compile(r"(\d{1,2})(?::(\d{2}))?\s*(am|pm)", re.IGNORECASE)
+_WORDS = re.compile(r"[a-z]+")
+_AT_TIME = re.compile(r"\b(?:at|around|by)\s+(\d{1,2}(?::\d{2})?\s*(?:am|pm))", re.IGNORECASE)
+# Words of the hospital's own name, which must not be read as a doctor's name ("Aga Khan" vs Dr. Khan)
+_HOSPITAL_NAME = re.compile(r"\baga\s+khan\b", re.IGNORECASE)
+_DOCTOR_WORDS = re.compile(r"\b(doctors?|dr|specialists?|physicians?|consultants?)\b", re.IGNORECASE)
+# Words that ask about a doctor's schedule; "who", "any", "need" or "visit" alone don't
+_AVAILABILITY_WORDS = re.compile(
+    r"\b(available|availability|free|timings?|hours|schedule|slots?|days|contact|email)\b",
+    re.IGNORECASE,
+)
+# Policy questions ("Do I need an appointment to see ...?") are for the QA chain
+_POLICY_QUESTION = re.compile(r"\b(?:do|does|should|must)\s+(?:i|we|you)\s+need\b|\brequired\b", re.IGNORECASE)
+
+
+def parse_clock(text):
+    """'10 AM' / '2:30 pm' -> minutes after midnight"""
+    match = _TIME.search(text)
+    if not match:
+        raise ValueError(f"Unrecognized time: {text!r}")
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3).lower()
+    hour = hour % 12 + (12 if meridiem == "pm" else 0)
+    return hour * 60 + minute
+
+
+def parse_time_range(text):
+    """'10 AM - 2 PM' -> (600, 840)"""
+    start, end = text.split("-", 1)
+    return parse_clock(start), parse_clock(end)
+
+
+def parse_days(text):
+    """'Mon-Wed-Fri' -> ['Mon', 'Wed', 'Fri'], 'Mon-Fri' -> ['Mon', ..., 'Fri'].
+
+    Two days joined by a hyphen are a range; three or more are a list of
+    individual days.
+    """
+    days = [DAY_ALIASES[part.strip().lower()] for part in text.split("-") if part.strip()]
+    if len(days) == 2:
+        first, last = WEEKDAYS.index(days[0]), WEEKDAYS.index(days[1])
+        if first < last:
+            return WEEKDAYS[first:last + 1]
+    return days
+
+
+def format_clock(minutes):
+    hour, minute = divmod(minutes, 60)
+    suffix = "AM" if hour < 12 else "PM"
+    return f"{hour % 12 or 12}:{minute:02d} {suffix}" if minute else f"{hour % 12 or 12} {suffix}"
+
+
+def _specialty_key(specialization):
+    """'Cardiologist' -> 'cardiolog', 'Pediatrician' -> 'pediatric'"""
+    key = specialization.lower()
+    for suffix in ("ist", "ian", "ic"):
+        if key.endswith(suffix):
+            return key[: -len(suffix)]
+    return key
+
+
+@dataclass
+class Doctor:
+    name: str
+    specialization: str
+    days: list
+    start: int
+    end: int
+    contact: str
+
+    def is_available(self, day=None, start=None, end=None):
+        """Available on `day` at some point in [start, end) minutes"""
+        if day and day not in self.days:
+            return False
+        if start is not None:
+            end = start + 1 if end is None else end
+            return self.start < end and start < self.end
+        return True
+
+    def describe(self):
+        return (f"**{self.name}** ({self.specialization}) - {', '.join(self.days)}, "
+                f"{format_clock(self.start)} - {format_clock(self.end)}, {self.contact}")
+
+
+class DoctorDirectory:
+    """doctors.csv parsed once and indexed by specialization, weekday and hourly slot"""
+
+    def __init__(self, doctors):
+        self.doctors = list(doctors)
+        self.by_specialty = {}
+        self.by_day = {day: [] for day in WEEKDAYS}
+        self.by_slot = {}  # (day, hour) -> doctors working during that hour
+        self.by_name_token = {}
+        self.by_full_name = {}  # "ayesha khan" -> doctor
+
+        for doctor in self.doctors:
+            self.by_specialty.setdefault(_specialty_key(doctor.specialization), []).append(doctor)
+            for day in doctor.days:
+                self.by_day[day].append(doctor)
+                for hour in range(doctor.start // 60, (doctor.end + 59) // 60):
+                    self.by_slot.setdefault((day, hour), []).append(doctor)
+            tokens = [token for token in _WORDS.findall(doctor.name.lower()) if token != "dr"]
+            for token in tokens:
+                self.by_name_token.setdefault(token, []).append(doctor)
+            self.by_full_name[" ".join(tokens)] = doctor
+
+    @classmethod
+    def from_csv(cls, file_path="doctors.csv"):
+        doctors = []
+        with open(file_path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                start, end = parse_time_range(row["AvailableTime"])
+                doctors.append(Doctor(
+                    name=row["DoctorName"].strip(),
+                    specialization=row["Specialization"].strip(),
+                    days=parse_days(row["AvailableDays"]),
+                    start=start,
+                    end=end,
+                    contact=row["Contact"].strip(),
+                ))
+        return cls(doctors)
+
+    def find(self, specialty=None, day=None, start=None, end=None):
+        """Doctors matching every given filter, in CSV order"""
+        candidates = None
+        if specialty:
+            candidates = list(self.by_specialty.get(specialty, []))
+        if day:
+            if start is not None:
+                end = start + 1 if end is None else end
+                slot = {id(d) for h in range(start // 60, (end + 59) // 60) for d in self.by_slot.get((day, h), [])}
+            else:
+                slot = {id(d) for d in self.by_day[day]}
+            candidates = [d for d in (candidates if candidates is not None else self.doctors) if id(d) in slot]
+        if candidates is None:
+            candidates = self.doctors
+        return [d for d in candidates if d.is_available(day, start, end)]
+
+    def find_by_name(self, text):
+        """Doctors named in the text by full name or as "Dr. <name>".
+
+        A lone first or last name doesn't count, and the hospital's own name
+        is ignored, so "Aga Khan Hospital" doesn't pick Dr. Ayesha Khan.
+        """
+        words = " ".join(_WORDS.findall(_HOSPITAL_NAME.sub(" ", text).lower()))
+        found = [doctor for full_name, doctor in self.by_full_name.items()
+                 if re.search(rf"\b{full_name}\b", words)]
+        for token in re.findall(r"\bdr ([a-z]+)", words):
+            for doctor in self.by_name_token.get(token, []):
+                if doctor not in found:
+                    found.append(doctor)
+        return found
+
+    def match_specialty(self, text):
+        words = _WORDS.findall(text.lower())
+        for word in words:
+            key = SPECIALTY_SYNONYMS.get(word, word)
+            for specialty in self.by_specialty:
+                if key.startswith(specialty) or (specialty.startswith(key) and len(key) >= 5):
+                    return specialty
+        return None
+
+    def parse_query(self, text):
+        """Extract structured filters from a question, or None if it isn't a lookup.
+
+        Returns a dict with any of: doctors (named doctors), specialty, day,
+        start, end.
+        """
+        query = {}
+        named = self.find_by_name(text)
+        if named:
+            query["doctors"] = named
+
+        specialty = self.match_specialty(text)
+        if specialty:
+            query["specialty"] = specialty
+
+        words = _WORDS.findall(text.lower())
+        for word in words:
+            if word in DAY_ALIASES:
+                query["day"] = DAY_ALIASES[word]
+                break
+
+        at_time = _AT_TIME.search(text)
+        if at_time:
+            query["start"] = parse_clock(at_time.group(1))
+        else:
+            for part, (start, end) in DAY_PARTS.items():
+                if part in words:
+                    query["start"], query["end"] = start, end
+                    break
+
+        # Only availability questions about a particular doctor, specialty, day or
+        # time count as a lookup: "what does a cardiologist treat?", "visiting hours
+        # on Sunday?" or "any doctors available for an emergency?" go to the QA chain.
+        when = "day" in query or "start" in query
+        specific = "doctors" in query or "specialty" in query or (when and _DOCTOR_WORDS.search(text))
+        if specific and (when or _AVAILABILITY_WORDS.search(text)) and not _POLICY_QUESTION.search(text):
+            return query
+        return None
+
+    def answer(self, text):
+        """Answer a structured availability/lookup question, or None to fall through"""
+        query = self.parse_query(text)
+        if query is None:
+            return None
+
+        if "doctors" in query:
+            doctors = [d for d in query["doctors"]
+                       if d.is_available(query.get("day"), query.get("start"), query.get("end"))]
+            if not doctors:
+                names = ", ".join(d.name for d in query["doctors"])
+                return f"{names} is not available at that time. Usual schedule:\n\n" + \
+                    "\n".join(f"- {d.describe()}" for d in query["doctors"])
+        else:
+            doctors = self.find(query.get("specialty"), query.get("day"), query.get("start"), query.get("end"))
+            if not doctors:
+                return "No doctor matches that availability. Please try another day or time."
+
+        return "\n".join(f"- {d.describe()}" for d in doctors)
+
+
+@lru_cache(maxsize=None)
+def get_doctor_directory(file_path="doctors.csv"):
+    """Parse doctors.csv once per process"""
+    return DoctorDirectory.from_csv(file_path)
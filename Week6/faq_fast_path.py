@@ -0,0 +1,101 @@
+import csv
+import time
+import threading
+from collections import deque
+
+import numpy as np
+
+
+class FaqFastPath:
+    """Answers with a curated FAQ response when one FAQ prompt clearly matches.
+
+    The FAQ prompts are embedded once. A query is compared against all of
+    them and only answered here when the best match scores at least
+    `min_score` and beats the runner-up by `min_margin`; anything less
+    clear-cut is left to the LLM chain. The response is returned verbatim,
+    so nothing is paraphrased and no tokens are spent.
+    """
+
+    def __init__(self, embed_query, embed_documents, file_path="healthcare_faqs.csv",
+                 min_score=0.75, min_margin=0.1, window=1000):
+        self.embed_query = embed_query
+        self.embed_documents = embed_documents
+        self.file_path = file_path
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.hits = 0
+        self.misses = 0
+        self._hit_latencies = deque(maxlen=window)   # seconds to answer from the FAQ
+        self._miss_latencies = deque(maxlen=window)  # seconds the gate added before falling through
+        self._rows = None  # [(prompt, response)]
+        self._matrix = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Embed the FAQ prompts (once); returns (rows, normalized prompt vectors)"""
+        with self._lock:
+            if self._matrix is None:
+                with open(self.file_path, encoding="utf-8") as f:
+                    rows = [(row["prompt"], row["response"]) for row in csv.DictReader(f)]
+                vectors = np.asarray(self.embed_documents([prompt for prompt, _ in rows]), dtype=np.float32)
+                vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+                self._rows, self._matrix = rows, vectors
+        return self._rows, self._matrix
+
+    def clear(self):
+        """Forget the FAQ embeddings, e.g. after the CSV changed; reloaded on next use"""
+        with self._lock:
+            self._rows = self._matrix = None
+
+    def match(self, query, vector=None):
+        """Return (match, vector); match is None unless one FAQ clearly wins.
+
+        A match is a dict with the FAQ's prompt, response, score and margin.
+        The query vector is handed back so a fall-through can reuse it.
+        """
+        start = time.perf_counter()
+        rows, matrix = self.load()
+        if vector is None:
+            vector = np.asarray(self.embed_query(query), dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            vector = vector / norm if norm else vector
+
+        scores = matrix @ vector
+        order = np.argsort(scores)[::-1]
+        best = float(scores[order[0]])
+        margin = best - float(scores[order[1]]) if len(order) > 1 else best
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            if best >= self.min_score and margin >= self.min_margin:
+                self.hits += 1
+                self._hit_latencies.append(elapsed)
+                prompt, response = rows[order[0]]
+                return {"prompt": prompt, "response": response, "score": best, "margin": margin}, vector
+            self.misses += 1
+            self._miss_latencies.append(elapsed)
+        return None, vector
+
+    def answer(self, match):
+        """The FAQ response verbatim, with where it came from"""
+        return f'{match["response"]}\n\n📄 *Source: {self.file_path} - "{match["prompt"]}"*'
+
+    def stats(self, chain_p50_s=None):
+        """Bypass rate and per-path latency; `chain_p50_s` (the LLM path) turns hits into time saved"""
+        with self._lock:
+            hit_p50 = float(np.median(self._hit_latencies)) if self._hit_latencies else None
+            miss_p50 = float(np.median(self._miss_latencies)) if self._miss_latencies else None
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        saved = None
+        if chain_p50_s is not None and hit_p50 is not None:
+            saved = hits * max(0.0, chain_p50_s - hit_p50)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "bypass_rate": hits / total if total else 0.0,
+            "p50_hit_ms": None if hit_p50 is None else hit_p50 * 1000,
+            "p50_gate_overhead_ms": None if miss_p50 is None else miss_p50 * 1000,
+            "p50_chain_s": chain_p50_s,
+            "saved_s": saved,
+        }
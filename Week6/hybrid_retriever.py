@@ -0,0 +1,193 @@
+import os
+import re
+import json
+import math
+from typing import Any, List
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+BM25_TERMS_FILE = "bm25_terms.json"
+BM25_POSTINGS_FILE = "bm25_postings.npy"
+BM25_LENGTHS_FILE = "bm25_lengths.npy"
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "do", "does", "can", "i", "you", "your", "my", "me", "to", "of",
+    "for", "in", "on", "at", "and", "or", "what", "how", "which", "who", "with", "it", "be", "there",
+}
+
+
+def tokenize(text):
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 as postings lists, built from documents or memory-mapped from disk.
+
+    `terms` maps each term to (offset, count, idf) in `postings`, an (n, 2)
+    array of (doc index, term frequency) rows grouped by term. A saved index
+    loads only its vocabulary: postings and document lengths stay memory-mapped
+    and documents are fetched one at a time through `document(i)`.
+    """
+
+    def __init__(self, terms, postings, lengths, avg_length, document, k1=1.5, b=0.75):
+        self.terms = terms
+        self.postings = postings
+        self.lengths = lengths
+        self.avg_length = avg_length
+        self.document = document
+        self.k1 = k1
+        self.b = b
+
+    @classmethod
+    def build(cls, documents, k1=1.5, b=0.75):
+        documents = list(documents)
+        by_term = {}  # term -> [(doc index, term frequency)]
+        lengths = []
+        for i, doc in enumerate(documents):
+            tokens = tokenize(doc.page_content)
+            lengths.append(len(tokens))
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                by_term.setdefault(token, []).append((i, tf))
+
+        n = len(documents)
+        terms, rows = {}, []
+        for term, postings in by_term.items():
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            terms[term] = (len(rows), len(postings), idf)
+            rows.extend(postings)
+        return cls(
+            terms,
+            np.asarray(rows, dtype=np.int32).reshape(-1, 2),
+            np.asarray(lengths, dtype=np.int32),
+            sum(lengths) / n if n else 0.0,
+            documents.__getitem__,
+            k1,
+            b,
+        )
+
+    def save(self, directory):
+        np.save(os.path.join(directory, BM25_POSTINGS_FILE), self.postings)
+        np.save(os.path.join(directory, BM25_LENGTHS_FILE), self.lengths)
+        with open(os.path.join(directory, BM25_TERMS_FILE), "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "avg_length": self.avg_length, "terms": self.terms}, f)
+
+    @classmethod
+    def load(cls, directory, document):
+        """A saved index with `document(i)` to fetch documents, or None if none was saved"""
+        path = os.path.join(directory, BM25_TERMS_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            saved = json.load(f)
+        return cls(
+            saved["terms"],
+            np.load(os.path.join(directory, BM25_POSTINGS_FILE), mmap_mode="r"),
+            np.load(os.path.join(directory, BM25_LENGTHS_FILE), mmap_mode="r"),
+            saved["avg_length"],
+            document,
+            saved["k1"],
+            saved["b"],
+        )
+
+    def top(self, query, k):
+        """[(doc index, score)] of the `k` best documents sharing a query term, best first"""
+        docs, scores = [], []
+        for term in set(tokenize(query)):
+            entry = self.terms.get(term)
+            if entry is None:
+                continue
+            offset, count, idf = entry
+            rows = np.asarray(self.postings[offset:offset + count])
+            tf = rows[:, 1].astype(np.float64)
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[rows[:, 0]] / self.avg_length)
+            docs.append(rows[:, 0])
+            scores.append(idf * tf * (self.k1 + 1) / (tf + norm))
+        if not docs:
+            return []
+        ids, inverse = np.unique(np.concatenate(docs), return_inverse=True)
+        totals = np.bincount(inverse, weights=np.concatenate(scores))
+        best = np.argsort(-totals, kind="stable")[:k]
+        return [(int(ids[j]), float(totals[j])) for j in best]
+
+
+def document_list(vectordb):
+    """Documents of a FAISS store in index order, i.e. document i is FAISS row i"""
+    ids = vectordb.index_to_docstore_id
+    return [vectordb.docstore.search(ids[i]) for i in range(len(ids))]
+
+
+class HybridRetriever(BaseRetriever):
+    """Fuses BM25 keyword scores with FAISS similarity and keeps only relevant chunks.
+
+    Both score sets are scaled to [0, 1] and combined as
+    `alpha * vector + (1 - alpha) * bm25`. Documents are kept while their fused
+    score is at least `min_score` and within `relative_cutoff` of the best
+    match, up to `max_k` - so clear-cut questions send one chunk to the LLM
+    instead of a fixed three.
+    """
+
+    vectordb: Any
+    bm25: Any
+    fetch_k: int = 10
+    max_k: int = 3
+    alpha: float = 0.5
+    min_score: float = 0.3
+    relative_cutoff: float = 0.6
+
+    @classmethod
+    def from_vectordb(cls, vectordb, **kwargs):
+        """Use the BM25 index saved with the FAISS index, or build one from its docstore.
+
+        Building reads every document, so it is only the fallback for indexes
+        saved without one (and for in-memory vector stores).
+        """
+        bm25 = getattr(vectordb, "bm25", None)
+        if bm25 is None:
+            bm25 = BM25Index.build(document_list(vectordb))
+        return cls(vectordb=vectordb, bm25=bm25, **kwargs)
+
+    def fused_scores(self, query, vector_hits=None):
+        """[(document, fused score)] sorted best first.
+
+        `vector_hits` lets batch callers pass in [(document, distance)] from a
+        search they already ran, instead of searching FAISS per query.
+        """
+        if vector_hits is None:
+            vector_hits = self.vectordb.similarity_search_with_score(query, k=self.fetch_k)
+
+        candidates = {}
+        for doc, distance in vector_hits:
+            # MiniLM vectors are unit length, so squared L2 distance = 2 - 2 * cosine
+            similarity = 1.0 - float(distance) / 2.0
+            candidates[doc.page_content] = [doc, max(0.0, min(1.0, similarity)), 0.0]
+
+        best = self.bm25.top(query, self.fetch_k)
+        if best:
+            top = best[0][1]
+            for i, score in best:
+                doc = self.bm25.document(i)
+                entry = candidates.setdefault(doc.page_content, [doc, 0.0, 0.0])
+                entry[2] = score / top
+
+        fused = [(doc, self.alpha * vec + (1 - self.alpha) * kw) for doc, vec, kw in candidates.values()]
+        fused.sort(key=lambda item: item[1], reverse=True)
+        return fused
+
+    def select(self, query, vector_hits=None):
+        """Apply the relevance cutoff and adaptive k to the fused ranking"""
+        fused = self.fused_scores(query, vector_hits)
+        if not fused:
+            return []
+        threshold = max(self.min_score, fused[0][1] * self.relative_cutoff)
+        selected = [doc for doc, score in fused[: self.max_k] if score >= threshold]
+        # Always give the chain the single best match so it can still answer
+        return selected or [fused[0][0]]
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        return self.select(query)
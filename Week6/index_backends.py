@@ -0,0 +1,127 @@
+import os
+import json
+import math
+import mmap
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_community.docstore.base import Docstore
+
+# faiss is imported inside the functions that need it, so importing this
+# module stays cheap for the flat backend
+ANN_BACKENDS = ("ivf", "ivfpq", "hnsw")
+VECTORS_FILE = "vectors.f32"
+DOCSTORE_FILE = "docstore.jsonl"
+OFFSETS_FILE = "docstore.offsets.npy"
+INDEX_FILE = "index.faiss"
+
+# Below this many rows product quantization can't be trained properly
+# (faiss wants ~39 points per centroid for 256 centroids), so "ivfpq" builds IVF-Flat
+MIN_PQ_ROWS = 39 * 256
+
+
+class JsonlDocstore(Docstore):
+    """Read-only docstore over a JSONL file, one document per line.
+
+    Nothing is unpickled and documents are not held in memory: the file is
+    memory-mapped and each lookup decodes a single line using a
+    precomputed offsets array.
+    """
+
+    def __init__(self, directory, ids):
+        self._row = {doc_id: i for i, doc_id in enumerate(ids)}
+        self._offsets = np.load(os.path.join(directory, OFFSETS_FILE), mmap_mode="r")
+        with open(os.path.join(directory, DOCSTORE_FILE), "rb") as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(f.name) else b""
+
+    def search(self, search):
+        row = self._row.get(search)
+        if row is None:
+            return f"ID {search} not found."
+        record = json.loads(self._data[int(self._offsets[row]):int(self._offsets[row + 1])])
+        return Document(id=search, page_content=record["page_content"], metadata=record["metadata"])
+
+    def add(self, texts):
+        raise NotImplementedError("JsonlDocstore is read-only; rebuild the index instead")
+
+    def delete(self, ids):
+        raise NotImplementedError("JsonlDocstore is read-only; rebuild the index instead")
+
+
+def write_docstore(directory, ids, documents):
+    """Write documents as JSONL plus the byte offset of every line"""
+    offsets = [0]
+    with open(os.path.join(directory, DOCSTORE_FILE), "wb") as f:
+        for doc_id in ids:
+            doc = documents[doc_id]
+            line = json.dumps({"page_content": doc.page_content, "metadata": doc.metadata}, ensure_ascii=False)
+            f.write(line.encode("utf-8") + b"\n")
+            offsets.append(f.tell())
+    np.save(os.path.join(directory, OFFSETS_FILE), np.asarray(offsets, dtype=np.int64))
+
+
+def write_vectors(directory, vectors):
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    vectors.tofile(os.path.join(directory, VECTORS_FILE))
+
+
+def read_vectors(directory, dim):
+    """Raw vectors as a read-only memory map (nothing is loaded up front)"""
+    path = os.path.join(directory, VECTORS_FILE)
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return np.empty((0, dim), dtype=np.float32)
+    return np.memmap(path, dtype=np.float32, mode="r").reshape(-1, dim)
+
+
+def build_ann_index(vectors, backend):
+    """Train and fill an IVF, IVF-PQ or HNSW index over unit-length vectors (L2)"""
+    import faiss
+
+    n, dim = vectors.shape
+    if backend == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, 32)
+        index.hnsw.efConstruction = 80
+        index.add(vectors)
+        return index
+
+    nlist = max(1, min(int(4 * math.sqrt(n)), n // 39))
+    quantizer = faiss.IndexFlatL2(dim)
+    if backend == "ivfpq" and n >= MIN_PQ_ROWS:
+        # 8 dimensions per sub-quantizer: 384-d MiniLM vectors -> 48 bytes per vector
+        m = next(m for m in range(max(1, dim // 8), 0, -1) if dim % m == 0)
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, m, 8)
+    else:
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+    index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+def tune_search(index, nprobe=None, ef_search=None):
+    """Set query-time recall/speed knobs (INDEX_NPROBE / INDEX_EF_SEARCH)"""
+    import faiss
+
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = nprobe or int(os.getenv("INDEX_NPROBE", "0")) or max(1, ivf.nlist // 8)
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = ef_search or int(os.getenv("INDEX_EF_SEARCH", "64"))
+    return index
+
+
+def write_ann_index(directory, index):
+    import faiss
+
+    faiss.write_index(index, os.path.join(directory, INDEX_FILE))
+
+
+def read_ann_index(directory):
+    """Load the index memory-mapped where faiss supports it"""
+    import faiss
+
+    path = os.path.join(directory, INDEX_FILE)
+    try:
+        index = faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        index = faiss.read_index(path)
+    return tune_search(index)
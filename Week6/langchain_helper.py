@@ -1,61 +1,468 @@
-import os
-from dotenv import load_dotenv
-from langchain_community.vectorstores import FAISS
-from langchain_community.document_loaders import CSVLoader
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.prompts import PromptTemplate
-from langchain.chains import RetrievalQA
-
-load_dotenv()
-
-# ---- LLM Setup ----
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    google_api_key=os.environ["GOOGLE_API_KEY"],
-    temperature=0.1
-)
-
-embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-vectordb_file_path = "faiss_index"
-
-
-# ---- Vector DB ----
-def create_vector_db():
-    loaders = [
-        CSVLoader(file_path="healthcare_faqs.csv", source_column="prompt"),
-        CSVLoader(file_path="doctors.csv", source_column="DoctorName")
-    ]
-    all_data = []
-    for loader in loaders:
-        all_data.extend(loader.load())
-
-    vectordb = FAISS.from_documents(all_data, embedding=embedding_model)
-    vectordb.save_local(vectordb_file_path)
-
-
-def get_qa_chain():
-    vectordb = FAISS.load_local(
-        vectordb_file_path,
-        embedding_model,
-        allow_dangerous_deserialization=True
-    )
-    retriever = vectordb.as_retriever(search_kwargs={"k": 3})
-
-    prompt_template = """You are a helpful healthcare assistant.
-    Use the context below to answer the question.
-    If answer is not found, just say "I don't know."
-
-    CONTEXT: {context}
-    QUESTION: {question}"""
-
-    PROMPT = PromptTemplate(template=prompt_template, input_variables=["context", "question"])
-
-    return RetrievalQA.from_chain_type(
-        llm=llm,
-        chain_type="stuff",
-        retriever=retriever,
-        input_key="query",
-        return_source_documents=True,
-        chain_type_kwargs={"prompt": PROMPT}
-    )
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import hashlib
+import threading
+import numpy as np
+from dotenv import load_dotenv
+from langchain_community.vectorstores import FAISS
+from langchain_community.document_loaders import CSVLoader
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.startup_profiler import profiler, warm_in_background
+from common.llm_metrics import track_call, langchain_usage_callback
+from common.resilience import get_client
+from common import mock_llm
+from semantic_cache import SemanticCache
+from faq_fast_path import FaqFastPath
+from hybrid_retriever import BM25Index, HybridRetriever, document_list
+import index_backends
+
+# Heavy clients (Gemini, sentence-transformers/torch) are imported and built on
+# first use by get_llm() / get_embedding_model(), not at import time.
+
+load_dotenv()
+
+vectordb_file_path = "faiss_index"
+manifest_file_name = "manifest.json"
+
+# (csv file, source column) pairs that make up the knowledge base
+csv_sources = [
+    ("healthcare_faqs.csv", "prompt"),
+    ("doctors.csv", "DoctorName"),
+]
+
+# "flat" (exact, pickled by LangChain) or one of "ivf", "ivfpq", "hnsw"
+# (approximate, memory-mapped vectors/index and a JSONL docstore)
+index_backend = os.getenv("INDEX_BACKEND", "flat")
+
+# "huggingface" (sentence-transformers on PyTorch) or "onnx" (onnxruntime,
+# int8-quantized unless ONNX_QUANTIZE=0; exported to ONNX_MODEL_DIR on first use)
+embeddings_backend = os.getenv("EMBEDDINGS_BACKEND", "huggingface")
+
+# "hybrid" (BM25 + vectors, adaptive k) or "vector" (plain FAISS, k=3)
+retriever_mode = os.getenv("RETRIEVER_MODE", "hybrid")
+
+prompt_template = """You are a helpful healthcare assistant.
+    Use the context below to answer the question.
+    If answer is not found, just say "I don't know."
+
+    CONTEXT: {context}
+    QUESTION: {question}"""
+
+_prompt = None
+
+
+def get_prompt():
+    """QA prompt; langchain_core.prompts drags in transformers, so it's built on first use"""
+    global _prompt
+    if _prompt is None:
+        with profiler.step("import langchain.prompts"):
+            from langchain.prompts import PromptTemplate
+        _prompt = PromptTemplate(template=prompt_template, input_variables=["context", "question"])
+    return _prompt
+
+
+# ---- Shared Resources ----
+# Streamlit re-runs main.py per session, but this module is imported once per
+# process, so everything below is shared read-only by all sessions.
+_init_lock = threading.RLock()
+_index_write_lock = threading.RLock()
+_embedding_model = None
+_llm = None
+_warm_thread = None
+_qa_state = None  # (chain, index_version), swapped as one reference
+index_version = 0
+
+
+def get_embedding_model():
+    """Load the MiniLM embedding model (EMBEDDINGS_BACKEND) once per process"""
+    global _embedding_model
+    if _embedding_model is None:
+        with _init_lock:
+            if _embedding_model is None and embeddings_backend == "onnx":
+                with profiler.step("load MiniLM ONNX model"):
+                    from onnx_embeddings import load_onnx_embeddings
+                    _embedding_model = load_onnx_embeddings()
+            if _embedding_model is None:
+                with profiler.step("import langchain_huggingface"):
+                    from langchain_huggingface import HuggingFaceEmbeddings
+                with profiler.step("load MiniLM embedding model"):
+                    _embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    return _embedding_model
+
+
+# ---- LLM Setup ----
+def get_llm():
+    """Build the Gemini chat client once per process"""
+    global _llm
+    if _llm is None:
+        with _init_lock:
+            if _llm is None and mock_llm.is_enabled():
+                # LLM_BACKEND=mock: deterministic offline model for benchmarks
+                _llm = mock_llm.get_mock_chat_model()
+            if _llm is None:
+                with profiler.step("import langchain_google_genai"):
+                    from langchain_google_genai import ChatGoogleGenerativeAI
+                endpoint = os.getenv("GEMINI_API_ENDPOINT")  # e.g. common/fake_gemini_server.py
+                endpoint_options = {"transport": "rest", "client_options": {"api_endpoint": endpoint}} if endpoint else {}
+                with profiler.step("init Gemini chat client"):
+                    _llm = ChatGoogleGenerativeAI(
+                        model="gemini-2.5-flash",
+                        google_api_key=os.environ["GOOGLE_API_KEY"],
+                        temperature=0.1,
+                        **endpoint_options
+                    ).bind(retry=None)  # no hidden SDK retries on top of common.resilience
+    return _llm
+
+
+def warm_up():
+    """Load the model, LLM client and QA chain in a background thread (once)"""
+    global _warm_thread
+    with _init_lock:
+        if _warm_thread is None:
+            _warm_thread = warm_in_background(
+                "langchain-helper-warmup", get_embedding_model, get_llm, get_shared_qa_chain, faq_fast_path.load
+            )
+    return _warm_thread
+
+
+def _get_qa_state():
+    state = _qa_state
+    if state is None:
+        reload_qa_chain()
+        state = _qa_state
+    return state
+
+
+def get_shared_qa_chain():
+    """Return the process-wide QA chain, building the index on first use"""
+    return _get_qa_state()[0]
+
+
+def reload_qa_chain(force=False):
+    """Update the index on disk and atomically swap in a new QA chain.
+
+    Queries already running keep the chain they started with, so a reload
+    never blocks them. Returns True when a new chain was swapped in.
+    """
+    global _qa_state, index_version
+    with _index_write_lock:
+        changed = create_vector_db(force=force)
+        if not changed and _qa_state is not None:
+            return False
+        new_chain = get_qa_chain()
+        index_version += 1
+        _qa_state = (new_chain, index_version)
+        answer_cache.clear(version=index_version)
+        faq_fast_path.clear()
+        return True
+
+
+# ---- Semantic Answer Cache ----
+answer_cache = SemanticCache(
+    embed_query=lambda text: get_embedding_model().embed_query(text),
+    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92")),
+    max_entries=int(os.getenv("SEMANTIC_CACHE_SIZE", "256")),
+    ttl_seconds=float(os.getenv("SEMANTIC_CACHE_TTL", "3600")),
+)
+
+
+# ---- FAQ Fast Path ----
+# Questions that clearly match one row of healthcare_faqs.csv get its curated
+# response verbatim, skipping the cache and the LLM; FAQ_FAST_PATH=0 turns it off
+faq_fast_path_enabled = os.getenv("FAQ_FAST_PATH", "1") != "0"
+faq_fast_path = FaqFastPath(
+    embed_query=lambda text: get_embedding_model().embed_query(text),
+    embed_documents=lambda texts: get_embedding_model().embed_documents(texts),
+    file_path=csv_sources[0][0],
+    min_score=float(os.getenv("FAQ_MIN_SCORE", "0.75")),
+    min_margin=float(os.getenv("FAQ_MIN_MARGIN", "0.1")),
+)
+
+
+def answer_from_faq(query, vector=None):
+    """Return (answer, vector): the FAQ answer or None, plus the query vector for answer_query"""
+    if not faq_fast_path_enabled:
+        return None, vector
+    match, vector = faq_fast_path.match(query, vector=vector)
+    return (faq_fast_path.answer(match) if match else None), vector
+
+
+def answer_query(query, vector=None):
+    """Answer a question, serving near-duplicate questions from the cache"""
+    cached, vector = answer_cache.lookup(query, vector=vector)
+    if cached is not None:
+        return cached
+
+    chain, version = _get_qa_state()
+    with track_call("week6-qa", "gemini-2.5-flash") as call:
+        # Retrieval is included in the latency; tokens come from the LLM callback.
+        # Retrying the whole chain re-runs retrieval too, which costs milliseconds.
+        answer = get_client(os.environ["GOOGLE_API_KEY"]).call(
+            chain.invoke, {"query": query}, config={"callbacks": [langchain_usage_callback(call)]}, tracker=call
+        )["result"]
+    answer_cache.store(query, answer, vector=vector, version=version)
+    return answer
+
+
+# ---- Index Manifest ----
+def _file_hash(file_path):
+    """Hash the raw bytes of a CSV so unchanged files can be skipped"""
+    with open(file_path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _row_ids(file_path, docs):
+    """Stable per-row ids derived from the file name and the row content"""
+    ids = []
+    seen = {}
+    for doc in docs:
+        digest = hashlib.sha256(f"{file_path}\n{doc.page_content}".encode("utf-8")).hexdigest()
+        # identical rows in the same file still need distinct ids
+        seen[digest] = seen.get(digest, 0) + 1
+        ids.append(digest if seen[digest] == 1 else f"{digest}-{seen[digest]}")
+    return ids
+
+
+def load_manifest(index_path=None):
+    """Load the manifest written next to the FAISS index, if any"""
+    manifest_path = os.path.join(index_path or vectordb_file_path, manifest_file_name)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _embeddings_id():
+    """Which embedding model produced the vectors; mixing two in one index breaks search"""
+    if embeddings_backend == "onnx":
+        return "onnx-fp32" if os.getenv("ONNX_QUANTIZE", "1") == "0" else "onnx-int8"
+    return embeddings_backend
+
+
+def _write_manifest(directory, file_hashes, row_ids, backend, **extra):
+    manifest = {"files": file_hashes, "rows": list(row_ids), "backend": backend,
+                "embeddings": _embeddings_id(), **extra}
+    with open(os.path.join(directory, manifest_file_name), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+
+def _swap_into_place(tmp_path):
+    """Point faiss_index at a fully written temp dir.
+
+    faiss_index is a symlink to a versioned directory (faiss_index.v<ns>),
+    switched by a single os.replace of a new link. At every moment it names
+    a complete index, so a crash mid-swap leaves the previous one in place,
+    and concurrent writers cannot interleave files inside it.
+    """
+    version_path = f"{vectordb_file_path}.v{time.time_ns()}"
+    os.replace(tmp_path, version_path)
+    link_path = f"{tmp_path}.link"
+    try:
+        os.symlink(os.path.basename(version_path), link_path)
+    except OSError:
+        # No symlinks here (e.g. Windows without developer mode): swap the
+        # directories; _recover_index puts the old one back after a crash
+        old_path = f"{tmp_path}.old"
+        if os.path.exists(vectordb_file_path):
+            os.replace(vectordb_file_path, old_path)
+        os.replace(version_path, vectordb_file_path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        return
+
+    previous = None
+    if os.path.islink(vectordb_file_path):
+        previous = os.path.realpath(vectordb_file_path)
+    elif os.path.isdir(vectordb_file_path):
+        # An index saved before the symlink layout; moved aside once
+        previous = f"{vectordb_file_path}.v0"
+        os.replace(vectordb_file_path, previous)
+    os.replace(link_path, vectordb_file_path)
+    if previous:
+        shutil.rmtree(previous, ignore_errors=True)
+
+
+def _recover_index():
+    """Bring faiss_index back if a crash interrupted a swap, and drop versions a crash left behind"""
+    versions = sorted(glob.glob(f"{glob.escape(vectordb_file_path)}.v*"), key=os.path.getmtime)
+    if os.path.exists(vectordb_file_path):
+        if os.path.islink(vectordb_file_path):
+            current = os.path.realpath(vectordb_file_path)
+            # Only older ones: a newer version may be another process's swap in progress
+            for path in versions:
+                if os.path.getmtime(path) < os.path.getmtime(current) and os.path.realpath(path) != current:
+                    shutil.rmtree(path, ignore_errors=True)
+        return
+    moved_aside = glob.glob(f"{glob.escape(vectordb_file_path)}.tmp-*.old")
+    if versions:
+        link_path = f"{vectordb_file_path}.recover-link"
+        os.symlink(os.path.basename(versions[-1]), link_path)
+        os.replace(link_path, vectordb_file_path)
+    elif moved_aside:
+        os.replace(max(moved_aside, key=os.path.getmtime), vectordb_file_path)
+
+
+def _tmp_index_path():
+    return f"{vectordb_file_path}.tmp-{os.getpid()}-{threading.get_ident()}"
+
+
+def _save_index(vectordb, file_hashes, row_ids):
+    """Write a flat LangChain index + manifest and swap it into place"""
+    tmp_path = _tmp_index_path()
+    vectordb.save_local(tmp_path)
+    BM25Index.build(document_list(vectordb)).save(tmp_path)
+    _write_manifest(tmp_path, file_hashes, sorted(row_ids), "flat")
+    _swap_into_place(tmp_path)
+
+
+def _save_ann_index(documents, file_hashes, manifest):
+    """Write an approximate (IVF / IVF-PQ / HNSW) index without pickles.
+
+    Vectors of unchanged rows are copied from the previous vectors.f32, so
+    only new or changed rows are embedded; the ANN structure itself is
+    retrained, which is cheap compared to embedding.
+    """
+    ids = list(documents)
+    old_rows = manifest["rows"] if manifest else []
+    old_vectors = index_backends.read_vectors(vectordb_file_path, manifest["dim"]) if manifest else None
+    old_position = {doc_id: i for i, doc_id in enumerate(old_rows)}
+
+    new_ids = [doc_id for doc_id in ids if doc_id not in old_position]
+    new_vectors = get_embedding_model().embed_documents([documents[doc_id].page_content for doc_id in new_ids])
+    new_vectors = dict(zip(new_ids, np.asarray(new_vectors, dtype=np.float32)))
+    dim = manifest["dim"] if manifest else len(next(iter(new_vectors.values())))
+
+    vectors = np.empty((len(ids), dim), dtype=np.float32)
+    for row, doc_id in enumerate(ids):
+        vectors[row] = new_vectors[doc_id] if doc_id in new_vectors else old_vectors[old_position[doc_id]]
+
+    tmp_path = _tmp_index_path()
+    os.makedirs(tmp_path, exist_ok=True)
+    index_backends.write_vectors(tmp_path, vectors)
+    index_backends.write_docstore(tmp_path, ids, documents)
+    BM25Index.build(documents[doc_id] for doc_id in ids).save(tmp_path)
+    index_backends.write_ann_index(tmp_path, index_backends.build_ann_index(vectors, index_backend))
+    _write_manifest(tmp_path, file_hashes, ids, index_backend, dim=dim)
+    _swap_into_place(tmp_path)
+
+
+# ---- Vector DB ----
+def load_documents():
+    """Load every CSV row as a document, keyed by its content hash"""
+    documents = {}
+    for file_path, source_column in csv_sources:
+        docs = CSVLoader(file_path=file_path, source_column=source_column).load()
+        documents.update(zip(_row_ids(file_path, docs), docs))
+    return documents
+
+
+def create_vector_db(force=False):
+    """Bring the FAISS index in line with the CSVs, embedding only new or changed rows.
+
+    Returns True when the index on disk was modified.
+    """
+    with _index_write_lock:
+        _recover_index()
+        return _update_vector_db(force)
+
+
+def _update_vector_db(force):
+    file_hashes = {file_path: _file_hash(file_path) for file_path, _ in csv_sources}
+    manifest = None if force else load_manifest()
+    if manifest and (manifest.get("backend", "flat") != index_backend
+                     or manifest.get("embeddings", "huggingface") != _embeddings_id()):
+        manifest = None  # switching index or embedding backends means a full rebuild
+
+    if manifest and manifest.get("files") == file_hashes:
+        return False
+
+    documents = load_documents()
+    if not documents:
+        raise ValueError(f"No rows to index in {', '.join(f for f, _ in csv_sources)}")
+    if index_backend in index_backends.ANN_BACKENDS:
+        _save_ann_index(documents, file_hashes, manifest)
+        return True
+
+    embedding_model = get_embedding_model()
+
+    if not manifest:
+        vectordb = FAISS.from_documents(
+            list(documents.values()), embedding=embedding_model, ids=list(documents.keys())
+        )
+    else:
+        indexed = set(manifest.get("rows", []))
+        added = [doc_id for doc_id in documents if doc_id not in indexed]
+        removed = [doc_id for doc_id in indexed if doc_id not in documents]
+
+        vectordb = FAISS.load_local(
+            vectordb_file_path,
+            embedding_model,
+            allow_dangerous_deserialization=True
+        )
+        if removed:
+            vectordb.delete(removed)
+        if added:
+            vectordb.add_documents([documents[doc_id] for doc_id in added], ids=added)
+
+    _save_index(vectordb, file_hashes, documents.keys())
+    return True
+
+
+def get_retriever(vectordb, mode=None):
+    mode = mode or retriever_mode
+    if mode == "vector":
+        return vectordb.as_retriever(search_kwargs={"k": 3})
+    return HybridRetriever.from_vectordb(vectordb)
+
+
+def load_vector_db():
+    with profiler.step("load FAISS index"):
+        return _load_vector_db()
+
+
+def _load_vector_db():
+    _recover_index()
+    # Resolve the faiss_index link once, so every file comes from the same version
+    directory = os.path.realpath(vectordb_file_path)
+    manifest = load_manifest(directory)
+    if manifest and manifest.get("backend", "flat") in index_backends.ANN_BACKENDS:
+        rows = manifest["rows"]
+        vectordb = FAISS(
+            embedding_function=get_embedding_model(),
+            index=index_backends.read_ann_index(directory),
+            docstore=index_backends.JsonlDocstore(directory, rows),
+            index_to_docstore_id=dict(enumerate(rows)),
+        )
+    else:
+        vectordb = FAISS.load_local(
+            directory,
+            get_embedding_model(),
+            allow_dangerous_deserialization=True
+        )
+    # The hybrid retriever's keyword index, memory-mapped from the same directory
+    # (None for indexes saved before it was written; it is then built on demand)
+    vectordb.bm25 = BM25Index.load(
+        directory, lambda i: vectordb.docstore.search(vectordb.index_to_docstore_id[i])
+    )
+    return vectordb
+
+
+def get_qa_chain(mode=None):
+    with profiler.step("import langchain.chains"):
+        from langchain.chains import RetrievalQA
+
+    vectordb = load_vector_db()
+    retriever = get_retriever(vectordb, mode)
+
+    return RetrievalQA.from_chain_type(
+        llm=get_llm(),
+        chain_type="stuff",
+        retriever=retriever,
+        input_key="query",
+        return_source_documents=True,
+        chain_type_kwargs={"prompt": get_prompt()}
+    )
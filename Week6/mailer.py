@@ -0,0 +1,273 @@
+import os
+import sys
+import time
+import uuid
+import base64
+import queue
+import random
+import logging
+import socket
+import smtplib
+import threading
+from collections import OrderedDict
+from email.mime.text import MIMEText
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.resilience import is_retryable
+
+logger = logging.getLogger(__name__)
+
+# Gmail API Scope
+SCOPES = ["https://www.googleapis.com/auth/gmail.send"]
+
+_gmail_lock = threading.Lock()
+_gmail_creds = None
+_gmail_local = threading.local()
+
+
+class GmailAuthError(RuntimeError):
+    """No usable token.json, and the browser login may only run via login_gmail()"""
+
+
+# ---- Gmail API Authentication ----
+def gmail_authenticate(interactive=False):
+    """Return a Gmail client for the calling thread.
+
+    token.json is read only once and the credentials are shared, refreshed
+    in place when they expire. The discovery client is built once per thread,
+    because its httplib2 transport must not be used from several threads.
+    The browser OAuth flow only runs when `interactive` is set; otherwise a
+    missing or revoked token raises GmailAuthError straight away.
+    """
+    # The Google client libraries take a while to import, so only Gmail sends pay for them
+    from googleapiclient.discovery import build
+    from google.oauth2.credentials import Credentials
+    from google.auth.transport.requests import Request
+    from google_auth_oauthlib.flow import InstalledAppFlow
+
+    global _gmail_creds
+    with _gmail_lock:
+        creds = _gmail_creds
+        if creds is None and os.path.exists("token.json"):
+            creds = Credentials.from_authorized_user_file("token.json", SCOPES)
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                creds.refresh(Request())
+            elif interactive:
+                flow = InstalledAppFlow.from_client_secrets_file("credentials.json", SCOPES)
+                creds = flow.run_local_server(port=0)
+            else:
+                raise GmailAuthError("Gmail is not authorised (no valid token.json); restart the app to log in")
+            with open("token.json", "w") as token:
+                token.write(creds.to_json())
+        _gmail_creds = creds
+    # A new login means new credentials, so rebuild the client for them
+    if getattr(_gmail_local, "creds", None) is not creds:
+        _gmail_local.service = build("gmail", "v1", credentials=creds)
+        _gmail_local.creds = creds
+    return _gmail_local.service
+
+
+_login_attempted = False
+
+
+def login_gmail():
+    """Log in to Gmail once per process if MAIL_TRANSPORT is gmail.
+
+    Call this on the main thread at startup: the OAuth flow may open a
+    browser, which must never happen on a background mail worker.
+    """
+    global _login_attempted
+    if _login_attempted or os.getenv("MAIL_TRANSPORT", "gmail").lower() != "gmail":
+        return
+    _login_attempted = True
+    try:
+        gmail_authenticate(interactive=True)
+    except Exception as e:
+        logger.warning("Gmail login failed, confirmation emails will not be sent: %s", e)
+
+
+def build_message(to_email, subject, body):
+    message = MIMEText(body)
+    message["to"] = to_email
+    message["subject"] = subject
+    return message
+
+
+# ---- Transports ----
+class GmailTransport:
+    """Sends through the Gmail API with the cached client"""
+
+    def send(self, to_email, subject, body):
+        service = gmail_authenticate()
+        raw = base64.urlsafe_b64encode(build_message(to_email, subject, body).as_bytes()).decode()
+        result = service.users().messages().send(userId="me", body={"raw": raw}).execute()
+        return result["id"]
+
+
+class SMTPTransport:
+    """Sends through a plain SMTP server, e.g. `python -m aiosmtpd -n` on localhost:1025"""
+
+    def __init__(self, host="localhost", port=1025):
+        self.host = host
+        self.port = port
+
+    def send(self, to_email, subject, body):
+        message = build_message(to_email, subject, body)
+        message["from"] = os.getenv("MAIL_SENDER", "noreply@localhost")
+        with smtplib.SMTP(self.host, self.port, timeout=10) as smtp:
+            smtp.send_message(message)
+        return message["Message-ID"] or uuid.uuid4().hex
+
+
+class FakeTransport:
+    """Records messages in memory, with optional latency and failure rate for load tests"""
+
+    def __init__(self, latency=0.0, failure_rate=0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send(self, to_email, subject, body):
+        if self.latency:
+            time.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            raise ConnectionError("fake transport failure")
+        message_id = uuid.uuid4().hex
+        with self._lock:
+            self.sent.append({"id": message_id, "to": to_email, "subject": subject, "body": body})
+        return message_id
+
+
+def get_transport():
+    """Pick the transport from MAIL_TRANSPORT (gmail, smtp or fake)"""
+    kind = os.getenv("MAIL_TRANSPORT", "gmail").lower()
+    if kind == "smtp":
+        return SMTPTransport(os.getenv("SMTP_HOST", "localhost"), int(os.getenv("SMTP_PORT", "1025")))
+    if kind == "fake":
+        return FakeTransport(latency=float(os.getenv("FAKE_MAIL_LATENCY", "0")))
+    return GmailTransport()
+
+
+def is_transient(exc):
+    """Worth retrying: network trouble, SMTP 4xx replies, HTTP 408/429/5xx.
+
+    Other 4xx errors (bad address, auth, malformed message) fail the same
+    way every time, so they are given up on straight away.
+    """
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    if isinstance(exc, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    # Network trouble only: other OSErrors (a missing credentials.json, no
+    # permission to write token.json) are configuration errors
+    if isinstance(exc, (ConnectionError, TimeoutError, socket.gaierror, socket.herror)):
+        return True
+    return is_retryable(exc)
+
+
+# ---- Outbound Queue ----
+class MailQueue:
+    """Background workers that send queued emails, retrying transient errors with backoff.
+
+    `enqueue` returns a job id straight away; the status of each job can be
+    looked up with `status(job_id)`. Only the newest `keep_finished` sent or
+    failed jobs are remembered, and failures are logged.
+    """
+
+    def __init__(self, transport, workers=1, max_retries=4, base_delay=1.0, max_delay=30.0,
+                 keep_finished=10000):
+        self.transport = transport
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.keep_finished = keep_finished
+        self._queue = queue.Queue()
+        self._pending = {}
+        self._finished = OrderedDict()
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        for i in range(workers):
+            threading.Thread(target=self._run, name=f"mail-worker-{i}", daemon=True).start()
+
+    def enqueue(self, to_email, subject, body):
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._pending[job_id] = "queued"
+        self._queue.put((job_id, to_email, subject, body))
+        return job_id
+
+    def status(self, job_id):
+        """queued, sent:<message id> or failed:<error>; None for unknown or long-finished jobs"""
+        with self._lock:
+            return self._pending.get(job_id) or self._finished.get(job_id)
+
+    def _finish(self, job_id, status):
+        with self._lock:
+            self._pending.pop(job_id, None)
+            self._finished[job_id] = status
+            while len(self._finished) > self.keep_finished:
+                self._finished.popitem(last=False)
+
+    def join(self):
+        """Block until every queued email has been sent or given up on"""
+        self._queue.join()
+
+    def stats(self):
+        return {"queued": self._queue.qsize(), "sent": self.sent, "failed": self.failed, "retries": self.retries}
+
+    def _run(self):
+        while True:
+            job_id, to_email, subject, body = self._queue.get()
+            try:
+                self._deliver(job_id, to_email, subject, body)
+            finally:
+                self._queue.task_done()
+
+    def _deliver(self, job_id, to_email, subject, body):
+        for attempt in range(self.max_retries + 1):
+            try:
+                message_id = self.transport.send(to_email, subject, body)
+                with self._lock:
+                    self.sent += 1
+                self._finish(job_id, f"sent:{message_id}")
+                return
+            except Exception as e:
+                if attempt == self.max_retries or not is_transient(e):
+                    with self._lock:
+                        self.failed += 1
+                    self._finish(job_id, f"failed:{e}")
+                    logger.error("Email %s to %s failed after %d attempt(s): %s", job_id[:8], to_email, attempt + 1, e)
+                    return
+                with self._lock:
+                    self.retries += 1
+                # Exponential backoff with full jitter
+                delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+                time.sleep(random.uniform(0, delay))
+
+
+_queue_lock = threading.Lock()
+_mail_queue = None
+
+
+def get_mail_queue():
+    """Process-wide mail queue, started on first use"""
+    global _mail_queue
+    if _mail_queue is None:
+        with _queue_lock:
+            if _mail_queue is None:
+                _mail_queue = MailQueue(get_transport(), workers=int(os.getenv("MAIL_WORKERS", "1")))
+    return _mail_queue
+
+
+# ---- Send Email ----
+def send_email(to_email, subject, body):
+    """Queue an email and return immediately"""
+    try:
+        job_id = get_mail_queue().enqueue(to_email, subject, body)
+        return f"📨 Appointment confirmation queued for {to_email}. (Job ID: {job_id[:8]})"
+    except Exception as e:
+        return f"❌ Email sending failed: {str(e)}"
@@ -1,86 +1,62 @@
-import os
-import base64
-import re
-from email.mime.text import MIMEText
-import streamlit as st
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
-
-from langchain_helper import create_vector_db, get_qa_chain
-
-# Gmail API Scope
-SCOPES = ["https://www.googleapis.com/auth/gmail.send"]
-
-
-# ---- Gmail API Authentication ----
-def gmail_authenticate():
-    creds = None
-    if os.path.exists("token.json"):
-        creds = Credentials.from_authorized_user_file("token.json", SCOPES)
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file("credentials.json", SCOPES)
-            creds = flow.run_local_server(port=0)
-        with open("token.json", "w") as token:
-            token.write(creds.to_json())
-    return build("gmail", "v1", credentials=creds)
-
-
-# ---- Send Email ----
-def send_email(to_email, subject, body):
-    try:
-        service = gmail_authenticate()
-        message = MIMEText(body)
-        message["to"] = to_email
-        message["subject"] = subject
-        raw = base64.urlsafe_b64encode(message.as_bytes()).decode()
-        body = {"raw": raw}
-        result = service.users().messages().send(userId="me", body=body).execute()
-        return f"✅ Appointment confirmation sent! Message ID: {result['id']}"
-    except Exception as e:
-        return f"❌ Email sending failed: {str(e)}"
-
-
-# ---- Appointment Scheduler ----
-def schedule_appointment(query):
-    try:
-        # Expected pattern: "... with Dr. XYZ on DATE for NAME, email EMAIL"
-        pattern = r"with (.*?) on (.*?) for (.*?), email (.*)"
-        match = re.search(pattern, query, re.IGNORECASE)
-
-        if not match:
-            return "❌ Could not understand appointment request. Please follow: 'with Dr. XYZ on DATE for NAME, email EMAIL'"
-
-        doctor_name, date, patient_name, email = match.groups()
-
-        confirmation = f"Appointment scheduled for {patient_name} with {doctor_name} on {date}."
-        email_status = send_email(email, "Appointment Confirmation", confirmation)
-
-        return confirmation + " " + email_status
-
-    except Exception as e:
-        return f"❌ Could not parse appointment request: {str(e)}"
-
-
-# ---- Streamlit UI ----
-st.set_page_config(page_title="Healthcare Agent", page_icon="🩺")
-st.title("🩺 Aga Khan Hospital Healthcare Assistant")
-
-if "chain" not in st.session_state:
-    create_vector_db()
-    st.session_state.chain = get_qa_chain()
-
-query = st.text_input("Ask me anything (FAQ, Doctor info, or Schedule appointment with [Doctor Name] on [Date] for [Patient Name], email [Your Email]):")
-
-if st.button("Submit") and query:
-    if "schedule appointment" in query.lower():
-        response = schedule_appointment(query)
-    else:
-        response = st.session_state.chain.invoke({"query": query})["result"]
-
-    st.write("### Response:")
-    st.write(response)
+import os
+import sys
+import streamlit as st
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.startup_profiler import profiler
+from common.llm_metrics import metrics, render_streamlit_panel
+
+with profiler.step("import langchain_helper"):
+    from langchain_helper import warm_up, reload_qa_chain, answer_cache, faq_fast_path
+with profiler.step("import query_router (appointments)"):
+    from query_router import route_query
+from mailer import login_gmail
+
+
+# ---- Streamlit UI ----
+st.set_page_config(page_title="Healthcare Agent", page_icon="🩺")
+st.title("🩺 Aga Khan Hospital Healthcare Assistant")
+
+# Shared by every session in this process. Loading starts in the background so
+# the page renders immediately; the first question waits only if it isn't done.
+warm_up()
+# Gmail's OAuth flow may open a browser, so it runs here (once per process), never on a mail worker
+with profiler.step("Gmail login"):
+    login_gmail()
+
+with st.sidebar:
+    if st.button("🔄 Reload knowledge base"):
+        if reload_qa_chain():
+            st.success("✅ Knowledge base updated.")
+        else:
+            st.info("Knowledge base is already up to date.")
+
+    cache_stats = answer_cache.stats()
+    st.caption(
+        f"Answer cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+        f"({cache_stats['hit_rate']:.0%}), threshold {cache_stats['threshold']}"
+    )
+
+    faq_stats = faq_fast_path.stats(chain_p50_s=metrics.summary("week6-qa")["p50_latency_s"])
+    if faq_stats["hits"] or faq_stats["misses"]:
+        saved = f", ~{faq_stats['saved_s']:.1f}s saved" if faq_stats["saved_s"] is not None else ""
+        gate = faq_stats["p50_gate_overhead_ms"]
+        st.caption(
+            f"FAQ fast path: {faq_stats['hits']} of {faq_stats['hits'] + faq_stats['misses']} answered "
+            f"without the LLM ({faq_stats['bypass_rate']:.0%}){saved}"
+            + (f"; the gate takes {gate:.1f} ms p50 on fall-through" if gate is not None else "")
+        )
+
+    st.header("📊 Statistics")
+    render_streamlit_panel(st, pipeline="week6-qa")
+
+    with st.expander("⏱️ Startup profile"):
+        st.dataframe(profiler.rows(), hide_index=True)
+
+query = st.text_input("Ask me anything (FAQ, Doctor info, or Book an appointment with [Doctor Name] on [Date] at [Time] for [Patient Name], email [Your Email]):")
+
+if st.button("Submit") and query:
+    response = route_query(query)
+
+    st.write("### Response:")
+    st.write(response)
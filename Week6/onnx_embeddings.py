@@ -0,0 +1,237 @@
+import os
+import time
+import queue
+import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# onnxruntime / tokenizers are imported when a model is loaded, and torch,
+# transformers and optimum only when a model has to be exported
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model_int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+MAX_SEQ_LENGTH = 256  # what sentence-transformers uses for MiniLM
+
+
+# ---- Export ----
+def _export_with_torch(model_name, directory):
+    """Plain torch.onnx.export, used when optimum isn't installed"""
+    import torch
+    from transformers import AutoModel
+
+    class LastHiddenState(torch.nn.Module):
+        """Plain tensors in and out, which is what the exporter wants"""
+
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask,
+                              token_type_ids=token_type_ids).last_hidden_state
+
+    model = AutoModel.from_pretrained(model_name).eval()
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    example = torch.randint(0, model.config.vocab_size, (2, 16))
+    with torch.no_grad():
+        torch.onnx.export(
+            LastHiddenState(model),
+            (example, torch.ones_like(example), torch.zeros_like(example)),
+            os.path.join(directory, MODEL_FILE),
+            input_names=names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={name: {0: "batch", 1: "sequence"} for name in names + ["last_hidden_state"]},
+            opset_version=17,
+            dynamo=False,
+        )
+
+
+def export_model(model_name=MODEL_NAME, output_dir="onnx_minilm"):
+    """Export the encoder to ONNX plus a dynamically int8-quantized copy.
+
+    Writes model.onnx, model_int8.onnx and tokenizer.json into `output_dir`,
+    building them in a temp dir first so a crash never leaves half a model.
+    """
+    from transformers import AutoTokenizer
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    tmp_dir = f"{output_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    try:
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+    except ImportError:
+        _export_with_torch(model_name, tmp_dir)
+    else:
+        ORTModelForFeatureExtraction.from_pretrained(model_name, export=True).save_pretrained(tmp_dir)
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(tmp_dir)
+
+    # Weights-only int8: activations stay float, so no calibration data is needed
+    quantize_dynamic(os.path.join(tmp_dir, MODEL_FILE), os.path.join(tmp_dir, QUANTIZED_MODEL_FILE),
+                     weight_type=QuantType.QInt8)
+
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.replace(tmp_dir, output_dir)
+    return output_dir
+
+
+# ---- Micro-batching ----
+class MicroBatcher:
+    """Coalesces concurrent single-item calls into one batched call.
+
+    Callers block on a future while one worker thread runs `batch_fn` over
+    everything queued so far (up to `max_batch`). With `max_wait_ms=0` a lone
+    request is never delayed; under load, requests that arrive while a batch
+    is running are picked up together by the next one.
+    """
+
+    def __init__(self, batch_fn, max_batch=32, max_wait_ms=0.0):
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def __call__(self, item):
+        future = Future()
+        self._queue.put((item, future))
+        return future.result()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.monotonic()
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                results = self.batch_fn([item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+# ---- Embeddings ----
+class OnnxEmbeddings(Embeddings):
+    """MiniLM sentence embeddings on onnxruntime (CPU), no torch at query time.
+
+    Mean-pools the last hidden state over the attention mask and
+    L2-normalizes, like the sentence-transformers pipeline. Documents are
+    embedded in length-sorted batches to keep padding low; queries go
+    through a small LRU cache and then a MicroBatcher shared by all threads.
+    """
+
+    def __init__(self, model_dir="onnx_minilm", quantized=True, batch_size=32,
+                 cache_size=1024, max_wait_ms=0.0, threads=0):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.model_path = os.path.join(model_dir, QUANTIZED_MODEL_FILE if quantized else MODEL_FILE)
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(MAX_SEQ_LENGTH)
+        pad_id = self.tokenizer.token_to_id("[PAD]") or 0
+        self.tokenizer.enable_padding(pad_id=pad_id, pad_token="[PAD]")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = threads  # 0 = onnxruntime picks (one per physical core)
+        self.session = ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._cache = OrderedDict()  # query text -> vector (list of floats)
+        self._cache_lock = threading.Lock()
+        self._batcher = MicroBatcher(self._embed_batch, max_batch=batch_size, max_wait_ms=max_wait_ms)
+
+    def _embed_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": attention_mask,
+        }
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        hidden = self.session.run(None, feeds)[0]
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
+
+    def embed_documents(self, texts):
+        # Similar lengths in one batch means less padding to run through the model
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            chunk = order[start:start + self.batch_size]
+            for i, vector in zip(chunk, self._embed_batch([texts[i] for i in chunk])):
+                vectors[i] = vector.tolist()
+        return vectors
+
+    def embed_query(self, text):
+        with self._cache_lock:
+            vector = self._cache.get(text)
+            if vector is not None:
+                self._cache.move_to_end(text)
+                self.cache_hits += 1
+                return vector
+            self.cache_misses += 1
+
+        vector = self._batcher(text).tolist()
+        with self._cache_lock:
+            self._cache[text] = vector
+            self._cache.move_to_end(text)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return vector
+
+    def stats(self):
+        batches = self._batcher.batches
+        return {
+            "query_batches": batches,
+            "mean_query_batch": self._batcher.items / batches if batches else 0.0,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+        }
+
+
+def load_onnx_embeddings(model_dir=None, quantized=None, model_name=MODEL_NAME):
+    """OnnxEmbeddings configured from the environment, exporting the model on first use"""
+    model_dir = model_dir or os.getenv("ONNX_MODEL_DIR", "onnx_minilm")
+    if quantized is None:
+        quantized = os.getenv("ONNX_QUANTIZE", "1") != "0"
+    needed = [TOKENIZER_FILE, QUANTIZED_MODEL_FILE if quantized else MODEL_FILE]
+    if not all(os.path.exists(os.path.join(model_dir, name)) for name in needed):
+        export_model(model_name, model_dir)
+    return OnnxEmbeddings(
+        model_dir,
+        quantized=quantized,
+        batch_size=int(os.getenv("ONNX_BATCH_SIZE", "32")),
+        cache_size=int(os.getenv("ONNX_QUERY_CACHE", "1024")),
+        max_wait_ms=float(os.getenv("ONNX_BATCH_WAIT_MS", "0")),
+        threads=int(os.getenv("ONNX_THREADS", "0")),
+    )
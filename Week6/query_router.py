@@ -0,0 +1,34 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.resilience import CircuitOpenError
+from appointments import schedule_appointment, is_booking_request
+from doctor_directory import get_doctor_directory
+from langchain_helper import answer_query, answer_from_faq
+
+
+# ---- Query Router ----
+def route_query(query):
+    """Send each query down the cheapest path that can answer it"""
+    if is_booking_request(query):
+        return schedule_appointment(query)
+
+    # Doctor availability/lookups are answered straight from the parsed CSV
+    directory_answer = get_doctor_directory().answer(query)
+    if directory_answer is not None:
+        return directory_answer
+
+    # A question that clearly matches one FAQ gets its curated answer, no LLM call
+    faq_answer, vector = answer_from_faq(query)
+    if faq_answer is not None:
+        return faq_answer
+
+    # Only open-ended questions reach the RetrievalQA chain
+    try:
+        return answer_query(query, vector=vector)
+    except CircuitOpenError as e:
+        return f"❌ The assistant is unavailable right now: {e}"
+    except Exception as e:
+        # Gemini errors that outlasted the retries, or a bad request
+        return f"❌ Error: {str(e)}"
@@ -0,0 +1,117 @@
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SemanticCache:
+    """Answer cache keyed on query embeddings instead of exact query text.
+
+    A lookup embeds the query once, compares it against every cached query
+    vector with cosine similarity and returns the stored answer when the best
+    match clears `threshold`. Entries are evicted least-recently-used once
+    `max_entries` is reached and expire after `ttl_seconds`.
+    """
+
+    def __init__(self, embed_query, threshold=0.92, max_entries=256, ttl_seconds=3600):
+        self.embed_query = embed_query
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # normalized query -> (vector, answer, created_at)
+        self._matrix = None
+        self._keys = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize_text(query):
+        return " ".join(query.lower().split())
+
+    def _embed(self, query):
+        vector = np.asarray(self.embed_query(query), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _rebuild_matrix(self):
+        self._keys = list(self._entries.keys())
+        if self._keys:
+            self._matrix = np.vstack([self._entries[k][0] for k in self._keys])
+        else:
+            self._matrix = None
+
+    def _drop_expired(self, now):
+        expired = [k for k, (_, _, created) in self._entries.items() if now - created > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def lookup(self, query, vector=None):
+        """Return (answer, vector); answer is None on a miss.
+
+        The vector is handed back so a miss can be stored without embedding
+        the query a second time. A normalized `vector` computed earlier for
+        the same query can be passed in to skip embedding it here.
+        """
+        key = self._normalize_text(query)
+        now = time.time()
+        with self._lock:
+            self._drop_expired(now)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][1], self._entries[key][0]
+
+        if vector is None:
+            vector = self._embed(query)
+
+        with self._lock:
+            if self._entries:
+                if self._matrix is None:
+                    self._rebuild_matrix()
+                scores = self._matrix @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    match = self._keys[best]
+                    if match in self._entries:
+                        self._entries.move_to_end(match)
+                        self.hits += 1
+                        return self._entries[match][1], vector
+            self.misses += 1
+        return None, vector
+
+    def store(self, query, answer, vector=None, version=None):
+        """Cache an answer; answers computed against an older index are dropped"""
+        if vector is None:
+            vector = self._embed(query)
+        key = self._normalize_text(query)
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._entries[key] = (vector, answer, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def clear(self, version=None):
+        """Drop every entry, e.g. when the FAISS index changes"""
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+            if version is not None:
+                self.version = version
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._entries),
+            "threshold": self.threshold,
+        }
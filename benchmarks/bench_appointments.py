@@ -0,0 +1,116 @@
+"""
+Load test: thousands of overlapping bookings against the Week6 appointment ledger
+
+Several processes, each with several threads, try to book random
+(doctor, date, start) slots drawn from a small pool, so most requests
+collide with each other. Afterwards the ledger is checked for double
+bookings (any two booked intervals of one doctor on one day that overlap)
+and the number of successful bookings reported by the workers is compared
+with what the database holds.
+
+Usage: python benchmarks/bench_appointments.py [--requests 5000] [--processes 4] [--threads 8] [--weeks 1]
+"""
+
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import multiprocessing
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+WEEK6_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Week6")
+sys.path.insert(0, WEEK6_DIR)
+
+from appointments import AppointmentLedger, BookingError
+from doctor_directory import WEEKDAYS, DoctorDirectory
+
+
+def candidate_slots(directory, weeks):
+    """Every (doctor, date, start) on a 15-minute grid within each doctor's hours"""
+    first = date.today() + timedelta(days=1)
+    slots = []
+    for offset in range(weeks * 7):
+        day = first + timedelta(days=offset)
+        for doctor in directory.doctors:
+            if WEEKDAYS[day.weekday()] in doctor.days:
+                # 30-minute bookings on a 15-minute grid: neighbours overlap by half
+                slots.extend((doctor.name, day, start) for start in range(doctor.start, doctor.end - 29, 15))
+    return slots
+
+
+def worker(db_path, requests, threads, weeks, seed):
+    """Book `requests` random slots from one process; returns (booked, rejected, latencies)"""
+    directory = DoctorDirectory.from_csv(os.path.join(WEEK6_DIR, "doctors.csv"))
+    by_name = {d.name: d for d in directory.doctors}
+    ledger = AppointmentLedger(db_path, directory)
+    slots = candidate_slots(directory, weeks)
+    rng = random.Random(seed)
+    picks = [rng.choice(slots) for _ in range(requests)]
+
+    def book(pick):
+        name, day, start = pick
+        t0 = time.perf_counter()
+        try:
+            ledger.book(by_name[name], day, start, "Load Test")
+            ok = True
+        except BookingError:
+            ok = False
+        return ok, time.perf_counter() - t0
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(book, picks))
+    return sum(ok for ok, _ in results), sum(not ok for ok, _ in results), [t for _, t in results]
+
+
+def double_bookings(db_path):
+    conn = sqlite3.connect(db_path)
+    return conn.execute("""
+        SELECT COUNT(*) FROM appointments a JOIN appointments b
+          ON a.doctor = b.doctor AND a.day = b.day AND a.id < b.id
+         AND a.start < b.end AND b.start < a.end
+        WHERE a.status = 'booked' AND b.status = 'booked'
+    """).fetchone()[0], conn.execute("SELECT COUNT(*) FROM appointments WHERE status = 'booked'").fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000, help="total booking attempts")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8, help="threads per process")
+    parser.add_argument("--weeks", type=int, default=1, help="weeks of calendar to spread requests over")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="bench-appointments-"), "appointments.db")
+    AppointmentLedger(db_path, DoctorDirectory.from_csv(os.path.join(WEEK6_DIR, "doctors.csv")))  # create schema
+
+    per_process = args.requests // args.processes
+    start = time.perf_counter()
+    with multiprocessing.Pool(args.processes) as pool:
+        results = pool.starmap(worker, [(db_path, per_process, args.threads, args.weeks, seed)
+                                        for seed in range(args.processes)])
+    elapsed = time.perf_counter() - start
+
+    booked = sum(r[0] for r in results)
+    rejected = sum(r[1] for r in results)
+    latencies = sorted(t for r in results for t in r[2])
+    overlaps, rows = double_bookings(db_path)
+
+    print(f"\n📊 {booked + rejected} booking attempts from {args.processes} processes x {args.threads} threads "
+          f"over {len(candidate_slots(DoctorDirectory.from_csv(os.path.join(WEEK6_DIR, 'doctors.csv')), args.weeks))} "
+          f"candidate slots")
+    print(f"   booked {booked}, rejected as conflicts {rejected}, {(booked + rejected) / elapsed:.0f} attempts/s")
+    print(f"   latency p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms")
+    print(f"   rows in ledger {rows}, overlapping pairs {overlaps}")
+    if overlaps or rows != booked:
+        print("❌ Double booking detected")
+        sys.exit(1)
+    print("✅ No double bookings")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark: flattened transcripts vs structured chat turns
+
+Measures, per turn, how long it takes to build and serialize the request the
+week2 bots send to Gemini, and how large that request is. No API key or
+network is needed - requests are serialized locally with the SDK's protos.
+
+Usage: python benchmarks/bench_chat_payload.py [--turns 200] [--message-chars 400]
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "week2"))
+
+from google.generativeai import protos
+from google.generativeai.types import content_types
+
+from chat_backend import ChatBackend
+from chat_context import ChatContext
+
+SYSTEM_PROMPT = "You are a technical expert. Provide detailed, accurate technical information with step-by-step explanations."
+
+
+def legacy_cli_prompt(system_prompt, history, user_input):
+    """The original SimpleChatBot.get_response flattening (20 message cap)"""
+    conversation_text = f"System: {system_prompt}\n"
+    for msg in history[-20:]:
+        role = "User" if msg["role"] == "user" else "Assistant"
+        conversation_text += f"{role}: {msg['content']}\n"
+    conversation_text += f"User: {user_input}\nAssistant:"
+    return conversation_text
+
+
+def legacy_streamlit_prompt(system_prompt, history, user_input):
+    """The original ChatBot.get_response flattening (last 10 messages)"""
+    messages = [{"role": "system", "content": system_prompt}]
+    messages += (history + [{"role": "user", "content": user_input}])[-10:]
+    return "\n".join([f"{m['role']}: {m['content']}" for m in messages])
+
+
+def serialize_flat(prompt):
+    request = protos.GenerateContentRequest(model="models/gemini-2.0-flash", contents=content_types.to_contents(prompt))
+    return type(request).serialize(request)
+
+
+def serialize_structured(context, user_input):
+    contents = ChatBackend.to_contents(context.window(user_input) + [{"role": "user", "content": user_input}])
+    request = protos.GenerateContentRequest(
+        model="models/gemini-2.0-flash",
+        system_instruction=content_types.to_content(SYSTEM_PROMPT),
+        contents=content_types.to_contents(contents),
+    )
+    return type(request).serialize(request)
+
+
+def run(turns, message_chars, token_budget):
+    filler = ("lorem ipsum dolor sit amet " * (message_chars // 27 + 1))[:message_chars]
+    history = []
+    context = ChatContext(token_budget=token_budget)
+    results = {"legacy-cli": ([], []), "legacy-streamlit": ([], []), "structured": ([], [])}
+
+    for turn in range(turns):
+        user_input = f"Question {turn}: {filler}"
+
+        for name, build in (
+            ("legacy-cli", lambda: serialize_flat(legacy_cli_prompt(SYSTEM_PROMPT, history, user_input))),
+            ("legacy-streamlit", lambda: serialize_flat(legacy_streamlit_prompt(SYSTEM_PROMPT, history, user_input))),
+            ("structured", lambda: serialize_structured(context, user_input)),
+        ):
+            start = time.perf_counter()
+            payload = build()
+            results[name][0].append((time.perf_counter() - start) * 1e6)
+            results[name][1].append(len(payload))
+
+        reply = f"Answer {turn}: {filler}"
+        history += [{"role": "user", "content": user_input}, {"role": "assistant", "content": reply}]
+        context.add("user", user_input)
+        context.add("assistant", reply)
+
+    print(f"\n📊 {turns} turns, {message_chars} chars/message, structured budget {token_budget} tokens")
+    print(f"{'approach':<18}{'build us (mean)':>16}{'build us (last)':>16}{'bytes (mean)':>14}{'bytes (last)':>14}")
+    for name, (timings, sizes) in results.items():
+        print(f"{name:<18}{statistics.mean(timings):>16.1f}{timings[-1]:>16.1f}"
+              f"{statistics.mean(sizes):>14.0f}{sizes[-1]:>14}")
+    print("\nNote: the structured request keeps the system prompt in system_instruction,\n"
+          "so its leading bytes are identical every turn and eligible for prompt caching.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--message-chars", type=int, default=400)
+    parser.add_argument("--token-budget", type=int, default=2000)
+    args = parser.parse_args()
+    run(args.turns, args.message_chars, args.token_budget)
@@ -0,0 +1,160 @@
+"""
+Load test: hundreds of concurrent sessions against week2/chat_server.py
+
+Starts the server in a subprocess on the mock LLM (no API key or network),
+then runs several waves. In each wave `--sessions` clients each open a
+session with a random persona and hold a `--turns`-turn conversation,
+alternating REST and WebSocket-streamed turns; a third of them bring their
+own unique system prompt instead. Half the sessions are deleted
+at the end of a wave and the rest are left for idle eviction, so the server's
+RSS after each wave shows whether memory stays flat as sessions come and go.
+
+Usage: python benchmarks/bench_chat_server.py [--sessions 500] [--turns 4] [--waves 3] [--max-upstream 64]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+import aiohttp
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from common.llm_metrics import percentile
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_until_up(http, url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with http.get(f"{url}/health") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("chat server did not start")
+
+
+async def conversation(http, url, turns, rng, results):
+    """One client: create a session, talk, then delete it or walk away"""
+    if rng.random() < 1 / 3:
+        # Every custom prompt is new to the server, which must not keep a model for each forever
+        body = {"system_prompt": f"You are assistant #{rng.getrandbits(64):x}. Be brief."}
+    else:
+        body = {"persona": rng.choice("123")}
+    async with http.post(f"{url}/sessions", json=body) as response:
+        session_id = (await response.json())["session_id"]
+
+    ws = None
+    for turn in range(turns):
+        message = f"Question {turn} about {rng.choice(['pricing', 'recipes', 'kubernetes', 'poetry'])}?"
+        start = time.perf_counter()
+        try:
+            if turn % 2 == 0:
+                async with http.post(f"{url}/sessions/{session_id}/messages", json={"message": message}) as response:
+                    ok = response.status == 200 and "reply" in await response.json()
+                results["latency"].append(time.perf_counter() - start)
+            else:
+                ws = ws or await http.ws_connect(f"{url}/sessions/{session_id}/ws")
+                await ws.send_json({"message": message})
+                first = None
+                while True:
+                    event = await ws.receive_json()
+                    if event["type"] == "chunk" and first is None:
+                        first = time.perf_counter() - start
+                    if event["type"] != "chunk":
+                        break
+                ok = event["type"] == "done"
+                results["latency"].append(time.perf_counter() - start)
+                if first is not None:
+                    results["ttft"].append(first)
+        except (aiohttp.ClientError, asyncio.TimeoutError, KeyError, TypeError):
+            ok = False
+        results["ok" if ok else "errors"] += 1
+
+    if ws is not None:
+        await ws.close()
+    if rng.random() < 0.5:
+        async with http.delete(f"{url}/sessions/{session_id}"):
+            pass
+
+
+async def run(args):
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = dict(
+        os.environ,
+        LLM_BACKEND="mock",
+        MOCK_LLM_LATENCY=str(args.latency),
+        MOCK_LLM_CHUNK_DELAY=str(args.chunk_delay),
+        GEMINI_RPM="0",  # measure the server, not the client-side rate limiter
+        CHAT_SERVER_MAX_UPSTREAM=str(args.max_upstream),
+        CHAT_SESSION_TTL=str(args.ttl),
+        TRANSCRIPT_ARCHIVE=os.path.join(tempfile.mkdtemp(prefix="bench-chat-server-"), "transcripts.db"),
+    )
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "week2", "chat_server.py"), "--port", str(port)],
+        cwd=os.path.join(ROOT, "week2"), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    rng = random.Random(0)
+    try:
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0),
+                                         timeout=aiohttp.ClientTimeout(total=120)) as http:
+            await wait_until_up(http, url)
+            async with http.get(f"{url}/health") as response:
+                idle_rss = (await response.json())["rss_mb"]
+
+            print(f"\n📊 {args.sessions} concurrent sessions x {args.turns} turns per wave, "
+                  f"mock latency {args.latency}s, {args.max_upstream} upstream slots, idle RSS {idle_rss} MB")
+            print(f"{'wave':<6}{'turns':>7}{'errors':>8}{'turns/s':>9}{'p50 s':>8}{'p95 s':>8}"
+                  f"{'ttft p50':>10}{'live':>6}{'evicted':>9}{'models':>8}{'RSS MB':>8}")
+            for wave in range(1, args.waves + 1):
+                results = {"ok": 0, "errors": 0, "latency": [], "ttft": []}
+                start = time.perf_counter()
+                await asyncio.gather(*(conversation(http, url, args.turns, random.Random(rng.random()), results)
+                                       for _ in range(args.sessions)))
+                elapsed = time.perf_counter() - start
+                await asyncio.sleep(args.ttl + 1)  # let idle eviction catch the sessions left behind
+                async with http.get(f"{url}/health") as response:
+                    health = await response.json()
+                print(f"{wave:<6}{results['ok']:>7}{results['errors']:>8}{results['ok'] / elapsed:>9.0f}"
+                      f"{percentile(results['latency'], 50):>8.2f}{percentile(results['latency'], 95):>8.2f}"
+                      f"{percentile(results['ttft'], 50) or 0:>10.2f}{health['sessions']:>6}"
+                      f"{health['evicted']:>9}{health['models']:>8}{health['rss_mb']:>8.1f}")
+    finally:
+        server.terminate()
+        _, stderr = server.communicate(timeout=10)
+        if server.returncode not in (0, -15) and stderr:
+            print(stderr.decode()[-2000:])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=500, help="concurrent sessions per wave")
+    parser.add_argument("--turns", type=int, default=4, help="turns per session")
+    parser.add_argument("--waves", type=int, default=3)
+    parser.add_argument("--max-upstream", type=int, default=64, help="concurrent mock LLM calls")
+    parser.add_argument("--latency", type=float, default=0.2, help="mock time to first token (s)")
+    parser.add_argument("--chunk-delay", type=float, default=0.02)
+    parser.add_argument("--ttl", type=float, default=2.0, help="server idle-session TTL (s)")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Benchmark: sentence-transformers (PyTorch) vs ONNX fp32 vs ONNX int8 embeddings
+
+Exports MiniLM once with Week6/onnx_embeddings.py, then runs each backend in
+a fresh subprocess so RSS is measured cleanly. Reports load time, document
+throughput, single-query latency, concurrent query throughput (where the
+ONNX micro-batcher kicks in), RSS growth, and retrieval drift against the
+PyTorch backend on the Week6 knowledge base: mean cosine between the two
+vectors of the same text, top-1 agreement and top-5 overlap.
+
+--random-weights swaps in a randomly initialised MiniLM-shaped model with a
+tokenizer trained on the CSVs, for machines that can't reach the
+HuggingFace Hub: speed and memory are representative, drift only checks
+that the backends agree with each other.
+
+Usage: python benchmarks/bench_embeddings.py [--docs 2000] [--queries 200] [--threads 8] [--random-weights]
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+WEEK6_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Week6")
+sys.path.insert(0, WEEK6_DIR)
+
+import onnx_embeddings
+
+BACKENDS = ("huggingface", "onnx-fp32", "onnx-int8")
+K = 5
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def knowledge_base():
+    """The texts langchain_helper indexes: one 'column: value' block per CSV row"""
+    texts = []
+    for file_name in ("healthcare_faqs.csv", "doctors.csv"):
+        with open(os.path.join(WEEK6_DIR, file_name), encoding="utf-8") as f:
+            texts.extend("\n".join(f"{k}: {v}" for k, v in row.items()) for row in csv.DictReader(f))
+    return texts
+
+
+def make_queries(count, seed=0):
+    """FAQ questions with a few words dropped, so they are near but not exact matches"""
+    with open(os.path.join(WEEK6_DIR, "healthcare_faqs.csv"), encoding="utf-8") as f:
+        questions = [row["prompt"] for row in csv.DictReader(f)]
+    rng = np.random.default_rng(seed)
+    queries = []
+    for i in range(count):
+        words = questions[i % len(questions)].split()
+        keep = rng.random(len(words)) > 0.2
+        queries.append(" ".join(w for w, k in zip(words, keep) if k) + f" ({i})")
+    return queries
+
+
+def make_random_model(directory):
+    """MiniLM-shaped BERT with random weights and a WordPiece vocab trained on the CSVs"""
+    from tokenizers import BertWordPieceTokenizer
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+
+    wordpiece = BertWordPieceTokenizer(lowercase=True)
+    wordpiece.train_from_iterator(knowledge_base() * 10, vocab_size=2000)
+    tokenizer = BertTokenizerFast(tokenizer_object=wordpiece._tokenizer, model_max_length=256,
+                                  unk_token="[UNK]", sep_token="[SEP]", pad_token="[PAD]",
+                                  cls_token="[CLS]", mask_token="[MASK]")
+    config = BertConfig(vocab_size=tokenizer.vocab_size, hidden_size=384, num_hidden_layers=6,
+                        num_attention_heads=12, intermediate_size=1536)
+    BertModel(config, add_pooling_layer=False).save_pretrained(directory)
+    tokenizer.save_pretrained(directory)
+    return directory
+
+
+def load_backend(backend, model_name, onnx_dir):
+    if backend == "huggingface":
+        from langchain_huggingface import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(model_name=model_name, encode_kwargs={"normalize_embeddings": True})
+    return onnx_embeddings.OnnxEmbeddings(onnx_dir, quantized=backend == "onnx-int8")
+
+
+def child(backend, model_name, onnx_dir, out_dir, docs, queries, threads):
+    """Runs in a subprocess: load one backend, time it, save vectors, print JSON stats"""
+    base_rss = rss_mb()
+    start = time.perf_counter()
+    model = load_backend(backend, model_name, onnx_dir)
+    load_s = time.perf_counter() - start
+
+    corpus = knowledge_base()
+    bulk = [corpus[i % len(corpus)] + f" #{i}" for i in range(docs)]
+    start = time.perf_counter()
+    model.embed_documents(bulk)
+    docs_per_s = docs / (time.perf_counter() - start)
+
+    probes = make_queries(queries)
+    latencies = []
+    for text in probes:
+        start = time.perf_counter()
+        model.embed_query(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    # Fresh texts so the ONNX query cache can't help; this measures batching
+    concurrent = make_queries(queries * 4, seed=1)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(model.embed_query, concurrent))
+    concurrent_qps = len(concurrent) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for text in probes[:50]:
+        model.embed_query(text)
+    repeat_ms = (time.perf_counter() - start) * 1000 / min(50, len(probes))
+
+    np.save(os.path.join(out_dir, f"{backend}-corpus.npy"), np.asarray(model.embed_documents(corpus), dtype=np.float32))
+    np.save(os.path.join(out_dir, f"{backend}-queries.npy"),
+            np.asarray([model.embed_query(q) for q in probes], dtype=np.float32))
+
+    stats = model.stats() if hasattr(model, "stats") else {}
+    print(json.dumps({
+        "load_s": load_s,
+        "docs_per_s": docs_per_s,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": sorted(latencies)[int(0.95 * (len(latencies) - 1))],
+        "concurrent_qps": concurrent_qps,
+        "repeat_ms": repeat_ms,
+        "mean_batch": stats.get("mean_query_batch"),
+        "rss_mb": rss_mb() - base_rss,
+    }))
+
+
+def normalized(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def drift(out_dir, backend, reference="huggingface"):
+    """(mean cosine to the reference vectors, top-1 agreement, top-K overlap)"""
+    ref_corpus = normalized(np.load(os.path.join(out_dir, f"{reference}-corpus.npy")))
+    ref_queries = normalized(np.load(os.path.join(out_dir, f"{reference}-queries.npy")))
+    corpus = normalized(np.load(os.path.join(out_dir, f"{backend}-corpus.npy")))
+    queries = normalized(np.load(os.path.join(out_dir, f"{backend}-queries.npy")))
+
+    cosine = float(np.mean(np.concatenate([(ref_corpus * corpus).sum(1), (ref_queries * queries).sum(1)])))
+    ref_top = np.argsort(-ref_queries @ ref_corpus.T, axis=1)[:, :K]
+    top = np.argsort(-queries @ corpus.T, axis=1)[:, :K]
+    top1 = float(np.mean(ref_top[:, 0] == top[:, 0]))
+    overlap = float(np.mean([len(set(a) & set(b)) / K for a, b in zip(ref_top, top)]))
+    return cosine, top1, overlap
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=2000, help="documents for the bulk-embedding run")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=8, help="concurrent query threads")
+    parser.add_argument("--model", default=onnx_embeddings.MODEL_NAME)
+    parser.add_argument("--random-weights", action="store_true", help="offline stand-in model (see above)")
+    parser.add_argument("--child", nargs=7, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        backend, model_name, onnx_dir, out_dir, docs, queries, threads = args.child
+        child(backend, model_name, onnx_dir, out_dir, int(docs), int(queries), int(threads))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_name = make_random_model(os.path.join(tmp, "model")) if args.random_weights else args.model
+        onnx_dir = os.path.join(tmp, "onnx")
+        start = time.perf_counter()
+        onnx_embeddings.export_model(model_name, onnx_dir)
+        export_s = time.perf_counter() - start
+        sizes = {name: os.path.getsize(os.path.join(onnx_dir, name)) / 1e6
+                 for name in (onnx_embeddings.MODEL_FILE, onnx_embeddings.QUANTIZED_MODEL_FILE)}
+
+        print(f"\n📊 {args.docs} docs, {args.queries} queries, {args.threads} threads"
+              f"{' (random weights)' if args.random_weights else ''}; ONNX export + int8 quantize {export_s:.1f}s, "
+              f"fp32 {sizes[onnx_embeddings.MODEL_FILE]:.0f} MB, int8 {sizes[onnx_embeddings.QUANTIZED_MODEL_FILE]:.0f} MB")
+        print(f"{'backend':<12}{'load s':>8}{'docs/s':>9}{'p50 ms':>8}{'p95 ms':>8}{'conc q/s':>10}{'batch':>7}"
+              f"{'cached ms':>10}{'RSS MB':>8}{'cosine':>8}{'top1':>6}{'top5':>6}")
+        for backend in BACKENDS:
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", backend, model_name, onnx_dir, tmp,
+                 str(args.docs), str(args.queries), str(args.threads)],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            stats = json.loads(out.strip().splitlines()[-1])
+            cosine, top1, overlap = drift(tmp, backend)
+            batch = f"{stats['mean_batch']:.1f}" if stats["mean_batch"] else "-"
+            print(f"{backend:<12}{stats['load_s']:>8.2f}{stats['docs_per_s']:>9.0f}{stats['p50_ms']:>8.2f}"
+                  f"{stats['p95_ms']:>8.2f}{stats['concurrent_qps']:>10.0f}{batch:>7}{stats['repeat_ms']:>10.3f}"
+                  f"{stats['rss_mb']:>8.0f}{cosine:>8.4f}{top1:>6.2f}{overlap:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
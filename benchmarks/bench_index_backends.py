@@ -0,0 +1,194 @@
+"""
+Benchmark: flat (pickled) vs IVF / IVF-PQ / HNSW (memory-mapped) index backends
+
+Builds a synthetic corpus of unit-length 384-d vectors (the MiniLM size),
+each with a short document drawn from a Zipf-distributed vocabulary, and
+saves it with the app's own writers (langchain_helper._save_index /
+_save_ann_index, which also write the BM25 postings). Each backend is then
+loaded in a fresh subprocess exactly the way the app does it -
+load_vector_db() + get_retriever() in the default hybrid mode - so RSS is
+measured cleanly. Reports build time, load time, hybrid query latency,
+vector recall@10 against exact search, and RSS after loading and querying.
+
+With --rebuild-bm25 every backend is also loaded with its saved BM25
+postings removed, which is what loading cost when the keyword index was
+rebuilt from the docstore on every start.
+
+Usage: python benchmarks/bench_index_backends.py [--rows 50000] [--queries 200] [--rebuild-bm25]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+import numpy as np
+
+WEEK6_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Week6")
+sys.path.insert(0, WEEK6_DIR)
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+import faiss
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings, DeterministicFakeEmbedding
+from langchain_community.vectorstores import FAISS
+
+import langchain_helper
+import hybrid_retriever
+
+DIM = 384
+K = 10
+
+
+class PrecomputedEmbeddings(Embeddings):
+    """Hands the synthetic vectors to the app's writers in place of MiniLM"""
+
+    def __init__(self, vectors_by_text):
+        self.vectors_by_text = vectors_by_text
+
+    def embed_documents(self, texts):
+        return [self.vectors_by_text[text] for text in texts]
+
+    def embed_query(self, text):
+        return self.vectors_by_text[text]
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def make_corpus(rows, queries, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, rows // 100), DIM)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), rows)] + 0.3 * rng.normal(size=(rows, DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    picks = rng.integers(0, rows, queries)
+    probes = vectors[picks] + 0.05 * rng.normal(size=(queries, DIM)).astype(np.float32)
+    probes /= np.linalg.norm(probes, axis=1, keepdims=True)
+
+    # Made-up words with Zipf frequencies, so BM25 sees common and rare terms
+    vocabulary = np.array(["".join(rng.choice(list("abcdefghijklmnopqrstuvwxyz"), rng.integers(3, 10)))
+                           for _ in range(20000)])
+    weights = 1 / np.arange(1, len(vocabulary) + 1)
+    words = rng.choice(vocabulary, size=(rows, 30), p=weights / weights.sum())
+    texts = [f"entry {i}: " + " ".join(row) for i, row in enumerate(words)]
+    questions = [" ".join(words[i][:6]) for i in picks]
+    return vectors, probes.astype(np.float32), texts, questions
+
+
+def build(directory, backend, vectors, texts):
+    """Save the corpus with the app's writers into `directory`"""
+    ids = [f"doc-{i}" for i in range(len(vectors))]
+    documents = {doc_id: Document(page_content=text, metadata={"row": i})
+                 for i, (doc_id, text) in enumerate(zip(ids, texts))}
+    langchain_helper.vectordb_file_path = directory
+    langchain_helper.index_backend = backend
+    langchain_helper._embedding_model = PrecomputedEmbeddings(dict(zip(texts, vectors.tolist())))
+
+    start = time.perf_counter()
+    if backend == "flat":
+        vectordb = FAISS.from_documents(list(documents.values()), langchain_helper._embedding_model, ids=ids)
+        langchain_helper._save_index(vectordb, {}, ids)
+    else:
+        langchain_helper._save_ann_index(documents, {}, None)
+    return time.perf_counter() - start
+
+
+def child(directory, probes_path, truth_path, questions_path):
+    """Runs in a subprocess: load one index the app's way, query it, print JSON stats"""
+    probes = np.load(probes_path)
+    truth = np.load(truth_path)
+    with open(questions_path) as f:
+        questions = json.load(f)
+    langchain_helper.vectordb_file_path = directory
+    langchain_helper._embedding_model = DeterministicFakeEmbedding(size=DIM)  # queries come as vectors
+    base_rss = rss_mb()
+
+    start = time.perf_counter()
+    vectordb = langchain_helper.load_vector_db()
+    retriever = langchain_helper.get_retriever(vectordb)
+    load_s = time.perf_counter() - start
+    load_rss = rss_mb() - base_rss
+
+    latencies, hits = [], 0
+    for i, (probe, question) in enumerate(zip(probes, questions)):
+        start = time.perf_counter()
+        vector_hits = vectordb.similarity_search_with_score_by_vector(probe.tolist(), k=K)
+        docs = retriever.select(question, vector_hits=vector_hits)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len({doc.metadata["row"] for doc, _ in vector_hits} & set(truth[i].tolist()))
+
+    print(json.dumps({
+        "load_ms": load_s * 1000,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": sorted(latencies)[int(0.95 * (len(latencies) - 1))],
+        "recall": hits / (K * len(probes)),
+        "load_rss_mb": load_rss,
+        "rss_mb": rss_mb() - base_rss,
+        "docs": len(docs),
+    }))
+
+
+def run_child(directory, paths):
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", directory, *paths],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--backends", default="flat,ivf,ivfpq,hnsw")
+    parser.add_argument("--rebuild-bm25", action="store_true",
+                        help="also load each backend without its saved BM25 postings")
+    parser.add_argument("--child", nargs=4, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    vectors, probes, texts, questions = make_corpus(args.rows, args.queries)
+    exact = faiss.IndexFlatL2(DIM)
+    exact.add(vectors)
+    _, truth = exact.search(probes, K)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [os.path.join(tmp, name) for name in ("probes.npy", "truth.npy", "questions.json")]
+        np.save(paths[0], probes)
+        np.save(paths[1], truth)
+        with open(paths[2], "w") as f:
+            json.dump(questions, f)
+
+        print(f"\n📊 {args.rows} rows x {DIM}d, {args.queries} hybrid queries, k={K}, "
+              f"loaded via load_vector_db() + get_retriever()")
+        print(f"{'backend':<15}{'build s':>9}{'disk MB':>9}{'load ms':>9}{'load RSS':>10}{'p50 ms':>8}"
+              f"{'p95 ms':>8}{'recall':>8}{'RSS MB':>8}")
+        for backend in args.backends.split(","):
+            directory = os.path.join(tmp, backend)
+            build_s = build(directory, backend, vectors, texts)
+            disk_mb = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory)) / 1e6
+            runs = [(backend, run_child(directory, paths))]
+            if args.rebuild_bm25:
+                for name in (hybrid_retriever.BM25_TERMS_FILE, hybrid_retriever.BM25_POSTINGS_FILE,
+                             hybrid_retriever.BM25_LENGTHS_FILE):
+                    os.remove(os.path.join(directory, name))
+                runs.append((f"{backend} rebuild", run_child(directory, paths)))
+            for label, stats in runs:
+                print(f"{label:<15}{build_s:>9.2f}{disk_mb:>9.1f}{stats['load_ms']:>9.1f}{stats['load_rss_mb']:>10.1f}"
+                      f"{stats['p50_ms']:>8.3f}{stats['p95_ms']:>8.3f}{stats['recall']:>8.2f}{stats['rss_mb']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
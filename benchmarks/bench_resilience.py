@@ -0,0 +1,91 @@
+"""
+Benchmark: Gemini calls under quota throttling and 503s, with and without common/resilience.py
+
+Runs against common/fake_gemini_server.py (no network or API key needed) and
+reports, for a burst of concurrent requests, how many succeeded, how many
+errors reached the caller, retries, throughput and latency percentiles.
+
+The fake server's quota window is shortened to --window seconds so a run
+takes seconds rather than minutes; the resilient client's bucket is scaled
+to the same rate.
+
+Usage: python benchmarks/bench_resilience.py [--requests 150] [--threads 8] [--quota 50] [--failure-rate 0.05]
+"""
+
+import os
+import sys
+import time
+import argparse
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+warnings.filterwarnings("ignore")
+
+from common.fake_gemini_server import start_server
+from common.llm_metrics import percentile
+from common.resilience import ResilientClient, CircuitBreaker
+
+
+def run(name, client, model, requests, threads):
+    latencies, errors = [], 0
+
+    def one(i):
+        start = time.perf_counter()
+        try:
+            client.call(model.generate_content, f"question {i}")
+            return time.perf_counter() - start, None
+        except Exception as e:
+            return time.perf_counter() - start, type(e).__name__
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for latency, error in pool.map(one, range(requests)):
+            if error:
+                errors += 1
+            else:
+                latencies.append(latency)
+    elapsed = time.perf_counter() - start
+
+    print(f"{name:<12}{len(latencies):>6}{errors:>8}{client.stats['retries']:>9}"
+          f"{len(latencies) / elapsed:>10.1f}{percentile(latencies, 50) or 0:>9.2f}{percentile(latencies, 95) or 0:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=150)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--quota", type=int, default=50, help="fake server requests per window per key")
+    parser.add_argument("--window", type=float, default=5.0, help="fake server quota window in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.05, help="fraction of 503 responses")
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    import google.generativeai as genai
+
+    server, fake, url = start_server(latency=args.latency, rpm=args.quota,
+                                     failure_rate=args.failure_rate, window=args.window)
+    rate_per_minute = args.quota * 60 / args.window
+
+    def model_for(api_key):
+        # Separate keys so each run gets its own quota on the fake server
+        genai.configure(api_key=api_key, transport="rest", client_options={"api_endpoint": url})
+        return genai.GenerativeModel("gemini-2.0-flash")
+
+    print(f"\n📊 {args.requests} requests, {args.threads} threads, quota {args.quota} per {args.window:g}s, "
+          f"{args.failure_rate:.0%} 503s, {args.latency * 1000:.0f} ms per reply")
+    print(f"{'client':<12}{'ok':>6}{'errors':>8}{'retries':>9}{'ok/s':>10}{'p50 s':>9}{'p95 s':>9}")
+
+    naive = ResilientClient(rate_per_minute=0, max_retries=0, breaker=CircuitBreaker(failure_threshold=10 ** 9))
+    run("no retries", naive, model_for("bench-naive"), args.requests, args.threads)
+
+    # A little under the quota, since the server counts a sliding window
+    resilient = ResilientClient(rate_per_minute=0.9 * rate_per_minute, burst=max(1, args.quota // 10),
+                                max_retries=4, base_delay=0.2, max_delay=2.0)
+    run("resilient", resilient, model_for("bench-resilient"), args.requests, args.threads)
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
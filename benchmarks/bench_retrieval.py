@@ -0,0 +1,91 @@
+"""
+Benchmark: plain FAISS k=3 vs hybrid BM25 + vector retrieval (Week6)
+
+For a labelled set of questions, reports recall (did the expected CSV row
+reach the prompt), average documents passed to the LLM, average prompt
+tokens for the "stuff" chain and retrieval latency.
+
+Usage: python benchmarks/bench_retrieval.py [--fake-embeddings]
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+WEEK6_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Week6")
+sys.path.insert(0, WEEK6_DIR)
+os.chdir(WEEK6_DIR)
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+from langchain_community.vectorstores import FAISS
+
+import langchain_helper
+from langchain_helper import load_documents, get_retriever, get_prompt
+
+# (question, expected source value of the row that answers it)
+EVAL_SET = [
+    ("how do I make an appointment", "How can I book an appointment at Aga Khan Hospital?"),
+    ("is the emergency room open at night", "Do you provide emergency services?"),
+    ("can I see a doctor over video call", "Can I consult a doctor online?"),
+    ("what should I bring on my first visit", "What documents do I need to bring for my first visit?"),
+    ("do you take my insurance card", "Does Aga Khan accept health insurance?"),
+    ("which departments and specialties do you have", "What specialties are available at Aga Khan University Hospital?"),
+    ("where do I collect lab test results", "How can I get my lab reports?"),
+    ("can my child get vaccinated here", "Do you provide vaccination services?"),
+    ("I cannot afford the treatment, is there financial help", "What should I do if I need financial assistance?"),
+    ("can a nurse come to my home", "Can I request a home healthcare service?"),
+    ("what is the hospital phone number", "How can I contact the hospital for queries?"),
+    ("do you have a maternity ward", "Does Aga Khan Hospital provide maternity services?"),
+    ("is there a pharmacy in the hospital", "What pharmacy services do you provide?"),
+    ("tell me about Dr. Ayesha Khan", "Dr. Ayesha Khan"),
+    ("what is Salman Ahmed's specialization", "Dr. Salman Ahmed"),
+    ("contact email for Maria Iqbal", "Dr. Maria Iqbal"),
+    ("Imran Siddiqui timings", "Dr. Imran Siddiqui"),
+    ("when does Dr. Hina Zafar see patients", "Dr. Hina Zafar"),
+    ("I need a cardiologist", "Dr. Ayesha Khan"),
+    ("dermatologist for a skin rash", "Dr. Imran Siddiqui"),
+]
+
+
+def prompt_tokens(question, docs):
+    context = "\n\n".join(doc.page_content for doc in docs)
+    return len(get_prompt().format(context=context, question=question)) // 4
+
+
+def evaluate(name, retriever):
+    hits, doc_counts, tokens, latencies = 0, [], [], []
+    for question, expected in EVAL_SET:
+        start = time.perf_counter()
+        docs = retriever.invoke(question)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += any(doc.metadata.get("source") == expected for doc in docs)
+        doc_counts.append(len(docs))
+        tokens.append(prompt_tokens(question, docs))
+
+    print(f"{name:<10}{hits / len(EVAL_SET):>10.0%}{statistics.mean(doc_counts):>10.2f}"
+          f"{statistics.mean(tokens):>14.0f}{statistics.mean(latencies):>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fake-embeddings", action="store_true",
+                        help="use random embeddings (smoke test without downloading MiniLM)")
+    args = parser.parse_args()
+
+    if args.fake_embeddings:
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        langchain_helper._embedding_model = DeterministicFakeEmbedding(size=384)
+
+    documents = load_documents()
+    vectordb = FAISS.from_documents(list(documents.values()), langchain_helper.get_embedding_model())
+
+    print(f"\n📊 {len(EVAL_SET)} questions over {len(documents)} rows")
+    print(f"{'retriever':<10}{'recall':>10}{'avg docs':>10}{'avg tokens':>14}{'avg ms':>12}")
+    evaluate("vector", get_retriever(vectordb, "vector"))
+    evaluate("hybrid", get_retriever(vectordb, "hybrid"))
+
+
+if __name__ == "__main__":
+    main()
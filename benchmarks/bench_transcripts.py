@@ -0,0 +1,132 @@
+"""
+Benchmark: week2 transcript archive (SQLite + FTS5) vs one JSON file per session
+
+Generates a few thousand synthetic sessions and saves them both ways: the
+old pretty-printed JSON /save files and the TranscriptArchive. Reports disk
+size, incremental save cost (re-saving a session after one more turn),
+load latency for a single session, and search latency - a scan over every
+JSON file vs an FTS5 query. Text is drawn from a Zipf-distributed made-up
+vocabulary, so searches hit both very common and rare words.
+
+Usage: python benchmarks/bench_transcripts.py [--sessions 5000] [--turns 20] [--queries 100]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "week2"))
+
+from transcript_archive import TranscriptArchive
+
+
+def make_vocabulary(rng, size=8000):
+    """Made-up words with Zipf frequencies, roughly like real chat text"""
+    words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 10)))
+             for _ in range(size)]
+    return words, [1 / (rank + 1) for rank in range(size)]
+
+
+def make_session(rng, vocabulary, turns):
+    words, weights = vocabulary
+    return [{"role": "user" if i % 2 == 0 else "assistant",
+             "content": " ".join(rng.choices(words, weights, k=rng.randint(8, 60)))}
+            for i in range(turns)]
+
+
+def disk_mb(paths):
+    """Allocated size: thousands of small files each round up to whole blocks"""
+    return sum(os.stat(path).st_blocks * 512 for path in paths) / 1e6
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def scan_json(directory, word):
+    """What finding old transcripts took before: open and parse every file"""
+    hits = []
+    for file_name in os.listdir(directory):
+        with open(os.path.join(directory, file_name), encoding="utf-8") as f:
+            data = json.load(f)
+        hits.extend((file_name, i) for i, m in enumerate(data["conversation"]) if word in m["content"])
+    return hits
+
+
+def summary(latencies):
+    ordered = sorted(latencies)
+    return f"p50 {statistics.median(ordered):7.2f} ms   p95 {ordered[int(0.95 * (len(ordered) - 1))]:7.2f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=5000)
+    parser.add_argument("--turns", type=int, default=20, help="messages per session")
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocabulary = make_vocabulary(rng)
+    sessions = {f"conversation_{i:05d}": make_session(rng, vocabulary, args.turns) for i in range(args.sessions)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_dir = os.path.join(tmp, "json")
+        os.makedirs(json_dir)
+        archive = TranscriptArchive(os.path.join(tmp, "transcripts.db"))
+
+        start = time.perf_counter()
+        for name, messages in sessions.items():
+            with open(os.path.join(json_dir, f"{name}.json"), "w", encoding="utf-8") as f:
+                json.dump({"timestamp": "", "system_prompt": "", "conversation": messages}, f, indent=2)
+        json_save_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for name, messages in sessions.items():
+            archive.save(name, "", messages)
+        archive_save_s = time.perf_counter() - start
+        archive._connect().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+        json_mb = disk_mb(os.path.join(json_dir, f) for f in os.listdir(json_dir))
+        archive_mb = disk_mb(os.path.join(tmp, f) for f in os.listdir(tmp) if f.startswith("transcripts.db"))
+
+        names = rng.sample(list(sessions), min(args.queries, len(sessions)))
+        resave_json, resave_archive, load_json, load_archive = [], [], [], []
+        for name in names:
+            messages = sessions[name] + [{"role": "user", "content": "one more turn about pizza"}]
+
+            def write_json():
+                with open(os.path.join(json_dir, f"{name}.json"), "w", encoding="utf-8") as f:
+                    json.dump({"timestamp": "", "system_prompt": "", "conversation": messages}, f, indent=2)
+
+            def read_json():
+                with open(os.path.join(json_dir, f"{name}.json"), encoding="utf-8") as f:
+                    return json.load(f)
+
+            resave_json.append(timed(write_json)[1])
+            resave_archive.append(timed(archive.save, name, "", messages[-1:], len(messages) - 1)[1])
+            load_json.append(timed(read_json)[1])
+            load_archive.append(timed(archive.load, name)[1])
+
+        # Query words drawn by frequency, so common words get searched for too
+        queries = rng.choices(*vocabulary, k=args.queries)
+        search_archive = [timed(archive.search, word)[1] for word in queries]
+        search_json = [timed(scan_json, json_dir, word)[1] for word in queries[:5]]
+
+        print(f"\n📊 {args.sessions} sessions x {args.turns} messages")
+        print(f"{'':<22}{'JSON files':>34}{'SQLite + FTS5':>34}")
+        print(f"{'initial save':<22}{json_save_s:>31.2f} s {archive_save_s:>31.2f} s ")
+        print(f"{'disk':<22}{json_mb:>30.1f} MB {archive_mb:>30.1f} MB ")
+        print(f"{'re-save (+1 turn)':<22}{summary(resave_json):>34}{summary(resave_archive):>34}")
+        print(f"{'load one session':<22}{summary(load_json):>34}{summary(load_archive):>34}")
+        print(f"{'search all sessions':<22}{summary(search_json):>34}{summary(search_archive):>34}")
+
+
+if __name__ == "__main__":
+    main()
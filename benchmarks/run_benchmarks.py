@@ -0,0 +1,317 @@
+"""
+Offline benchmark harness for the chat pipelines
+
+Runs every hot path against the deterministic mock LLM (common/mock_llm.py)
+and the fake mail transport, so no Gemini or Gmail credentials are needed:
+
+    cli          SimpleChatBot.get_response, one growing conversation per worker
+    cli-stream   SimpleChatBot.get_response_stream (time-to-first-token too)
+    streamlit    the Streamlit ChatBot streaming full-history message lists
+    compare      compare_personas (3 personas in parallel per op)
+    rag          Week6 answer_query (RetrievalQA over a fresh temporary index)
+    faq          Week6 FAQ fast path in front of answer_query, half FAQ prompts
+    appointment  Week6 schedule_appointment + drain of the mail queue
+
+For each it reports throughput, latency percentiles, time-to-first-token,
+prompt size and (with --memory) peak Python allocations.
+
+Usage: python benchmarks/run_benchmarks.py [--ops 60] [--concurrency 4] [--latency 0.05]
+           [--only cli,rag] [--fake-embeddings] [--memory] [--json results.json]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import threading
+import tracemalloc
+import contextlib
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+WEEK2_DIR = os.path.join(ROOT, "week2")
+WEEK6_DIR = os.path.join(ROOT, "Week6")
+
+SCENARIOS = ["cli", "cli-stream", "streamlit", "compare", "rag", "faq", "appointment"]
+QUESTIONS = [
+    "How can I book an appointment?",
+    "Is the emergency department open at night?",
+    "Can I consult a doctor online?",
+    "What documents do I need for my first visit?",
+    "Do you accept health insurance?",
+    "Where can I collect my lab reports?",
+    "Do you provide vaccination services?",
+    "Is there financial assistance for treatment?",
+    "Can I request home healthcare?",
+    "Which specialties are available?",
+]
+
+
+def load_script(name, path):
+    """Import a script whose file name isn't a valid module name (basic-chat-cli.py)"""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentile_ms(values, q):
+    from common.llm_metrics import percentile
+    value = percentile(values, q)
+    return None if value is None else value * 1000
+
+
+def run_scenario(name, op, ops, concurrency, memory=False, after=None):
+    """Run op(i) `ops` times on `concurrency` threads and collect the numbers"""
+    from common.llm_metrics import metrics
+
+    metrics.records.clear()
+    latencies = []
+    if memory:
+        tracemalloc.start()
+
+    def timed(i):
+        start = time.perf_counter()
+        op(i)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    # compare_personas prints its results; redirecting is process-wide, so do it once here
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(timed, range(ops)))
+    if after:
+        after()
+    elapsed = time.perf_counter() - start
+
+    peak_mb = None
+    if memory:
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+
+    records = list(metrics.records)
+    prompt_tokens = [r["prompt_tokens"] for r in records if r["prompt_tokens"] is not None]
+    ttfts = [r["ttft_s"] for r in records if r["streamed"] and r["ttft_s"] is not None]
+    return {
+        "scenario": name,
+        "ops": ops,
+        "concurrency": concurrency,
+        "ops_per_s": ops / elapsed,
+        "p50_ms": percentile_ms(latencies, 50),
+        "p95_ms": percentile_ms(latencies, 95),
+        "p99_ms": percentile_ms(latencies, 99),
+        "ttft_p50_ms": percentile_ms(ttfts, 50),
+        "llm_calls": len(records),
+        "avg_prompt_tokens": sum(prompt_tokens) / len(prompt_tokens) if prompt_tokens else None,
+        "peak_alloc_mb": peak_mb,
+    }
+
+
+# ---- Scenarios ----
+def per_thread(factory):
+    """One object per worker thread (each worker is one user)"""
+    local = threading.local()
+
+    def get():
+        if not hasattr(local, "value"):
+            local.value = factory()
+        return local.value
+    return get
+
+
+def bench_cli(args, stream=False):
+    cli = load_script("basic_chat_cli", os.path.join(WEEK2_DIR, "basic-chat-cli.py"))
+    bot = per_thread(lambda: cli.SimpleChatBot("benchmark"))
+
+    def op(i):
+        question = QUESTIONS[i % len(QUESTIONS)]
+        if stream:
+            for _ in bot().get_response_stream(question):
+                pass
+        else:
+            bot().get_response(question)
+    return op
+
+
+def bench_streamlit(args):
+    app = load_script("streamlit_chatbot", os.path.join(WEEK2_DIR, "streamlit-chatbot.py"))
+    chatbot = app.ChatBot()
+    history = per_thread(lambda: [{"role": "system", "content": app.get_system_prompts()["Professional Assistant"]}])
+
+    def op(i):
+        # The app sends the whole session history every turn
+        messages = history()
+        messages.append({"role": "user", "content": QUESTIONS[i % len(QUESTIONS)]})
+        reply = "".join(chatbot.get_response_stream(messages))
+        messages.append({"role": "assistant", "content": reply})
+    return op
+
+
+def bench_compare(args):
+    cli = load_script("basic_chat_cli", os.path.join(WEEK2_DIR, "basic-chat-cli.py"))
+    chatbot = cli.SimpleChatBot("benchmark")
+
+    def op(i):
+        cli.compare_personas(chatbot, QUESTIONS[i % len(QUESTIONS)])
+    return op
+
+
+def use_temp_index(args):
+    """Point Week6 at a fresh temporary index (never the app's own faiss_index)"""
+    import langchain_helper
+
+    if args.fake_embeddings:
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        langchain_helper._embedding_model = DeterministicFakeEmbedding(size=384)
+    if not getattr(args, "index_dir", None):
+        args.index_dir = tempfile.mkdtemp(prefix="bench-index-")
+        args.cleanup.append(args.index_dir)
+        langchain_helper.vectordb_file_path = os.path.join(args.index_dir, "faiss_index")
+        langchain_helper.reload_qa_chain(force=True)
+    return langchain_helper
+
+
+def bench_rag(args):
+    langchain_helper = use_temp_index(args)
+
+    def op(i):
+        # Suffix keeps repeats from being served by the semantic cache
+        langchain_helper.answer_query(f"{QUESTIONS[i % len(QUESTIONS)]} (case {i})")
+    return op
+
+
+def bench_faq(args):
+    """What query_router.route_query does for a QA question: FAQ gate first, the chain on a miss"""
+    import csv
+    from common.llm_metrics import metrics
+
+    langchain_helper = use_temp_index(args)
+    with open(langchain_helper.faq_fast_path.file_path, encoding="utf-8") as f:
+        prompts = [row["prompt"] for row in csv.DictReader(f)]
+
+    def op(i):
+        if i % 2 == 0:
+            query = prompts[(i // 2) % len(prompts)]
+        else:
+            query = f"{QUESTIONS[i % len(QUESTIONS)]} (open question {i})"
+        answer, vector = langchain_helper.answer_from_faq(query)
+        if answer is None:
+            langchain_helper.answer_query(query, vector=vector)
+
+    def after():
+        args.faq_stats = langchain_helper.faq_fast_path.stats(metrics.summary("week6-qa")["p50_latency_s"])
+    return op, after
+
+
+def bench_appointment(args):
+    from datetime import date, timedelta
+    from appointments import AppointmentLedger, schedule_appointment
+    from mailer import get_mail_queue
+
+    index_dir = tempfile.mkdtemp(prefix="bench-ledger-")
+    args.cleanup.append(index_dir)
+    ledger = AppointmentLedger(os.path.join(index_dir, "appointments.db"))
+    # Dr. Maria Iqbal works Mondays 9 AM - 1 PM: 8 half-hour slots per Monday
+    first_monday = date.today() + timedelta(days=7 - date.today().weekday())
+
+    def op(i):
+        day = first_monday + timedelta(weeks=i // 8)
+        schedule_appointment(
+            f"book appointment with Dr. Maria Iqbal on {day.isoformat()} at {9 + (i % 8) // 2}:{30 * (i % 2):02d} "
+            f"for Test Patient, email patient{i}@example.com",
+            ledger=ledger,
+        )
+    return op, get_mail_queue().join
+
+
+def print_table(results):
+    def fmt(value, spec):
+        return "-" if value is None else format(value, spec)
+
+    print(f"\n{'scenario':<13}{'ops':>5}{'conc':>5}{'ops/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'ttft ms':>9}{'calls':>7}{'prompt tok':>12}{'peak MB':>9}")
+    for r in results:
+        print(f"{r['scenario']:<13}{r['ops']:>5}{r['concurrency']:>5}{r['ops_per_s']:>9.1f}"
+              f"{fmt(r['p50_ms'], '.1f'):>9}{fmt(r['p95_ms'], '.1f'):>9}{fmt(r['p99_ms'], '.1f'):>9}"
+              f"{fmt(r['ttft_p50_ms'], '.1f'):>9}{r['llm_calls']:>7}{fmt(r['avg_prompt_tokens'], '.0f'):>12}"
+              f"{fmt(r['peak_alloc_mb'], '.2f'):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", type=int, default=60, help="operations per scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="worker threads (simulated users)")
+    parser.add_argument("--latency", type=float, default=0.05, help="mock LLM seconds to first token")
+    parser.add_argument("--chunk-delay", type=float, default=0.005, help="mock LLM seconds between stream chunks")
+    parser.add_argument("--mail-latency", type=float, default=0.01, help="fake mail transport seconds per send")
+    parser.add_argument("--only", help="comma-separated scenarios: " + ",".join(SCENARIOS))
+    parser.add_argument("--fake-embeddings", action="store_true",
+                        help="use random embeddings for rag (no MiniLM download)")
+    parser.add_argument("--memory", action="store_true", help="track peak allocations (slower)")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+    args.cleanup = []
+    if args.json:
+        args.json = os.path.abspath(args.json)
+
+    # Offline stand-ins, set before any app module is imported
+    os.environ.update({
+        "LLM_BACKEND": "mock",
+        "MOCK_LLM_LATENCY": str(args.latency),
+        "MOCK_LLM_CHUNK_DELAY": str(args.chunk_delay),
+        "MAIL_TRANSPORT": "fake",
+        "FAKE_MAIL_LATENCY": str(args.mail_latency),
+    })
+    os.environ.setdefault("API_KEY", "benchmark")
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+    os.environ.setdefault("GEMINI_RPM", "0")  # measure the app, not the rate limiter
+    archive_dir = tempfile.mkdtemp(prefix="bench-transcripts-")
+    args.cleanup.append(archive_dir)
+    os.environ["TRANSCRIPT_ARCHIVE"] = os.path.join(archive_dir, "transcripts.db")
+    sys.path[:0] = [ROOT, WEEK2_DIR, WEEK6_DIR]
+    os.chdir(WEEK6_DIR)  # Week6 reads its CSVs relative to the working directory
+
+    selected = args.only.split(",") if args.only else SCENARIOS
+    builders = {
+        "cli": lambda: bench_cli(args),
+        "cli-stream": lambda: bench_cli(args, stream=True),
+        "streamlit": lambda: bench_streamlit(args),
+        "compare": lambda: bench_compare(args),
+        "rag": lambda: bench_rag(args),
+        "faq": lambda: bench_faq(args),
+        "appointment": lambda: bench_appointment(args),
+    }
+
+    print(f"📊 mock LLM {args.latency * 1000:.0f} ms to first token, {args.ops} ops per scenario, "
+          f"{args.concurrency} workers")
+    results = []
+    try:
+        for name in selected:
+            built = builders[name]()
+            op, after = built if isinstance(built, tuple) else (built, None)
+            results.append(run_scenario(name, op, args.ops, args.concurrency, args.memory, after))
+    finally:
+        for path in args.cleanup:
+            shutil.rmtree(path, ignore_errors=True)
+
+    print_table(results)
+    stats = getattr(args, "faq_stats", None)
+    if stats:
+        saved = "-" if stats["saved_s"] is None else f"{stats['saved_s']:.2f} s"
+        print(f"\nFAQ fast path: {stats['hits']} of {stats['hits'] + stats['misses']} answered without the LLM "
+              f"({stats['bypass_rate']:.0%}), hit p50 {stats['p50_hit_ms'] or 0:.2f} ms, "
+              f"gate overhead p50 {stats['p50_gate_overhead_ms'] or 0:.2f} ms, ~{saved} saved")
+    print(f"\nmax RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Helpers shared by the weekly projects (import with the repo root on sys.path)"""
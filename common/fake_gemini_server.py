@@ -0,0 +1,153 @@
+"""
+A local stand-in for the Gemini REST API, for offline load tests
+
+Serves generateContent / streamGenerateContent with configurable latency,
+a per-key request quota per time window (answered with 429 like the real API)
+and a random 503 rate. Point the SDK at it with:
+
+    genai.configure(api_key="test", transport="rest",
+                    client_options={"api_endpoint": "http://127.0.0.1:8765"})
+
+or set GEMINI_API_ENDPOINT=http://127.0.0.1:8765 for the chatbots.
+
+Usage: python -m common.fake_gemini_server [--port 8765] [--rpm 60] [--failure-rate 0.05]
+"""
+
+import json
+import time
+import random
+import argparse
+import threading
+from collections import deque
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeGemini:
+    """Behaviour and counters shared by all request handlers"""
+
+    def __init__(self, latency=0.05, rpm=0, failure_rate=0.0, chunks=3, window=60.0):
+        self.latency = latency
+        self.rpm = rpm  # requests allowed per `window` seconds (a minute by default)
+        self.window = window
+        self.failure_rate = failure_rate
+        self.chunks = chunks
+        self.counts = {"ok": 0, "throttled": 0, "failed": 0}
+        self._calls = {}  # api key -> deque of recent request times
+        self._lock = threading.Lock()
+
+    def admit(self, api_key):
+        """Return the HTTP status this request gets (200, 429 or 503)"""
+        with self._lock:
+            now = time.monotonic()
+            if self.rpm:
+                calls = self._calls.setdefault(api_key, deque())
+                while calls and now - calls[0] > self.window:
+                    calls.popleft()
+                if len(calls) >= self.rpm:
+                    self.counts["throttled"] += 1
+                    return 429
+                calls.append(now)
+            if random.random() < self.failure_rate:
+                self.counts["failed"] += 1
+                return 503
+            self.counts["ok"] += 1
+            return 200
+
+    def reply_text(self, request):
+        contents = request.get("contents") or [{}]
+        parts = contents[-1].get("parts") or [{}]
+        prompt = " ".join(p.get("text", "") for p in parts)
+        return f"Fake Gemini reply to: {prompt[:80]}"
+
+    def response(self, text, prompt_tokens):
+        return {
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"text": text}]},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+            "usageMetadata": {
+                "promptTokenCount": prompt_tokens,
+                "candidatesTokenCount": len(text) // 4,
+                "totalTokenCount": prompt_tokens + len(text) // 4,
+            },
+        }
+
+
+def make_handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            api_key = self.headers.get("x-goog-api-key") or parse_qs(url.query).get("key", [""])[0]
+
+            status = fake.admit(api_key)
+            if status != 200:
+                message = "Resource has been exhausted (e.g. check quota)." if status == 429 else "The model is overloaded."
+                state = "RESOURCE_EXHAUSTED" if status == 429 else "UNAVAILABLE"
+                self._send_json(status, {"error": {"code": status, "message": message, "status": state}})
+                return
+
+            time.sleep(fake.latency)
+            text = fake.reply_text(request)
+            prompt_tokens = len(json.dumps(request.get("contents", []))) // 4
+
+            if url.path.endswith(":streamGenerateContent"):
+                # The REST transport reads a JSON array of partial responses
+                size = max(1, len(text) // fake.chunks)
+                pieces = [text[i:i + size] for i in range(0, len(text), size)]
+                chunks = [fake.response(piece, prompt_tokens) for piece in pieces]
+                self._send_json(200, chunks)
+            elif url.path.endswith(":generateContent"):
+                self._send_json(200, fake.response(text, prompt_tokens))
+            else:
+                self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def start_server(port=0, **options):
+    """Start in a daemon thread; returns (server, fake, base url)"""
+    fake = FakeGemini(**options)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(fake))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-gemini", daemon=True).start()
+    return server, fake, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per response")
+    parser.add_argument("--rpm", type=int, default=0, help="requests per window per API key (0 = unlimited)")
+    parser.add_argument("--window", type=float, default=60.0, help="quota window in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    args = parser.parse_args()
+
+    server, fake, url = start_server(args.port, latency=args.latency, rpm=args.rpm,
+                                     failure_rate=args.failure_rate, window=args.window)
+    print(f"🧪 Fake Gemini listening on {url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(5)
+    except KeyboardInterrupt:
+        print(f"\n👋 Stopped. {fake.counts}")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Instrumentation for every Gemini call across the weekly projects
+
+Wrap a call with `track_call(pipeline, model)` to record time-to-first-token,
+total latency, prompt/completion tokens, retries and the error class:
+
+    with track_call("week2-cli", "gemini-2.0-flash") as call:
+        response = model.generate_content(prompt)
+        call.set_usage(response)
+
+Records go to the process-wide `metrics` object, which keeps a rolling window
+for p50/p95 summaries, can append a JSONL trace (LLM_TRACE_FILE) and renders
+Prometheus text format (served on LLM_METRICS_PORT if set).
+"""
+
+import os
+import json
+import time
+import queue
+import atexit
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a list (q in 0..100)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))]
+
+
+def usage_from(response):
+    """(prompt tokens, completion tokens) from a Gemini SDK response, LangChain message or dict"""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None and isinstance(response, dict):
+        usage = response.get("usage_metadata")
+    if not usage:
+        return None, None
+    if isinstance(usage, dict):  # LangChain AIMessage.usage_metadata
+        return usage.get("input_tokens"), usage.get("output_tokens")
+    return getattr(usage, "prompt_token_count", None), getattr(usage, "candidates_token_count", None)
+
+
+class LLMMetrics:
+    """Thread-safe store of LLM call records"""
+
+    def __init__(self, window=5000, trace_path=None):
+        self.records = deque(maxlen=window)
+        self.trace_path = trace_path
+        self.totals = {}  # pipeline -> counters since process start
+        self._lock = threading.Lock()
+        self._trace_queue = None  # JSON lines for the trace writer thread
+
+    def _start_trace_writer(self):
+        """One thread appends trace lines, so LLM calls never wait on disk I/O"""
+        self._trace_queue = queue.Queue()
+
+        def run():
+            with open(self.trace_path, "a", encoding="utf-8") as f:
+                while True:
+                    lines = [self._trace_queue.get()]
+                    while not self._trace_queue.empty():
+                        lines.append(self._trace_queue.get_nowait())
+                    f.writelines(lines)
+                    f.flush()
+                    for _ in lines:
+                        self._trace_queue.task_done()
+
+        threading.Thread(target=run, name="llm-trace-writer", daemon=True).start()
+        atexit.register(self._trace_queue.join)
+
+    def flush_trace(self):
+        """Block until every recorded call is in the trace file"""
+        if self._trace_queue is not None:
+            self._trace_queue.join()
+
+    def record(self, record):
+        with self._lock:
+            self.records.append(record)
+            totals = self.totals.setdefault(record["pipeline"], {
+                "calls": 0, "errors": 0, "retries": 0,
+                "prompt_tokens": 0, "completion_tokens": 0, "latency_seconds": 0.0,
+            })
+            totals["calls"] += 1
+            totals["errors"] += record["error"] is not None
+            totals["retries"] += record["retries"]
+            totals["prompt_tokens"] += record["prompt_tokens"] or 0
+            totals["completion_tokens"] += record["completion_tokens"] or 0
+            totals["latency_seconds"] += record["latency_s"]
+            if self.trace_path and self._trace_queue is None:
+                self._start_trace_writer()
+        if self.trace_path:
+            self._trace_queue.put(json.dumps(record) + "\n")
+
+    def summary(self, pipeline=None):
+        with self._lock:
+            records = [r for r in self.records if pipeline is None or r["pipeline"] == pipeline]
+        ok = [r for r in records if r["error"] is None]
+        latencies = [r["latency_s"] for r in ok]
+        ttfts = [r["ttft_s"] for r in ok if r["ttft_s"] is not None]
+        return {
+            "calls": len(records),
+            "errors": len(records) - len(ok),
+            "p50_latency_s": percentile(latencies, 50),
+            "p95_latency_s": percentile(latencies, 95),
+            "p50_ttft_s": percentile(ttfts, 50),
+            "prompt_tokens": sum(r["prompt_tokens"] or 0 for r in records),
+            "completion_tokens": sum(r["completion_tokens"] or 0 for r in records),
+            "retries": sum(r["retries"] for r in records),
+        }
+
+    def render_prometheus(self):
+        """Counters since start plus latency quantiles over the rolling window"""
+        lines = [
+            "# TYPE llm_calls_total counter",
+            "# TYPE llm_errors_total counter",
+            "# TYPE llm_retries_total counter",
+            "# TYPE llm_tokens_total counter",
+            "# TYPE llm_latency_seconds summary",
+        ]
+        with self._lock:
+            totals = {p: dict(t) for p, t in self.totals.items()}
+        for pipeline, t in sorted(totals.items()):
+            label = f'pipeline="{pipeline}"'
+            lines.append(f"llm_calls_total{{{label}}} {t['calls']}")
+            lines.append(f"llm_errors_total{{{label}}} {t['errors']}")
+            lines.append(f"llm_retries_total{{{label}}} {t['retries']}")
+            lines.append(f'llm_tokens_total{{{label},kind="prompt"}} {t["prompt_tokens"]}')
+            lines.append(f'llm_tokens_total{{{label},kind="completion"}} {t["completion_tokens"]}')
+            summary = self.summary(pipeline)
+            for q, key in (("0.5", "p50_latency_s"), ("0.95", "p95_latency_s")):
+                if summary[key] is not None:
+                    lines.append(f'llm_latency_seconds{{{label},quantile="{q}"}} {summary[key]:.6f}')
+            lines.append(f"llm_latency_seconds_sum{{{label}}} {t['latency_seconds']:.6f}")
+            lines.append(f"llm_latency_seconds_count{{{label}}} {t['calls']}")
+        return "\n".join(lines) + "\n"
+
+
+class CallTracker:
+    """Times one LLM call; use via track_call()"""
+
+    def __init__(self, pipeline, model=None, store=None):
+        self.pipeline = pipeline
+        self.model = model
+        self.store = store
+        self.prompt_tokens = None
+        self.completion_tokens = None
+        self.retries = 0
+        self.streamed = False
+        self._start = None
+        self._first_token = None
+        self._recorded = False
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is GeneratorExit:
+            self.finish("Cancelled")  # consumer stopped reading a stream
+        else:
+            self.finish(exc_type.__name__ if exc_type else None)
+        return False
+
+    def first_token(self):
+        if self._first_token is None:
+            self._first_token = time.perf_counter()
+
+    def set_usage(self, response):
+        prompt_tokens, completion_tokens = usage_from(response)
+        if prompt_tokens is not None:
+            self.prompt_tokens = prompt_tokens
+        if completion_tokens is not None:
+            self.completion_tokens = completion_tokens
+
+    def stream(self, chunks):
+        """Pass chunks through, noting the first one and usage on the last"""
+        self.streamed = True
+        for chunk in chunks:
+            self.first_token()
+            self.set_usage(chunk)
+            yield chunk
+
+    def finish(self, error=None):
+        if self._recorded:
+            return
+        self._recorded = True
+        end = time.perf_counter()
+        # Non-streamed calls get their first token when the whole reply lands
+        first = self._first_token if self._first_token is not None else end
+        (self.store or metrics).record({
+            "ts": time.time(),
+            "pipeline": self.pipeline,
+            "model": self.model,
+            "streamed": self.streamed,
+            "ttft_s": None if error else round(first - self._start, 6),
+            "latency_s": round(end - self._start, 6),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "retries": self.retries,
+            "error": error,
+        })
+
+
+def track_call(pipeline, model=None):
+    return CallTracker(pipeline, model)
+
+
+def langchain_usage_callback(tracker):
+    """LangChain callback handler that feeds LLM token usage into a tracker"""
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class _UsageHandler(BaseCallbackHandler):
+        def on_llm_new_token(self, token, **kwargs):
+            tracker.first_token()
+
+        def on_llm_end(self, response, **kwargs):
+            for generations in response.generations:
+                for generation in generations:
+                    message = getattr(generation, "message", None)
+                    if message is not None:
+                        tracker.set_usage(message)
+
+    return _UsageHandler()
+
+
+def render_streamlit_panel(st, pipeline=None):
+    """p50/p95 latency and token spend, for an app's sidebar statistics section"""
+    summary = metrics.summary(pipeline)
+    if not summary["calls"]:
+        st.caption("No LLM calls recorded yet.")
+        return
+    col1, col2 = st.columns(2)
+    col1.metric("p50 latency", f"{summary['p50_latency_s'] or 0:.2f}s")
+    col2.metric("p95 latency", f"{summary['p95_latency_s'] or 0:.2f}s")
+    col1.metric("Prompt tokens", summary["prompt_tokens"])
+    col2.metric("Completion tokens", summary["completion_tokens"])
+    ttft = summary["p50_ttft_s"]
+    st.caption(
+        f"{summary['calls']} calls, {summary['errors']} errors, {summary['retries']} retries"
+        + (f", p50 time-to-first-token {ttft:.2f}s" if ttft is not None else "")
+    )
+
+
+def start_metrics_server(port):
+    """Serve render_prometheus() at http://localhost:<port>/metrics"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = metrics.render_prometheus().encode("utf-8")
+            self.send_response(200 if self.path == "/metrics" else 404)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.end_headers()
+            if self.path == "/metrics":
+                self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, name="llm-metrics-server", daemon=True).start()
+    return server
+
+
+# One store per process
+metrics = LLMMetrics(trace_path=os.getenv("LLM_TRACE_FILE"))
+
+if os.getenv("LLM_METRICS_PORT"):
+    try:
+        start_metrics_server(int(os.environ["LLM_METRICS_PORT"]))
+    except OSError as e:
+        print(f"⚠️ Could not start LLM metrics server: {e}")
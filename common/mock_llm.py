@@ -0,0 +1,163 @@
+"""
+Deterministic local stand-ins for Gemini, for benchmarks and offline runs
+
+Set LLM_BACKEND=mock and the chatbots use these instead of the real API:
+
+- `mock_genai` mimics the parts of google.generativeai the week2 backend
+  uses (configure, GenerativeModel, generate_content, start_chat/send_message,
+  streaming and usage_metadata);
+- `get_mock_chat_model()` is a LangChain chat model for the Week6 chain.
+
+Replies are derived from a hash of the prompt, so the same input always gives
+the same output. MOCK_LLM_LATENCY sets the delay before the first token and
+MOCK_LLM_CHUNK_DELAY the delay between streamed chunks (seconds).
+"""
+
+import os
+import time
+import hashlib
+import threading
+from types import SimpleNamespace
+
+
+REPLIES = [
+    "Here is a short answer based on what you asked.",
+    "That depends on a few factors; the most important ones are listed below.",
+    "Good question. The usual approach is to start small and measure.",
+    "I would recommend checking the details with the relevant department.",
+]
+
+
+def is_enabled():
+    return os.getenv("LLM_BACKEND", "").lower() == "mock"
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def mock_reply(prompt, model_name="mock"):
+    """Deterministic reply text for a prompt"""
+    digest = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest(), 16)
+    words = prompt.split()
+    topic = " ".join(words[-6:]) if words else "your message"
+    return f"{REPLIES[digest % len(REPLIES)]} ({model_name} on: {topic})"
+
+
+def _text_of(contents):
+    """Flatten a prompt string / parts list / contents list into plain text"""
+    if isinstance(contents, str):
+        return contents
+    if isinstance(contents, dict):
+        return _text_of(contents.get("parts", []))
+    if isinstance(contents, (list, tuple)):
+        return "\n".join(_text_of(c) for c in contents)
+    return str(contents)
+
+
+class MockResponse:
+    """Quacks like GenerateContentResponse: .text, .parts, .usage_metadata, iterable when streamed"""
+
+    def __init__(self, text, prompt_tokens, chunks=None, completion_tokens=None):
+        self.text = text
+        self.parts = [SimpleNamespace(text=text)] if text else []
+        completion_tokens = completion_tokens or estimate_tokens(text)
+        self.usage_metadata = SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=completion_tokens,
+            total_token_count=prompt_tokens + completion_tokens,
+        )
+        self._chunks = chunks
+
+    def __iter__(self):
+        if self._chunks is None:
+            yield self
+            return
+        for chunk in self._chunks():
+            yield chunk
+
+
+class MockGenerativeModel:
+    def __init__(self, model_name="mock", system_instruction=None, **kwargs):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.latency = float(os.getenv("MOCK_LLM_LATENCY", "0.2"))
+        self.chunk_delay = float(os.getenv("MOCK_LLM_CHUNK_DELAY", "0.02"))
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        prompt = _text_of(contents)
+        prompt_tokens = estimate_tokens((self.system_instruction or "") + prompt)
+        text = mock_reply(prompt, self.model_name)
+        if not stream:
+            time.sleep(self.latency)
+            return MockResponse(text, prompt_tokens)
+
+        def chunks():
+            time.sleep(self.latency)
+            words = text.split(" ")
+            for i in range(0, len(words), 4):
+                if i:
+                    time.sleep(self.chunk_delay)
+                # Like Gemini, usage counts everything generated so far
+                so_far = estimate_tokens(" ".join(words[:i + 4]))
+                yield MockResponse(" ".join(words[i:i + 4]) + " ", prompt_tokens, completion_tokens=so_far)
+
+        return MockResponse(text, prompt_tokens, chunks)
+
+    def start_chat(self, history=None):
+        return MockChatSession(self, list(history or []))
+
+
+class MockChatSession:
+    def __init__(self, model, history):
+        self.model = model
+        self.history = history
+
+    def send_message(self, content, stream=False, **kwargs):
+        contents = self.history + [{"role": "user", "parts": [content]}]
+        response = self.model.generate_content(contents, stream=stream)
+        self.history = contents + [{"role": "model", "parts": [response.text]}]
+        return response
+
+
+# Stands in for the google.generativeai module
+mock_genai = SimpleNamespace(configure=lambda **kwargs: None, GenerativeModel=MockGenerativeModel)
+
+
+_chat_model_class = None
+_class_lock = threading.Lock()
+
+
+def get_mock_chat_model(latency=None):
+    """A LangChain chat model replying like MockGenerativeModel (langchain imported lazily)"""
+    global _chat_model_class
+    with _class_lock:
+        if _chat_model_class is None:
+            from langchain_core.language_models.chat_models import BaseChatModel
+            from langchain_core.messages import AIMessage
+            from langchain_core.outputs import ChatGeneration, ChatResult
+
+            class MockChatModel(BaseChatModel):
+                latency: float = 0.2
+
+                @property
+                def _llm_type(self):
+                    return "mock"
+
+                def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+                    prompt = "\n".join(str(m.content) for m in messages)
+                    text = mock_reply(prompt, "mock-chat")
+                    time.sleep(self.latency)
+                    usage = {
+                        "input_tokens": estimate_tokens(prompt),
+                        "output_tokens": estimate_tokens(text),
+                        "total_tokens": estimate_tokens(prompt) + estimate_tokens(text),
+                    }
+                    message = AIMessage(content=text, usage_metadata=usage)
+                    return ChatResult(generations=[ChatGeneration(message=message)])
+
+            _chat_model_class = MockChatModel
+
+    if latency is None:
+        latency = float(os.getenv("MOCK_LLM_LATENCY", "0.2"))
+    return _chat_model_class(latency=latency)
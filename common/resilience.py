@@ -0,0 +1,215 @@
+"""
+Rate limiting, retries and a circuit breaker for Gemini calls
+
+    client = get_client(api_key)
+    response = client.call(model.generate_content, prompt)
+
+Every call for an API key first takes a token from that key's bucket
+(GEMINI_RPM per minute, bursts up to GEMINI_BURST), retries quota (429),
+5xx and connection errors with jittered exponential backoff (GEMINI_MAX_RETRIES),
+and fails fast with CircuitOpenError after CIRCUIT_FAILURES retryable failures
+in a row until CIRCUIT_RESET_SECONDS have passed.
+"""
+
+import os
+import time
+import random
+import threading
+
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+# google.api_core exception names, for SDK errors that carry no status code
+RETRYABLE_NAMES = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError",
+    "BadGateway", "GatewayTimeout", "DeadlineExceeded", "Aborted",
+}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the API while the circuit is open"""
+
+
+def status_code(exc):
+    """HTTP status of an SDK / HTTP error, or None"""
+    for value in (getattr(exc, "code", None), getattr(exc, "status_code", None),
+                  getattr(getattr(exc, "response", None), "status_code", None)):
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_retryable(exc):
+    """Quota, overload, 5xx and network errors are worth retrying; bad requests are not"""
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    code = status_code(exc)
+    if code is not None:
+        return code in RETRYABLE_STATUS
+    return any(cls.__name__ in RETRYABLE_NAMES for cls in type(exc).__mro__)
+
+
+class TokenBucket:
+    """Allows `rate_per_minute` calls on average with bursts of up to `burst`"""
+
+    def __init__(self, rate_per_minute, burst=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst or max(1, rate_per_minute // 6))
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout=None):
+        """Block until a token is free; False if that would take longer than `timeout`"""
+        if self.rate <= 0:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """closed -> open after `failure_threshold` failures in a row -> half-open after `reset_timeout`"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if now - self.opened_at >= self.reset_timeout else "open"
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go out (one trial call when half-open)"""
+        with self._lock:
+            now = time.monotonic()
+            state = self._state(now)
+            if state == "closed":
+                return
+            if state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                return
+            retry_in = max(0.0, self.reset_timeout - (now - self.opened_at))
+            raise CircuitOpenError(f"Gemini is unavailable right now, retry in {retry_in:.0f}s")
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class ResilientClient:
+    """Wraps calls for one API key with its bucket, retry policy and breaker"""
+
+    def __init__(self, rate_per_minute=60, burst=None, max_retries=4, base_delay=1.0,
+                 max_delay=30.0, breaker=None, sleep=time.sleep):
+        self.bucket = TokenBucket(rate_per_minute, burst)
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.stats = {"calls": 0, "retries": 0, "failures": 0, "rejected": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def backoff(self, attempt):
+        """Full jitter: a random delay up to base * 2^attempt, capped"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, fn, *args, tracker=None, **kwargs):
+        """fn(*args, **kwargs) with rate limiting, retries and the circuit breaker.
+
+        `tracker` is an optional llm_metrics CallTracker whose retry count is updated.
+        """
+        self._count("calls")
+        attempt = 0
+        while True:
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                self._count("rejected")
+                raise
+            self.bucket.acquire()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    # The API answered, it just didn't like the request
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if attempt >= self.max_retries:
+                    self._count("failures")
+                    raise
+                self.sleep(self.backoff(attempt))
+                attempt += 1
+                self._count("retries")
+                if tracker is not None:
+                    tracker.retries += 1
+                continue
+            self.breaker.record_success()
+            return result
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def client_from_env(**overrides):
+    """A new ResilientClient configured from the environment; keyword arguments override it"""
+    settings = dict(
+        rate_per_minute=int(os.getenv("GEMINI_RPM", "60")),
+        burst=int(os.getenv("GEMINI_BURST", "0")) or None,
+        max_retries=int(os.getenv("GEMINI_MAX_RETRIES", "4")),
+        base_delay=float(os.getenv("GEMINI_RETRY_BASE_DELAY", "1.0")),
+        breaker=CircuitBreaker(
+            failure_threshold=int(os.getenv("CIRCUIT_FAILURES", "5")),
+            reset_timeout=float(os.getenv("CIRCUIT_RESET_SECONDS", "30")),
+        ),
+    )
+    settings.update(overrides)
+    return ResilientClient(**settings)
+
+
+def get_client(api_key):
+    """One ResilientClient per API key per process, configured from the environment"""
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = client_from_env()
+            _clients[api_key] = client
+        return client
@@ -0,0 +1,27 @@
+"""
+SQLite connections shared by the transcript archive and the appointment ledger
+
+Both open the same kind of database: one connection per thread in WAL mode,
+with autocommit so writers control their own BEGIN IMMEDIATE transactions.
+"""
+
+import sqlite3
+import threading
+
+
+class ThreadLocalConnection:
+    """Hands each thread its own connection to one database file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def get(self):
+        """This thread's connection, opened on first use (sqlite3 connections aren't shared across threads)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
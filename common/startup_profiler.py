@@ -0,0 +1,99 @@
+"""
+Startup profiler: how long each import / client init takes
+
+In-app: wrap expensive steps with `profiler.step("name")` and show
+`profiler.rows()` somewhere. From the shell, measure cold import time of
+modules, each in a fresh interpreter:
+
+    python -m common.startup_profiler google.generativeai langchain_huggingface
+"""
+
+import sys
+import time
+import logging
+import threading
+import subprocess
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class StartupProfiler:
+    """Collects (component, seconds, thread) timings for the whole process"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self._timings = []
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            self._timings.append((name, seconds, threading.current_thread().name))
+
+    @contextmanager
+    def step(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def rows(self):
+        """Timings as dicts, slowest first"""
+        with self._lock:
+            timings = list(self._timings)
+        return [
+            {"component": name, "seconds": round(seconds, 3), "thread": thread}
+            for name, seconds, thread in sorted(timings, key=lambda t: t[1], reverse=True)
+        ]
+
+    def report(self):
+        lines = [f"{'component':<40}{'seconds':>10}  thread"]
+        lines += [f"{r['component']:<40}{r['seconds']:>10.3f}  {r['thread']}" for r in self.rows()]
+        return "\n".join(lines)
+
+
+# One profiler per process, shared by every module that imports it
+profiler = StartupProfiler()
+
+
+def warm_in_background(name, *loaders):
+    """Run loader callables in a daemon thread so the UI can render first"""
+    def run():
+        for loader in loaders:
+            try:
+                loader()
+            except Exception:
+                logger.exception("Background warm-up step %s failed", getattr(loader, "__name__", loader))
+
+    thread = threading.Thread(target=run, name=name, daemon=True)
+    thread.start()
+    return thread
+
+
+def measure_import(module):
+    """Cold import time of one module, in a fresh interpreter"""
+    code = f"import time; s = time.perf_counter(); import {module}; print(time.perf_counter() - s)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main(modules):
+    print(f"{'module':<40}{'cold import s':>14}")
+    for module in modules:
+        seconds = measure_import(module)
+        print(f"{module:<40}{'not installed' if seconds is None else f'{seconds:.3f}':>14}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or [
+        "streamlit",
+        "google.generativeai",
+        "langchain_google_genai",
+        "langchain_huggingface",
+        "langchain.chains",
+        "langchain_community.vectorstores",
+        "faiss",
+    ])
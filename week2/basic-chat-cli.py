@@ -1,68 +1,166 @@
 import os 
-import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from dotenv import load_dotenv
-import google.generativeai as genai
+
+from chat_backend import ChatBackend, warm_up
+from chat_context import ChatContext
+from transcript_archive import TranscriptArchive
 
 load_dotenv() 
 
 class SimpleChatBot:
-    def __init__(self, api_key: str):
-        """Initialize chatbot with api key"""
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel("gemini-2.0-flash") 
-        self.conversation_history = [] # Additional feature: store history
+    def __init__(self, api_key: str, token_budget: int = 2000, summarize_evicted: bool = False,
+                 backend: ChatBackend = None, archive: TranscriptArchive = None, pipeline: str = "week2-cli"):
+        """Initialize chatbot with api key (or a backend/archive shared with other sessions)"""
+        self.backend = backend or ChatBackend(api_key, "gemini-2.0-flash")
+        self.pipeline = pipeline  # label for this bot's calls in common.llm_metrics
+        # Additional feature: store history, bounded by a token budget
+        self.context = ChatContext(
+            token_budget=token_budget,
+            summarizer=self._summarize if summarize_evicted else None
+        )
         self.system_prompt = "You are a helpful AI assistant."
+        # Full transcript for the archive; the context above only keeps what fits the budget
+        self._archive = archive
+        self.transcript = []
+        self.session_name = None
+        self._archived = 0  # turns of self.transcript already saved under session_name
+
+    @property
+    def archive(self):
+        """Transcript archive, opened on first /save, /load or /search"""
+        if self._archive is None:
+            self._archive = TranscriptArchive()
+        return self._archive
+
+    @property
+    def conversation_history(self):
+        """Messages currently inside the token budget"""
+        return self.context.messages
 
+    @conversation_history.setter
+    def conversation_history(self, messages):
+        self.context.clear()
+        self.transcript = list(messages)
+        self.session_name = None
+        self._archived = 0
+        # Restoring a transcript keeps the newest turns that fit the budget; older
+        # ones are dropped rather than summarized one LLM call per eviction
+        self.context.extend(messages, summarize=False)
 
+    def _summarize(self, previous_summary: str, evicted: list) -> str:
+        """Fold turns that fell out of the budget into the rolling summary"""
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in evicted)
+        prompt = (
+            "Update this conversation summary with the new turns. "
+            "Keep it under 100 words.\n"
+            f"Summary so far: {previous_summary or '(none)'}\n"
+            f"New turns:\n{transcript}"
+        )
+        try:
+            return self.backend.reply(None, [], prompt, pipeline="week2-summary")
+        except Exception:
+            return previous_summary
         
     def set_system_prompt(self, prompt: str):
         """Set or update the system prompt"""
         self.system_prompt = prompt
         print(f"✅ System prompt updated: {prompt[:50]}...")
     
-    def get_response(self, user_input: str) -> str:
-        """Get response from Gemini API"""
-        conversation_text = f"System: {self.system_prompt}\n"
-        for msg in self.conversation_history:
-            role = "User" if msg["role"] == "user" else "Assistant" 
-            conversation_text += f"{role}: {msg['content']}\n"
-        conversation_text += f"User: {user_input}\nAssistant:"
-
-        try:
-            response = self.model.generate_content(conversation_text)
-            ai_response = response.text.strip()
+    def _remember(self, user_input: str, ai_response: str):
+        """Save the finished turn into history"""
+        self.context.add("user", user_input)
+        self.context.add("assistant", ai_response)
+        self.transcript.append({"role": "user", "content": user_input})
+        self.transcript.append({"role": "assistant", "content": ai_response})
 
-            # Save history
-            self.conversation_history.append({"role": "user", "content": user_input})
-            self.conversation_history.append({"role": "assistant", "content": ai_response})
+    def ask(self, user_input: str) -> str:
+        """Get response from Gemini API; errors are raised to the caller"""
+        ai_response = self.backend.reply(
+            self.system_prompt, self.context.window(user_input), user_input, pipeline=self.pipeline
+        )
+        self._remember(user_input, ai_response)
+        return ai_response
 
-            if len(self.conversation_history) > 20:
-                self.conversation_history = self.conversation_history[-20:]
+    def ask_stream(self, user_input: str):
+        """Yield the response chunk by chunk; errors are raised to the caller"""
+        chunks = []
+        for text in self.backend.reply_stream(
+            self.system_prompt, self.context.window(user_input), user_input, pipeline=self.pipeline
+        ):
+            chunks.append(text)
+            yield text
 
-            return ai_response
+        # History only gets the reply once the stream has finished
+        self._remember(user_input, "".join(chunks).strip())
 
+    def get_response(self, user_input: str) -> str:
+        """Get response from Gemini API"""
+        try:
+            return self.ask(user_input)
         except Exception as e:
             return f"❌ Error: {str(e)}"
+
+    def get_response_stream(self, user_input: str):
+        """Yield the response chunk by chunk as Gemini generates it"""
+        try:
+            yield from self.ask_stream(user_input)
+        except Exception as e:
+            yield f"❌ Error: {str(e)}"
         
     def save_conversation(self, filename: str = None):
-        """Save conversation to JSON file"""
-        if not filename:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"conversation_{timestamp}.json"
-        
-        conversation_data = {
-            "timestamp": datetime.now().isoformat(),
-            "system_prompt": self.system_prompt,
-            "conversation": self.conversation_history
-        }
-        
+        """Save conversation to the transcript archive"""
+        name = filename or self.session_name or f"conversation_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        # Saving again under the same name only writes the turns added since last time
+        start = self._archived if name == self.session_name else 0
+
         try:
-            with open(filename, 'w') as f:
-                json.dump(conversation_data, f, indent=2)
-            print(f"💾 Conversation saved to {filename}")
+            self.archive.save(name, self.system_prompt, self.transcript[start:], start)
+            self.session_name = name
+            self._archived = len(self.transcript)
+            print(f"💾 Conversation saved as '{name}' ({len(self.transcript)} messages)")
         except Exception as e:
             print(f"❌ Error saving conversation: {e}")
+
+    def load_conversation(self, name: str):
+        """Restore a saved session (an old /save .json file is imported first)"""
+        try:
+            if name.endswith(".json") and os.path.exists(name):
+                name = self.archive.import_json(name)
+            saved = self.archive.load(name)
+        except Exception as e:
+            print(f"❌ Error loading conversation: {e}")
+            return
+        if saved is None:
+            print(f"❌ No saved conversation named '{name}'.")
+            return
+
+        system_prompt, messages = saved
+        self.conversation_history = messages
+        self.system_prompt = system_prompt or self.system_prompt
+        self.session_name = name
+        self._archived = len(messages)
+        print(f"📂 Loaded '{name}' ({len(messages)} messages)")
+
+    def search_conversations(self, query: str, limit: int = 10):
+        """Print the saved turns that best match a full-text query"""
+        start = time.perf_counter()
+        try:
+            results = self.archive.search(query, limit)
+        except Exception as e:
+            print(f"❌ Error searching conversations: {e}")
+            return
+        elapsed = (time.perf_counter() - start) * 1000
+
+        if not results:
+            print(f"📭 No saved messages match '{query}'.")
+            return
+        print(f"\n🔎 {len(results)} match{'es' if len(results) > 1 else ''} ({elapsed:.1f} ms)")
+        for r in results:
+            icon = "👤" if r["role"] == "user" else "🤖"
+            print(f"   {icon} {r['session']} #{r['position'] + 1}: {r['snippet']}")
     
     
     def show_history(self):
@@ -88,24 +186,37 @@ class SimpleChatBot:
         
         print("\n" + "="*50)
 
-def compare_personas(api_key: str, user_input: str):
-    """Ask the same question to all personas and compare responses."""
+def _ask_persona(backend: ChatBackend, system_prompt: str, user_input: str):
+    """Ask one persona a fresh question; returns (response, latency in seconds)"""
+    start = time.perf_counter()
+    try:
+        text = backend.reply(system_prompt, [], user_input, pipeline="week2-compare")
+    except Exception as e:
+        text = f"❌ Error: {str(e)}"
+    return text, time.perf_counter() - start
+
+
+def compare_personas(chatbot: SimpleChatBot, user_input: str, max_workers: int = 3):
+    """Ask the same question to all personas in parallel and compare responses."""
     presets = get_system_prompt_presets()
 
     print("\n📊 COMPARISON RESULTS")
     print("=" * 60)
 
-    for key, (name, prompt) in presets.items():
-
-        chatbot = SimpleChatBot(api_key) # New instance for each persona
-        chatbot.set_system_prompt(prompt)
-        chatbot.conversation_history = []  # Refreshing history
-
-        response = chatbot.get_response(user_input)
+    start = time.perf_counter()
+    # One configured backend is shared; each persona only differs by its system instruction
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(_ask_persona, chatbot.backend, prompt, user_input): name
+            for name, prompt in presets.values()
+        }
+        for future in as_completed(futures):
+            response, latency = future.result()
+            print(f"\n👤 Persona: {futures[future]} ({latency:.2f}s)")
+            print("-" * 60)
+            print(response)
 
-        print(f"\n👤 Persona: {name}")
-        print("-" * 60)
-        print(response)
+    print(f"\n⏱️ Compared {len(presets)} personas in {time.perf_counter() - start:.2f}s")
 
 
 def get_system_prompt_presets():
@@ -126,7 +237,9 @@ def display_help():
     print("💬 Just type your message to chat")
     print("📝 /system    - Change system prompt")
     print("📜 /history   - Show conversation history")  
-    print("💾 /save      - Save conversation to file")
+    print("💾 /save      - Save conversation to the archive")
+    print("📂 /load      - Load a saved conversation")
+    print("🔎 /search    - Search all saved conversations")
     print("💾 /compare   - Compare different System Prompts")
     print("🧹 /clear     - Clear conversation history")
     print("❓ /help      - Show this help message")
@@ -134,6 +247,8 @@ def display_help():
     print("="*50)
 
 def main():
+    # Start importing the Gemini SDK while the user reads the banner / types
+    warm_up()
     print("🤖 Welcome to the Simple ChatBot!")
     print("="*40)
     
@@ -147,7 +262,11 @@ def main():
     
     # Initializing chatbot
     try:
-        chatbot = SimpleChatBot(api_key)
+        chatbot = SimpleChatBot(
+            api_key,
+            token_budget=int(os.getenv("CHAT_TOKEN_BUDGET", "2000")),
+            summarize_evicted=os.getenv("SUMMARIZE_HISTORY", "").lower() in ("1", "true", "yes")
+        )
         print("✅ Chatbot initialized successfully!")
     except Exception as e:
         print(f"❌ Failed to initialize chatbot: {e}")
@@ -178,7 +297,7 @@ def main():
                 elif command == 'compare':
                     question = input("Enter your question to compare: ").strip()
                     if question:
-                        compare_personas(api_key, question)
+                        compare_personas(chatbot, question)
 
                 
                 elif command == 'clear':
@@ -214,18 +333,29 @@ def main():
                     chatbot.save_conversation(filename)
                 
                 elif command == 'load':
-                    filename = input("Enter filename to load: ").strip()
-                    if filename:
-                        chatbot.load_conversation(filename)
+                    recent = chatbot.archive.sessions(5)
+                    if recent:
+                        print("\n📂 Recent conversations:")
+                        for name, updated_at, count in recent:
+                            print(f"   {name} ({count} messages, {updated_at})")
+                    name = input("Enter conversation name (or .json file) to load: ").strip()
+                    if name:
+                        chatbot.load_conversation(name)
+
+                elif command == 'search':
+                    query = input("Search saved conversations for: ").strip()
+                    if query:
+                        chatbot.search_conversations(query)
                 
                 else:
                     print(f"❌ Unknown command: {command}. Type '/help' for available commands.")
             
             else:
                 # Regular chat message
-                print("\n🤖 Assistant:", end=" ")
-                response = chatbot.get_response(user_input)
-                print(response)
+                print("\n🤖 Assistant:", end=" ", flush=True)
+                for chunk in chatbot.get_response_stream(user_input):
+                    print(chunk, end="", flush=True)
+                print()
         
         except KeyboardInterrupt:
             print("\n\n👋 Chat interrupted. Goodbye!")
@@ -0,0 +1,127 @@
+"""
+Shared Gemini conversation backend for the CLI and Streamlit chatbots
+
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.startup_profiler import profiler, warm_in_background
+from common.llm_metrics import track_call
+from common.resilience import get_client
+from common import mock_llm
+
+
+_warm_thread = None
+
+
+def _import_genai():
+    # google.generativeai pulls in grpc/protobuf and takes over a second, so it
+    # is only imported when the first backend is built (or by warm_up)
+    if mock_llm.is_enabled():  # LLM_BACKEND=mock: offline stand-in for benchmarks
+        return mock_llm.mock_genai
+    if "google.generativeai" in sys.modules:
+        return sys.modules["google.generativeai"]
+    with profiler.step("import google.generativeai"):
+        import google.generativeai as genai
+    return genai
+
+
+def warm_up():
+    """Import the Gemini SDK in a background thread while the UI starts (once)"""
+    global _warm_thread
+    if _warm_thread is None:
+        _warm_thread = warm_in_background("genai-warmup", _import_genai)
+    return _warm_thread
+
+
+class ChatBackend:
+    """Sends structured, role-tagged turns through Gemini chat sessions.
+
+    The system prompt goes in as `system_instruction` and history as
+    user/model contents, so the request starts with the same stable prefix
+    every turn (which is what provider-side prompt caching keys on) and
+    nothing is re-flattened into a transcript string.
+    """
+
+    def __init__(self, api_key: str, model_name: str = "gemini-2.0-flash", max_models: int = None):
+        self._genai = genai = _import_genai()
+        endpoint = os.getenv("GEMINI_API_ENDPOINT")  # e.g. common/fake_gemini_server.py
+        if endpoint:
+            genai.configure(api_key=api_key, transport="rest", client_options={"api_endpoint": endpoint})
+        else:
+            genai.configure(api_key=api_key)
+        # Rate limit, retries and circuit breaker shared by everything using this key
+        self.client = get_client(api_key)
+        self.model_name = model_name
+        # system prompt -> GenerativeModel, least recently used first. Capped, because
+        # the chat server lets clients pick any system prompt they like.
+        self.max_models = max_models or int(os.getenv("CHAT_MAX_MODELS", "64"))
+        self._models = OrderedDict()
+        self._models_lock = threading.Lock()
+
+    def model_for(self, system_prompt: str = None):
+        """One model per system prompt, reused across turns and sessions while it is recent"""
+        with self._models_lock:
+            model = self._models.get(system_prompt)
+            if model is not None:
+                self._models.move_to_end(system_prompt)
+                return model
+        model = self._genai.GenerativeModel(self.model_name, system_instruction=system_prompt)
+        with self._models_lock:
+            self._models[system_prompt] = model
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+        return model
+
+    @staticmethod
+    def to_contents(messages):
+        """Convert role/content dicts into Gemini contents.
+
+        System messages are skipped (they belong in system_instruction),
+        consecutive turns from the same role are merged and the history always
+        starts with a user turn, as the API expects.
+        """
+        contents = []
+        for msg in messages:
+            if msg["role"] == "system":
+                continue
+            role = "model" if msg["role"] == "assistant" else "user"
+            if contents and contents[-1]["role"] == role:
+                contents[-1]["parts"].append(msg["content"])
+            elif contents or role == "user":
+                contents.append({"role": role, "parts": [msg["content"]]})
+        return contents
+
+    def send(self, system_prompt: str, history, user_input: str, stream: bool = False):
+        """Send one user turn on top of `history`; returns the SDK response"""
+        chat = self.model_for(system_prompt).start_chat(history=self.to_contents(history))
+        # The SDK's own retry would silently re-send 503s for minutes; common.resilience owns retries
+        request_options = {"retry": None, "timeout": float(os.getenv("GEMINI_TIMEOUT", "60"))}
+        return chat.send_message(user_input, stream=stream, request_options=request_options)
+
+    def reply(self, system_prompt: str, history, user_input: str, pipeline: str = "week2") -> str:
+        """Send one turn and return its text, recording latency/tokens/errors"""
+        with track_call(pipeline, self.model_name) as call:
+            response = self.client.call(self.send, system_prompt, history, user_input, tracker=call)
+            call.set_usage(response)
+            return response.text.strip()
+
+    def reply_stream(self, system_prompt: str, history, user_input: str, pipeline: str = "week2"):
+        """Yield the reply text chunk by chunk, recording time-to-first-token too"""
+        with track_call(pipeline, self.model_name) as call:
+            # Only opening the stream is retried; a stream that breaks halfway is not replayed
+            response = self.client.call(self.send, system_prompt, history, user_input, stream=True, tracker=call)
+            for chunk in call.stream(response):
+                if chunk.parts:
+                    yield chunk.text
+
+    def reply_messages(self, messages, pipeline: str = "week2", stream: bool = False):
+        """reply()/reply_stream() for an OpenAI-style message list"""
+        system_prompt = "\n".join(m["content"] for m in messages if m["role"] == "system") or None
+        turns = [m for m in messages if m["role"] != "system"]
+        method = self.reply_stream if stream else self.reply
+        return method(system_prompt, turns[:-1], turns[-1]["content"], pipeline=pipeline)
@@ -0,0 +1,92 @@
+"""
+Token-budgeted conversation history for the chatbots
+
+"""
+
+from collections import deque
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for Gemini models)"""
+    return max(1, len(text) // 4)
+
+
+class ChatContext:
+    """Keeps conversation history as a token-counted ring buffer.
+
+    Each message is counted once when it is added and a running total is
+    kept, so building the window never rescans the whole session. Oldest
+    turns are evicted whenever the history would go over `token_budget`.
+    If a `summarizer(previous_summary, evicted_messages)` is given, evicted
+    turns are folded into a rolling summary instead of being dropped.
+    """
+
+    def __init__(self, token_budget: int = 2000, summarizer=None, summary_budget: int = 300):
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        self.summary_budget = summary_budget
+        self.summary = ""
+        self._messages = deque()
+        self._total_tokens = 0
+
+    @staticmethod
+    def _render(role: str, content: str) -> str:
+        label = "User" if role == "user" else "Assistant"
+        return f"{label}: {content}\n"
+
+    @property
+    def total_tokens(self) -> int:
+        return self._total_tokens
+
+    @property
+    def messages(self):
+        """History as plain role/content dicts"""
+        return [{"role": m["role"], "content": m["content"]} for m in self._messages]
+
+    def add(self, role: str, content: str):
+        self._append(role, content)
+        self._evict(self.token_budget)
+
+    def extend(self, messages, summarize: bool = True):
+        """Add many role/content dicts at once, evicting only after the last one.
+
+        With summarize=False the turns that don't fit are dropped without
+        calling the summarizer, e.g. when restoring a saved transcript.
+        """
+        for message in messages:
+            self._append(message["role"], message["content"])
+        self._evict(self.token_budget, summarize)
+
+    def _append(self, role: str, content: str):
+        tokens = estimate_tokens(self._render(role, content))
+        self._messages.append({"role": role, "content": content, "tokens": tokens})
+        self._total_tokens += tokens
+
+    def clear(self):
+        self._messages.clear()
+        self._total_tokens = 0
+        self.summary = ""
+
+    def _evict(self, budget: int, summarize: bool = True):
+        evicted = []
+        # Always keep the newest message, even if it alone is over budget
+        while self._total_tokens > budget and len(self._messages) > 1:
+            message = self._messages.popleft()
+            self._total_tokens -= message["tokens"]
+            evicted.append({"role": message["role"], "content": message["content"]})
+
+        if evicted and summarize and self.summarizer:
+            summary = self.summarizer(self.summary, evicted) or ""
+            # Keep the rolling summary itself within its own budget
+            self.summary = summary[: self.summary_budget * 4]
+
+    def window(self, user_input: str):
+        """History that fits the budget alongside the new message.
+
+        The rolling summary, if any, leads the window as a user turn.
+        """
+        self._evict(self.token_budget - estimate_tokens(user_input))
+        history = self.messages
+        if self.summary:
+            history.insert(0, {"role": "user", "content": f"Summary of earlier conversation: {self.summary}"})
+        return history
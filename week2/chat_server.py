@@ -0,0 +1,395 @@
+"""
+Async multi-session chat server for SimpleChatBot (REST + WebSocket streaming)
+
+Many conversations share one process: every session is a SimpleChatBot with
+its own history and persona, built on one shared ChatBackend, and the
+blocking Gemini calls run on a thread pool behind an asyncio semaphore.
+
+    python chat_server.py [--host 127.0.0.1] [--port 8080]
+
+    GET    /presets                    persona presets from basic-chat-cli.py
+    POST   /sessions                   {"persona": "1"} or {"system_prompt": "..."}
+    GET    /sessions/{id}              system prompt and history
+    POST   /sessions/{id}/messages     {"message": "..."} -> {"reply": "..."}
+    POST   /sessions/{id}/save         {"name": "..."} into the transcript archive
+    DELETE /sessions/{id}
+    GET    /sessions/{id}/ws           send {"message": "..."}, receive chunk/done/error events
+    GET    /health, /metrics
+
+CHAT_SERVER_MAX_UPSTREAM caps concurrent Gemini calls, CHAT_SESSION_TTL
+evicts sessions idle for that many seconds, CHAT_MAX_SESSIONS bounds the
+store and CHAT_MAX_MODELS the models kept for distinct system prompts.
+Set LLM_BACKEND=mock to run it without an API key.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import threading
+import importlib.util
+from contextlib import aclosing
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import WSMsgType, web
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.llm_metrics import metrics
+from common.resilience import CircuitOpenError, status_code
+from common import mock_llm
+from chat_backend import ChatBackend
+from transcript_archive import TranscriptArchive
+
+
+def _load_cli():
+    """basic-chat-cli.py isn't importable by name, so load it from its path"""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "basic-chat-cli.py")
+    spec = importlib.util.spec_from_file_location("basic_chat_cli", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+cli = _load_cli()
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+# ---- Sessions ----
+class Session:
+    def __init__(self, bot):
+        self.id = uuid.uuid4().hex
+        self.bot = bot
+        self.lock = asyncio.Lock()  # one turn at a time keeps the history consistent
+        self.last_used = time.monotonic()
+
+
+class SessionStore:
+    """Sessions by id, least recently used first.
+
+    Sessions idle for longer than `ttl_seconds` are dropped by `evict_idle`,
+    and creating one past `max_sessions` drops the least recently used idle
+    session, so memory stays bounded however many clients come and go.
+    """
+
+    def __init__(self, ttl_seconds: float = 1800, max_sessions: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.evicted = 0
+        self._sessions = OrderedDict()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def add(self, session: Session):
+        self._sessions[session.id] = session
+        while len(self._sessions) > self.max_sessions:
+            oldest = next((s for s in self._sessions.values()
+                           if s is not session and not s.lock.locked()), None)
+            if oldest is None:
+                break
+            self.remove(oldest.id)
+            self.evicted += 1
+
+    def get(self, session_id: str):
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.last_used = time.monotonic()
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def touch(self, session: Session):
+        """Mark a session used (putting it back if it was evicted while a socket held it)"""
+        if self.get(session.id) is None:
+            session.last_used = time.monotonic()
+            self.add(session)
+
+    def remove(self, session_id: str):
+        return self._sessions.pop(session_id, None)
+
+    def evict_idle(self):
+        """Drop sessions idle past the TTL; returns how many went"""
+        cutoff = time.monotonic() - self.ttl_seconds
+        idle = []
+        for session in self._sessions.values():
+            if session.last_used >= cutoff:
+                break  # ordered by last use, so the rest are newer
+            if not session.lock.locked():
+                idle.append(session.id)
+        for session_id in idle:
+            self.remove(session_id)
+        self.evicted += len(idle)
+        return len(idle)
+
+
+# ---- Server ----
+class ChatServer:
+    def __init__(self, api_key: str, max_upstream: int = 32, ttl_seconds: float = 1800,
+                 max_sessions: int = 10000, token_budget: int = 2000):
+        self.backend = ChatBackend(api_key, "gemini-2.0-flash")
+        self.archive = TranscriptArchive()
+        self.presets = cli.get_system_prompt_presets()
+        self.sessions = SessionStore(ttl_seconds, max_sessions)
+        self.token_budget = token_budget
+        self.max_upstream = max_upstream
+        # Blocking SDK calls get a thread each; the semaphore keeps them from queueing in the pool
+        self.upstream = asyncio.Semaphore(max_upstream)
+        self.executor = ThreadPoolExecutor(max_workers=max_upstream, thread_name_prefix="chat-upstream")
+        self.in_flight = 0
+        self.turns = 0
+
+    def new_session(self, persona: str = None, system_prompt: str = None) -> Session:
+        bot = cli.SimpleChatBot(None, token_budget=self.token_budget, backend=self.backend,
+                                archive=self.archive, pipeline="week2-server")
+        if persona is not None:
+            bot.system_prompt = self.presets[persona][1]
+        elif system_prompt:
+            bot.system_prompt = system_prompt
+        session = Session(bot)
+        self.sessions.add(session)
+        return session
+
+    async def ask(self, session: Session, message: str) -> str:
+        async with session.lock, self.upstream:
+            self.in_flight += 1
+            try:
+                reply = await asyncio.get_running_loop().run_in_executor(self.executor, session.bot.ask, message)
+            finally:
+                self.in_flight -= 1
+                self.sessions.get(session.id)  # a turn that queued for long mustn't count as idle
+            self.turns += 1
+            return reply
+
+    async def ask_stream(self, session: Session, message: str):
+        """Async iterator over reply chunks; the sync generator runs on the pool"""
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+        stop = threading.Event()
+
+        def produce():
+            chunks = session.bot.ask_stream(message)
+            try:
+                for chunk in chunks:
+                    if stop.is_set():
+                        chunks.close()  # recorded as cancelled; nothing is added to history
+                        break
+                    loop.call_soon_threadsafe(events.put_nowait, ("chunk", chunk))
+            except Exception as e:
+                loop.call_soon_threadsafe(events.put_nowait, ("error", e))
+            else:
+                loop.call_soon_threadsafe(events.put_nowait, ("done", None))
+
+        async with session.lock, self.upstream:
+            self.in_flight += 1
+            worker = loop.run_in_executor(self.executor, produce)
+            try:
+                while True:
+                    kind, value = await events.get()
+                    if kind == "error":
+                        raise value
+                    if kind == "done":
+                        self.turns += 1
+                        break
+                    yield value
+            finally:
+                stop.set()
+                await worker
+                self.in_flight -= 1
+                self.sessions.get(session.id)
+
+    async def evict_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            self.sessions.evict_idle()
+
+
+def _error_status(exc):
+    if isinstance(exc, CircuitOpenError):
+        return 503
+    code = status_code(exc)
+    return 429 if code == 429 else 502
+
+
+def _session_or_404(request):
+    session = request.app["server"].sessions.get(request.match_info["session_id"])
+    if session is None:
+        raise web.HTTPNotFound(text=json.dumps({"error": "unknown session"}), content_type="application/json")
+    return session
+
+
+async def _json_body(request):
+    try:
+        return await request.json() if request.can_read_body else {}
+    except json.JSONDecodeError:
+        raise web.HTTPBadRequest(text=json.dumps({"error": "body must be JSON"}), content_type="application/json")
+
+
+# ---- Handlers ----
+async def get_presets(request):
+    presets = request.app["server"].presets
+    return web.json_response({key: {"name": name, "system_prompt": prompt} for key, (name, prompt) in presets.items()})
+
+
+async def create_session(request):
+    server = request.app["server"]
+    body = await _json_body(request)
+    persona = body.get("persona")
+    if persona is not None and persona not in server.presets:
+        return web.json_response({"error": f"unknown persona {persona!r}"}, status=400)
+    session = server.new_session(persona, body.get("system_prompt"))
+    return web.json_response({"session_id": session.id, "system_prompt": session.bot.system_prompt}, status=201)
+
+
+async def get_session(request):
+    session = _session_or_404(request)
+    return web.json_response({
+        "session_id": session.id,
+        "system_prompt": session.bot.system_prompt,
+        "history": session.bot.conversation_history,
+    })
+
+
+async def delete_session(request):
+    if request.app["server"].sessions.remove(request.match_info["session_id"]) is None:
+        return web.json_response({"error": "unknown session"}, status=404)
+    return web.Response(status=204)
+
+
+async def post_message(request):
+    session = _session_or_404(request)
+    message = str((await _json_body(request)).get("message", "")).strip()
+    if not message:
+        return web.json_response({"error": "message is required"}, status=400)
+    try:
+        reply = await request.app["server"].ask(session, message)
+    except Exception as e:
+        return web.json_response({"error": f"{type(e).__name__}: {e}"}, status=_error_status(e))
+    return web.json_response({"reply": reply})
+
+
+async def save_session(request):
+    session = _session_or_404(request)
+    name = (await _json_body(request)).get("name") or f"server_{session.id}"
+    await asyncio.get_running_loop().run_in_executor(None, session.bot.save_conversation, name)
+    if session.bot.session_name != name:
+        return web.json_response({"error": "could not save the conversation"}, status=500)
+    return web.json_response({"name": name, "messages": len(session.bot.transcript)})
+
+
+async def session_ws(request):
+    session = _session_or_404(request)
+    server = request.app["server"]
+    ws = web.WebSocketResponse(heartbeat=30)
+    await ws.prepare(request)
+
+    async for msg in ws:
+        if msg.type != WSMsgType.TEXT:
+            continue
+        try:
+            message = str(json.loads(msg.data).get("message", "")).strip()
+        except (json.JSONDecodeError, AttributeError):
+            message = msg.data.strip()
+        if not message:
+            await ws.send_json({"type": "error", "error": "message is required"})
+            continue
+
+        server.sessions.touch(session)
+        chunks = []
+        try:
+            # aclosing: a client that drops mid-reply stops the upstream stream right away
+            async with aclosing(server.ask_stream(session, message)) as stream:
+                async for chunk in stream:
+                    chunks.append(chunk)
+                    await ws.send_json({"type": "chunk", "text": chunk})
+        except ConnectionResetError:
+            break
+        except Exception as e:
+            await ws.send_json({"type": "error", "error": f"{type(e).__name__}: {e}", "status": _error_status(e)})
+            continue
+        await ws.send_json({"type": "done", "reply": "".join(chunks).strip()})
+    return ws
+
+
+async def health(request):
+    server = request.app["server"]
+    return web.json_response({
+        "sessions": len(server.sessions),
+        "evicted": server.sessions.evicted,
+        "in_flight": server.in_flight,
+        "max_upstream": server.max_upstream,
+        "turns": server.turns,
+        "models": len(server.backend._models),
+        "rss_mb": round(rss_mb(), 1),
+    })
+
+
+async def prometheus(request):
+    return web.Response(text=metrics.render_prometheus(), content_type="text/plain")
+
+
+def create_app(api_key: str = None, max_upstream: int = None, ttl_seconds: float = None,
+               max_sessions: int = None, evict_interval: float = None):
+    """Build the aiohttp app; unset options come from the environment"""
+    api_key = api_key or os.getenv("API_KEY") or ("mock" if mock_llm.is_enabled() else None)
+    if not api_key:
+        raise ValueError("API_KEY is not set (or use LLM_BACKEND=mock)")
+    ttl_seconds = ttl_seconds or float(os.getenv("CHAT_SESSION_TTL", "1800"))
+    evict_interval = evict_interval or min(60.0, ttl_seconds / 2)
+
+    async def lifecycle(app):
+        # The semaphore must be created inside the running loop
+        app["server"] = ChatServer(
+            api_key,
+            max_upstream=max_upstream or int(os.getenv("CHAT_SERVER_MAX_UPSTREAM", "32")),
+            ttl_seconds=ttl_seconds,
+            max_sessions=max_sessions or int(os.getenv("CHAT_MAX_SESSIONS", "10000")),
+            token_budget=int(os.getenv("CHAT_TOKEN_BUDGET", "2000")),
+        )
+        evictor = asyncio.create_task(app["server"].evict_loop(evict_interval))
+        yield
+        evictor.cancel()
+        app["server"].executor.shutdown(wait=False, cancel_futures=True)
+
+    app = web.Application()
+    app.cleanup_ctx.append(lifecycle)
+    app.add_routes([
+        web.get("/presets", get_presets),
+        web.post("/sessions", create_session),
+        web.get("/sessions/{session_id}", get_session),
+        web.delete("/sessions/{session_id}", delete_session),
+        web.post("/sessions/{session_id}/messages", post_message),
+        web.post("/sessions/{session_id}/save", save_session),
+        web.get("/sessions/{session_id}/ws", session_ws),
+        web.get("/health", health),
+        web.get("/metrics", prometheus),
+    ])
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+
+    try:
+        app = create_app()
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    print(f"🚀 Chat server on http://{args.host}:{args.port}")
+    web.run_app(app, host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
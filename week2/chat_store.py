@@ -0,0 +1,99 @@
+"""
+Append-only, write-behind chat memory for the Streamlit chatbot
+
+"""
+
+import os
+import re
+import json
+import queue
+import atexit
+import threading
+
+_SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class ChatStore:
+    """One append-only JSONL log per session, written by a background thread.
+
+    `append` only puts the message on a queue, so the UI never waits on disk.
+    The writer drains the queue in batches and appends one line per message,
+    which makes each write O(message) rather than O(history). Every session
+    has its own file, so concurrent sessions can't overwrite each other.
+    """
+
+    def __init__(self, directory: str = "chat_memory", flush_interval: float = 0.2, batch_size: int = 64):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        os.makedirs(directory, exist_ok=True)
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._run, name="chat-store-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)
+
+    def _path(self, session_id: str) -> str:
+        if not _SESSION_ID.match(session_id):
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        return os.path.join(self.directory, f"{session_id}.jsonl")
+
+    def append(self, session_id: str, message: dict):
+        """Queue a message for writing; returns immediately"""
+        self._queue.put(("append", self._path(session_id), message))
+
+    def clear(self, session_id: str):
+        """Queue truncation of a session's log"""
+        self._queue.put(("clear", self._path(session_id), None))
+
+    def load(self, session_id: str):
+        """Read back one session's messages (pending writes are flushed first)"""
+        path = self._path(session_id)
+        self.flush()
+        if not os.path.exists(path):
+            return []
+        messages = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    messages.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A torn last line from a crash shouldn't lose the whole session
+                    continue
+        return messages
+
+    def flush(self):
+        """Block until everything queued so far is on disk"""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get(timeout=self.flush_interval))
+            except queue.Empty:
+                pass
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                print(f"❌ Error saving chat memory: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    @staticmethod
+    def _write_batch(batch):
+        # Group consecutive appends per file so each file is opened once per batch
+        pending = {}
+        for op, path, message in batch:
+            if op == "clear":
+                pending.pop(path, None)
+                open(path, "w", encoding="utf-8").close()
+            else:
+                pending.setdefault(path, []).append(json.dumps(message, ensure_ascii=False) + "\n")
+        for path, lines in pending.items():
+            with open(path, "a", encoding="utf-8") as f:
+                f.writelines(lines)
@@ -6,25 +6,45 @@ Streamlit Chatbot with Gemini Integration
 import streamlit as st
 import json
 from datetime import datetime
-import google.generativeai as genai
 import os
+import sys
+import uuid
 from dotenv import load_dotenv
 
-MEMORY_FILE = "chat_memory.json"
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.startup_profiler import profiler
+from common.llm_metrics import render_streamlit_panel
+from chat_backend import ChatBackend, warm_up
+from chat_store import ChatStore
 
-def load_memory():
-    """Load chat memory from file if it exists"""
-    if os.path.exists(MEMORY_FILE):
-        with open(MEMORY_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return []
+MEMORY_DIR = "chat_memory"
+HISTORY_PAGE_SIZE = 20  # messages rendered per page of history
 
 
+@st.cache_resource
+def get_chat_store():
+    """One write-behind store (and writer thread) per process"""
+    return ChatStore(MEMORY_DIR)
 
-def save_memory(history):
-    """Save chat memory to file"""
-    with open(MEMORY_FILE, "w", encoding="utf-8") as f:
-        json.dump(history, f, indent=2)
+
+def get_session_id():
+    """Session id kept in the URL so a page refresh restores the same chat"""
+    session_id = st.query_params.get("session")
+    if not session_id:
+        session_id = uuid.uuid4().hex
+        st.query_params["session"] = session_id
+    return session_id
+
+
+def load_memory(session_id):
+    """Load this session's chat memory, if it has any"""
+    return get_chat_store().load(session_id)
+
+
+
+def save_memory(session_id, message):
+    """Append one message to this session's log (written in the background)"""
+    get_chat_store().append(session_id, message)
 
 
 
@@ -48,29 +68,72 @@ class ChatBot:
         if not api_key:
             raise ValueError("❌ GEMINI_API_KEY not found. Did you set it in your .env file?")
         
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel("gemini-2.0-flash")
+        self.backend = ChatBackend(api_key, "gemini-2.0-flash")
 
     def get_response(self, messages):
         try:
-            # Convert messages (list of dicts) into a string prompt
-            prompt = "\n".join([f"{m['role']}: {m['content']}" for m in messages])
-            response = self.model.generate_content(prompt)
-            return response.text
+            # System prompt goes in as system_instruction, history as role-tagged turns
+            return self.backend.reply_messages(messages, pipeline="week2-streamlit")
         except Exception as e:
             return f"❌ Error: {str(e)}"
 
+    def get_response_stream(self, messages):
+        """Yield response chunks as they arrive (for st.write_stream)"""
+        try:
+            yield from self.backend.reply_messages(messages, pipeline="week2-streamlit", stream=True)
+        except Exception as e:
+            yield f"❌ Error: {str(e)}"
+
 
+@st.cache_resource
+def get_chatbot():
+    """One configured client per process, instead of one per rerun"""
+    return ChatBot()
 
 
 def initialize_session_state():
     """Initialize session state variables"""
     if "messages" not in st.session_state:
         st.session_state.messages = []
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = get_session_id()
     if "chat_history" not in st.session_state:
-        st.session_state.chat_history = []
+        # Only read from disk once, when the session starts
+        try:
+            st.session_state.chat_history = load_memory(st.session_state.session_id)
+        except ValueError:
+            st.session_state.session_id = uuid.uuid4().hex
+            st.query_params["session"] = st.session_state.session_id
+            st.session_state.chat_history = []
     if "system_prompt" not in st.session_state:
         st.session_state.system_prompt = "You are a helpful AI assistant."
+    if "counts" not in st.session_state:
+        # Counted once here, then kept up to date by add_message()
+        st.session_state.counts = {"user": 0, "assistant": 0}
+        for message in st.session_state.chat_history:
+            st.session_state.counts[message["role"]] += 1
+    if "history_shown" not in st.session_state:
+        st.session_state.history_shown = HISTORY_PAGE_SIZE
+
+
+def add_message(message):
+    """Append to the session history, update the counters and persist"""
+    st.session_state.chat_history.append(message)
+    st.session_state.counts[message["role"]] += 1
+    save_memory(st.session_state.session_id, message)  # persist
+
+
+def show_older_messages():
+    st.session_state.history_shown += HISTORY_PAGE_SIZE
+
+
+def render_statistics():
+    st.header("📊 Statistics")
+    st.metric("Messages Sent", st.session_state.counts["user"])
+    st.metric("AI Responses", st.session_state.counts["assistant"])
+
+    st.subheader("⚡ Gemini calls")
+    render_streamlit_panel(st, pipeline="week2-streamlit")
 
 def get_system_prompts():
     """Predefined system prompts for different personas"""
@@ -97,9 +160,9 @@ def main():
     st.title("AssistAI 🤖")
    
     
-    # Initialize
+    # Initialize; the Gemini SDK loads in the background while the page renders
+    warm_up()
     initialize_session_state()
-    chatbot = ChatBot()
     
     # Sidebar configuration
     with st.sidebar:
@@ -133,7 +196,9 @@ def main():
         if st.button("Clear Conversation", type="secondary"):
             st.session_state.messages = []
             st.session_state.chat_history = []
-            st.rerun()
+            st.session_state.counts = {"user": 0, "assistant": 0}
+            st.session_state.history_shown = HISTORY_PAGE_SIZE
+            get_chat_store().clear(st.session_state.session_id)
         
         # Export functionality
         if st.session_state.chat_history:
@@ -147,18 +212,24 @@ def main():
                         "application/json"
                     )
         
-        # Statistics
-        st.header("📊 Statistics")
-        st.metric("Messages Sent", len([m for m in st.session_state.chat_history if m["role"] == "user"]))
-        st.metric("AI Responses", len([m for m in st.session_state.chat_history if m["role"] == "assistant"]))
+        # Statistics are filled in at the end of the run, after this turn's
+        # reply, so they are current without a second rerun
+        stats_slot = st.container()
+
+        with st.expander("⏱️ Startup profile"):
+            st.dataframe(profiler.rows(), hide_index=True)
     
     # Main chat interface
     st.header("What would you like to ask?")
     
-    # Display chat history
+    # Display chat history: only the latest page, older pages on request
     chat_container = st.container()
     with chat_container:
-        for message in st.session_state.chat_history:
+        history = st.session_state.chat_history
+        hidden = max(0, len(history) - st.session_state.history_shown)
+        if hidden:
+            st.button(f"⬆️ Load older messages ({hidden} hidden)", on_click=show_older_messages)
+        for message in history[hidden:]:
             with st.chat_message(message["role"]):
                 st.write(message["content"])
                 if message["role"] == "assistant":
@@ -172,13 +243,18 @@ def main():
             "content": user_input,
             "timestamp": datetime.now().strftime("%H:%M:%S")
         }
-        st.session_state.chat_history.append(user_message)
-        save_memory(st.session_state.chat_history)  # persist
+        add_message(user_message)
 
         # Display user message
         with st.chat_message("user"):
             st.write(user_input)
 
+        try:
+            chatbot = get_chatbot()
+        except ValueError as e:
+            st.error(str(e))
+            st.stop()
+
         # Prepare messages for API call
         api_messages = [
             {"role": "system", "content": st.session_state.system_prompt}
@@ -192,10 +268,9 @@ def main():
 
         # Get AI response
         with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
-                response = chatbot.get_response(api_messages)
-                st.write(response)
-                st.caption(f"Generated at {datetime.now().strftime('%H:%M:%S')}")
+            # Render the reply live; write_stream returns the full text at the end
+            response = st.write_stream(chatbot.get_response_stream(api_messages))
+            st.caption(f"Generated at {datetime.now().strftime('%H:%M:%S')}")
 
         # Add assistant response
         assistant_message = {
@@ -203,9 +278,9 @@ def main():
             "content": response,
             "timestamp": datetime.now().strftime("%H:%M:%S")
         }
-        st.session_state.chat_history.append(assistant_message)
-        save_memory(st.session_state.chat_history)  # persist
-        st.rerun()
+        add_message(assistant_message)
+        # No st.rerun(): both messages are already on screen and the next
+        # rerun renders them from history
 
     with st.expander("💡 Usage Tips"):
         st.markdown("""
@@ -221,6 +296,9 @@ def main():
         - Observe changes in tone, detail level, and approach
         """)
 
+    with stats_slot:
+        render_statistics()
+
 
     
 
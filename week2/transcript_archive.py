@@ -0,0 +1,155 @@
+"""
+Searchable SQLite archive of CLI chat transcripts
+
+"""
+
+import os
+import sys
+import json
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.sqlite_util import ThreadLocalConnection
+
+ARCHIVE_PATH = os.getenv("TRANSCRIPT_ARCHIVE", "transcripts.db")
+
+
+def fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query: every word must match, `word*` is a prefix"""
+    terms = []
+    for word in text.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*").replace('"', '""')
+        if word:
+            terms.append(f'"{word}"*' if prefix else f'"{word}"')
+    return " ".join(terms)
+
+
+class TranscriptArchive:
+    """All saved sessions in one SQLite file with an FTS5 index over every turn.
+
+    Turns are stored one row each, keyed by (session, position), so loading a
+    session reads only its own rows and saving a longer version of a session
+    only inserts the turns added since the last save. Triggers keep the
+    full-text index in step with the turns table, so the index is updated
+    incrementally inside the same transaction as the save.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            system_prompt TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS turns (
+            id INTEGER PRIMARY KEY,
+            session_id INTEGER NOT NULL REFERENCES sessions (id),
+            position INTEGER NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            UNIQUE (session_id, position)
+        );
+        CREATE VIRTUAL TABLE IF NOT EXISTS turns_fts USING fts5(
+            content, content = 'turns', content_rowid = 'id', tokenize = 'unicode61 remove_diacritics 2'
+        );
+        CREATE TRIGGER IF NOT EXISTS turns_insert AFTER INSERT ON turns BEGIN
+            INSERT INTO turns_fts (rowid, content) VALUES (new.id, new.content);
+        END;
+        CREATE TRIGGER IF NOT EXISTS turns_delete AFTER DELETE ON turns BEGIN
+            INSERT INTO turns_fts (turns_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        END;
+    """
+
+    def __init__(self, path: str = ARCHIVE_PATH):
+        self.path = path
+        self._db = ThreadLocalConnection(path)
+        self._connect().executescript(self.SCHEMA)
+
+    def _connect(self):
+        """This thread's connection to the database"""
+        return self._db.get()
+
+    def save(self, name: str, system_prompt: str, messages: list, start: int = 0):
+        """Store `messages` as turns start, start+1, ... of session `name`.
+
+        Turns from `start` onwards are replaced, earlier ones are kept, so
+        re-saving a session only needs the messages added since last time.
+        """
+        now = datetime.now().isoformat(timespec="seconds")
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO sessions (name, system_prompt, created_at, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET system_prompt = excluded.system_prompt, "
+                "updated_at = excluded.updated_at",
+                (name, system_prompt, now, now),
+            )
+            session_id = conn.execute("SELECT id FROM sessions WHERE name = ?", (name,)).fetchone()[0]
+            conn.execute("DELETE FROM turns WHERE session_id = ? AND position >= ?", (session_id, start))
+            conn.executemany(
+                "INSERT INTO turns (session_id, position, role, content) VALUES (?, ?, ?, ?)",
+                [(session_id, start + i, m["role"], m["content"]) for i, m in enumerate(messages)],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def load(self, name: str):
+        """(system_prompt, messages) of one session, or None if there is no such session"""
+        conn = self._connect()
+        row = conn.execute("SELECT id, system_prompt FROM sessions WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        turns = conn.execute(
+            "SELECT role, content FROM turns WHERE session_id = ? ORDER BY position", (row[0],)
+        ).fetchall()
+        return row[1], [{"role": role, "content": content} for role, content in turns]
+
+    def import_json(self, file_path: str, name: str = None) -> str:
+        """Copy a conversation saved by the old JSON /save into the archive; returns its name"""
+        with open(file_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        name = name or os.path.splitext(os.path.basename(file_path))[0]
+        self.save(name, data.get("system_prompt", ""), data.get("conversation", []))
+        return name
+
+    def search(self, text: str, limit: int = 20):
+        """Newest turns containing every word, across all sessions, with a highlighted snippet.
+
+        Newest-first walks the index in rowid order and stops after `limit`
+        hits; ranking by relevance would have to score every match, which
+        takes tens of milliseconds for a common word in a large archive.
+        """
+        query = fts_query(text)
+        if not query:
+            return []
+        rows = self._connect().execute(
+            """
+            SELECT s.name, t.position, t.role, snippet(turns_fts, 0, '[', ']', '…', 12), s.updated_at
+            FROM turns_fts
+            JOIN turns t ON t.id = turns_fts.rowid
+            JOIN sessions s ON s.id = t.session_id
+            WHERE turns_fts MATCH ?
+            ORDER BY turns_fts.rowid DESC
+            LIMIT ?
+            """,
+            (query, limit),
+        ).fetchall()
+        return [
+            {"session": name, "position": position, "role": role, "snippet": snippet, "updated_at": updated}
+            for name, position, role, snippet, updated in rows
+        ]
+
+    def sessions(self, limit: int = 10):
+        """Most recently saved sessions as (name, updated_at, turn count)"""
+        return self._connect().execute(
+            """
+            SELECT s.name, s.updated_at, (SELECT COUNT(*) FROM turns t WHERE t.session_id = s.id)
+            FROM sessions s ORDER BY s.updated_at DESC, s.id DESC LIMIT ?
+            """,
+            (limit,),
+        ).fetchall()